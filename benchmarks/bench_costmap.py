@@ -0,0 +1,55 @@
+"""
+Benchmark incremental Costmap.refresh() against a full rebuild as the map
+grows. The same reference scans (see bench_occupancy_grid.py) are replayed
+into dense grids of increasing size; steady-state per-tick cost should stay
+flat while a full distance transform scales with the map area.
+
+Usage:
+    python benchmarks/bench_costmap.py [--sizes 20 40 60] [--scans 120]
+"""
+import argparse, os, sys, time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(__file__))
+from bench_occupancy_grid import reference_scans
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "webots_project", "controllers", "roboai_controller"))
+from occupancy_grid import OccupancyGrid
+from costmap import Costmap
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=float, nargs="+", default=[20.0, 40.0, 60.0])
+    ap.add_argument("--scans", type=int, default=120)
+    ap.add_argument("--beams", type=int, default=360)
+    ap.add_argument("--range-max", type=float, default=3.5)
+    args = ap.parse_args()
+
+    scans = reference_scans(args.scans, args.beams, args.range_max)
+    warm = args.scans // 2
+    print(f"{'map (m)':>8} {'cells':>10} {'full (ms)':>10} {'refresh (ms/tick)':>18} {'flips/tick':>11} {'match':>6}")
+    for size in args.sizes:
+        grid = OccupancyGrid(width_m=size, height_m=size, resolution=0.05)
+        cm = Costmap(grid)
+        for pose, r, amin, ainc in scans[:warm]:
+            grid.update_from_scan(pose, r, amin, ainc, args.range_max)
+            cm.refresh()
+
+        t_inc, flips = 0.0, 0
+        for pose, r, amin, ainc in scans[warm:]:
+            grid.update_from_scan(pose, r, amin, ainc, args.range_max)
+            t0 = time.perf_counter()
+            flips += cm.refresh()
+            t_inc += time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        full = Costmap(grid)
+        t_full = time.perf_counter() - t0
+        grid.layers.remove(full)
+        match = np.allclose(full.dist, cm.dist) and np.array_equal(full.lethal, cm.lethal)
+
+        k = max(1, len(scans) - warm)
+        print(f"{size:>8.0f} {grid.grid.size:>10} {1e3 * t_full:>10.1f} {1e3 * t_inc / k:>18.2f} "
+              f"{flips / k:>11.1f} {str(match):>6}")
+
+if __name__ == "__main__":
+    main()
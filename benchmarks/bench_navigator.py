@@ -0,0 +1,67 @@
+"""
+Benchmark navigator.steer_batch() against calling steer() once per robot.
+Random IR readings (some missing, some close enough to trigger the turn)
+are steered for N robots; per-robot cost of the batched call should fall
+as N grows, while the loop stays flat.
+
+steer() is now a thin wrapper around steer_batch(), so "match" checks the
+batch against ref_steer(), a copy of the original list-based steer().
+The wrapper is not free: one steer() call (one robot per control tick)
+went from a few us (about 10 us for ref_steer() here) to about 70 us,
+which is still far inside the tick.
+
+Usage:
+    python benchmarks/bench_navigator.py [--robots 1 100 10000] [--repeats 20]
+"""
+import argparse, os, sys, time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "webots_project", "controllers", "roboai_controller"))
+from config import IR_MAX, LEFT_GROUP, RIGHT_GROUP, FRONT_GROUP, BASE_SPEED, AVOID_GAIN, FRONT_THRESH
+from navigator import MAX_WHEEL_CMD, clamp, steer, steer_batch
+
+def ref_steer(ir, base_speed=BASE_SPEED, avoid_gain=AVOID_GAIN, front_thresh=FRONT_THRESH):
+    """The scalar steer() from before steer_batch(), kept as the reference."""
+    vals = [x if x is not None else 0.0 for x in ir]
+    n = [clamp(v / IR_MAX, 0.0, 1.0) for v in vals]
+    front = max(n[i] for i in FRONT_GROUP if i < len(n))
+    left_sum = sum(n[i] for i in LEFT_GROUP if i < len(n))
+    right_sum = sum(n[i] for i in RIGHT_GROUP if i < len(n))
+    if front >= front_thresh:
+        l, r = (base_speed, -base_speed) if left_sum >= right_sum else (-base_speed, base_speed)
+    else:
+        l, r = base_speed - avoid_gain * right_sum, base_speed - avoid_gain * left_sum
+    return (clamp(l, -MAX_WHEEL_CMD, MAX_WHEEL_CMD), clamp(r, -MAX_WHEEL_CMD, MAX_WHEEL_CMD), front)
+
+def random_ir(n, seed=0):
+    rng = np.random.default_rng(seed)
+    ir = rng.uniform(0.0, 4500.0, (n, 8)) * rng.uniform(0.0, 1.0, (n, 1)) ** 2
+    ir[rng.random((n, 8)) < 0.05] = np.nan
+    return ir
+
+def _best(fn, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--robots", type=int, nargs="+", default=[1, 100, 10000])
+    ap.add_argument("--repeats", type=int, default=20)
+    args = ap.parse_args()
+
+    print(f"{'robots':>8} {'loop (us/robot)':>16} {'batch (us/robot)':>17} {'speedup':>8} {'match':>6}")
+    for n in args.robots:
+        ir = random_ir(n)
+        rows = [[None if np.isnan(v) else float(v) for v in r] for r in ir]
+        t_loop, _ = _best(lambda: [steer(r) for r in rows], args.repeats)
+        t_batch, (cmds, front) = _best(lambda: steer_batch(ir), args.repeats)
+        ref = np.array([ref_steer(r) for r in rows])
+        match = np.allclose(ref[:, :2], cmds) and np.allclose(ref[:, 2], front)
+        print(f"{n:>8} {1e6 * t_loop / n:>16.2f} {1e6 * t_batch / n:>17.3f} {t_loop / t_batch:>7.1f}x {str(match):>6}")
+
+if __name__ == "__main__":
+    main()
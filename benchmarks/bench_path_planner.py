@@ -0,0 +1,79 @@
+"""
+Benchmark one-shot A* against incremental D* Lite replanning on synthetic
+maps of increasing size. Each replan step moves the robot a few cells along
+its path and drops a small new obstacle ahead of it, like a fresh scan would.
+
+Usage:
+    python benchmarks/bench_path_planner.py [--sizes 100 200 400 800] [--replans 10]
+"""
+import argparse, os, sys, time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "webots_project", "controllers", "roboai_controller"))
+from path_planner import astar, DStarLite
+
+def synthetic_map(n, seed=0, fill=0.15):
+    """n x n map with random rectangular obstacles; corners kept free for start/goal."""
+    rng = np.random.default_rng(seed)
+    blocked = np.zeros((n, n), dtype=np.uint8)
+    while blocked.mean() < fill:
+        w, h = rng.integers(2, max(3, n // 10), size=2)
+        x, y = rng.integers(0, n - w), rng.integers(0, n - h)
+        blocked[y:y + h, x:x + w] = 1
+    blocked[:n // 20 + 2, :n // 20 + 2] = 0
+    blocked[-(n // 20 + 2):, -(n // 20 + 2):] = 0
+    return bytearray(blocked.tobytes())
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[100, 200, 400, 800])
+    ap.add_argument("--replans", type=int, default=10)
+    args = ap.parse_args()
+
+    print(f"{'cells':>10} {'A* (ms)':>10} {'D* init (ms)':>13} {'A* replan (ms)':>15} {'D* replan (ms)':>15}")
+    for n in args.sizes:
+        blocked = synthetic_map(n)
+        start, goal = 0, n * n - 1
+
+        t0 = time.perf_counter()
+        path = astar(blocked, n, n, start, goal)
+        t_astar = time.perf_counter() - t0
+        if path is None:
+            print(f"{n * n:>10} no path on synthetic map, skipping")
+            continue
+
+        t0 = time.perf_counter()
+        ds = DStarLite(blocked, n, n, start, goal)
+        ds.compute()
+        t_dinit = time.perf_counter() - t0
+
+        t_a, t_d, k = 0.0, 0.0, 0
+        for _ in range(args.replans):
+            cur = ds.path()
+            if cur is None or len(cur) < 12:
+                break
+            start = cur[3]
+            # New 3x3 obstacle a few cells ahead, off the robot's own cell
+            cy, cx = divmod(cur[10], n)
+            changed = [y * n + x for y in range(cy - 1, cy + 2) for x in range(cx - 1, cx + 2)
+                       if 0 <= x < n and 0 <= y < n and y * n + x not in (start, goal) and not blocked[y * n + x]]
+            for c in changed:
+                blocked[c] = 1
+
+            t0 = time.perf_counter()
+            astar(blocked, n, n, start, goal)
+            t_a += time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            ds.move_start(start)
+            ds.update_cells(changed)
+            ds.compute()
+            ds.path()
+            t_d += time.perf_counter() - t0
+            k += 1
+
+        k = max(1, k)
+        print(f"{n * n:>10} {1e3 * t_astar:>10.1f} {1e3 * t_dinit:>13.1f} {1e3 * t_a / k:>15.1f} {1e3 * t_d / k:>15.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Compare CPU inference backends for the planner models (see
+models/planning/t5_plan/backends.py): model-load time, peak memory,
+per-plan latency and parity with the fp32 torch backend on the validation
+set. Each backend runs in its own process, so load time and memory are
+measured from a cold start.
+
+--planner t5 runs inference.nl_to_plan's model (t5-plan, or t5-small when
+no fine-tuned checkpoint exists); --planner flan runs planner_text's
+flan-t5-small on the same instructions. Parity is the share of prompts
+whose plan matches the torch plan exactly (ignoring plan_id).
+
+Needs torch/transformers, optimum[onnxruntime] for the onnx backends and a
+validation set from synth_data.py.
+
+Usage:
+    python benchmarks/bench_t5_backends.py [--planner t5|flan] [--backends torch int8 onnx onnx-int8] [--n 100]
+                                           [--min-parity 0.95]
+"""
+import argparse, json, multiprocessing as mp, os, resource, sys, time
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+CONTROLLER = os.path.join(ROOT, "webots_project", "controllers", "roboai_controller")
+
+def load_requests(path, n):
+    from models.planning.t5_plan.synth_data import ROOMS
+    reqs = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            ex = json.loads(line)
+            instr = ex["input_text"].split("INSTRUCTION:\n", 1)[1].split("\n\n", 1)[0]
+            target = json.loads(ex["target_text"])
+            reqs.append(dict(instr=instr, pose=(0.0, 0.0, 0.0), goal_library=ROOMS, constraints=target["constraints"]))
+            if len(reqs) >= n:
+                break
+    return reqs
+
+def _rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0  # KiB on Linux
+
+def _run(planner, backend, reqs, decoding):
+    """Runs in a fresh process: load the backend, then plan every request once."""
+    sys.path[:0] = [ROOT, CONTROLLER]
+    rss0 = _rss_mb()
+    t0 = time.perf_counter()
+    if planner == "flan":
+        import planner_text
+        planner_text.LLM_BACKEND = backend
+        planner_text._get_model()
+        plan_fn = lambda r: planner_text._llm_generate(r["instr"])[0]
+    else:
+        from models.planning.t5_plan import inference
+        inference.set_backend(backend)
+        inference._ensure_loaded()
+        plan_fn = lambda r: inference._generate_plan(r["instr"], r["pose"], r["goal_library"],
+                                                     r["constraints"], decoding)[0]
+    load_s = time.perf_counter() - t0
+    plan_fn(reqs[0])  # warm-up
+
+    lat, plans = [], []
+    for r in reqs:
+        t0 = time.perf_counter()
+        plan = plan_fn(r)
+        lat.append((time.perf_counter() - t0) * 1000.0)
+        if isinstance(plan, dict):
+            plan = {k: v for k, v in plan.items() if k != "plan_id"}
+        plans.append(plan)
+    return dict(load_s=load_s, mem_mb=_rss_mb() - rss0, lat=lat, plans=plans)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--planner", choices=("t5", "flan"), default="t5")
+    ap.add_argument("--backends", nargs="+", default=["torch", "int8", "onnx", "onnx-int8"])
+    ap.add_argument("--data", default=os.path.join(ROOT, "data", "val.jsonl"))
+    ap.add_argument("--n", type=int, default=100)
+    ap.add_argument("--decoding", default="beam", help="t5 only: beam or constrained")
+    ap.add_argument("--min-parity", type=float, default=0.0,
+                    help="exit non-zero if any backend matches fewer torch plans than this (0-1)")
+    args = ap.parse_args()
+
+    sys.path.insert(0, ROOT)
+    reqs = load_requests(args.data, args.n)
+    backends = ["torch"] + [b for b in args.backends if b != "torch"]  # parity needs the reference
+    ctx = mp.get_context("spawn")
+    results = {}
+    for b in backends:
+        with ctx.Pool(1) as pool:
+            results[b] = pool.apply(_run, (args.planner, b, reqs, args.decoding))
+
+    ref = results["torch"]["plans"]
+    worst = 1.0
+    print(f"{args.planner} planner, {len(reqs)} prompts from {args.data}")
+    print(f"{'backend':>10} {'load (s)':>9} {'mem (MB)':>9} {'p50 (ms)':>9} {'p95 (ms)':>9} {'parity':>7}")
+    for b in backends:
+        r = results[b]
+        parity = np.mean([p == q for p, q in zip(r["plans"], ref)])
+        worst = min(worst, parity)
+        print(f"{b:>10} {r['load_s']:9.2f} {r['mem_mb']:9.0f} {np.percentile(r['lat'], 50):9.1f} "
+              f"{np.percentile(r['lat'], 95):9.1f} {parity:7.1%}")
+    if worst < args.min_parity:
+        sys.exit(f"parity {worst:.1%} below --min-parity {args.min_parity:.1%}")
+
+if __name__ == "__main__":
+    main()
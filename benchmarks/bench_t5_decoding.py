@@ -0,0 +1,72 @@
+"""
+Benchmark the T5 planner's decoding modes on held-out prompts: unconstrained
+beam search (validated afterwards) against schema-constrained greedy
+decoding (see models/planning/t5_plan/constrained.py). Reports latency
+percentiles, how often the output validated (the rest get the fallback
+plan), exact matches against the target plan (ignoring plan_id) and the number
+of tokens generate() returned (the forced prefix of constrained decoding
+included; padding and the decoder start token not).
+
+Needs torch/transformers and a validation set from synth_data.py.
+
+Usage:
+    python benchmarks/bench_t5_decoding.py [--data data/val.jsonl] [--n 100]
+"""
+import argparse, json, os, sys, time
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+sys.path.insert(0, ROOT)
+from models.planning.t5_plan import inference
+from models.planning.t5_plan.synth_data import ROOMS
+
+def load_requests(path, n):
+    reqs = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            ex = json.loads(line)
+            instr = ex["input_text"].split("INSTRUCTION:\n", 1)[1].split("\n\n", 1)[0]
+            target = json.loads(ex["target_text"])
+            reqs.append(dict(instr=instr, pose=(0.0, 0.0, 0.0), goal_library=ROOMS,
+                             constraints=target["constraints"], target=target))
+            if len(reqs) >= n:
+                break
+    return reqs
+
+def same_plan(a, b):
+    return {k: v for k, v in a.items() if k != "plan_id"} == {k: v for k, v in b.items() if k != "plan_id"}
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--data", default=os.path.join(ROOT, "data", "val.jsonl"))
+    ap.add_argument("--n", type=int, default=100)
+    ap.add_argument("--modes", nargs="+", default=["beam", "constrained"])
+    args = ap.parse_args()
+
+    reqs = load_requests(args.data, args.n)
+    inference._ensure_loaded()
+    # Warm up both paths (constraint trie, kernels) outside the timed loop
+    for mode in args.modes:
+        inference._generate_plan(reqs[0]["instr"], reqs[0]["pose"], reqs[0]["goal_library"],
+                                 reqs[0]["constraints"], mode)
+
+    print(f"{len(reqs)} prompts from {args.data}")
+    print(f"{'mode':>12} {'p50 (ms)':>9} {'p95 (ms)':>9} {'valid':>7} {'exact':>7} {'tokens':>7}")
+    for mode in args.modes:
+        lat, valid, exact, tokens = [], 0, 0, []
+        for r in reqs:
+            t0 = time.perf_counter()
+            prompt = inference._build_prompt(r["instr"], r["pose"], r["goal_library"], r["constraints"])
+            out_ids = inference._generate_ids(inference._tok(prompt, return_tensors="pt", truncation=True), mode)
+            text = inference._ids_to_text(out_ids, mode)[0]
+            plan, ok = inference._decode_generated(text, r["goal_library"], r["constraints"], mode)
+            lat.append((time.perf_counter() - t0) * 1000.0)
+            valid += ok
+            exact += ok and same_plan(plan, r["target"])
+            tokens.append(int((out_ids[0] != inference._tok.pad_token_id).sum()))
+        k = len(reqs)
+        print(f"{mode:>12} {np.percentile(lat, 50):9.1f} {np.percentile(lat, 95):9.1f} "
+              f"{valid / k:7.1%} {exact / k:7.1%} {np.mean(tokens):7.1f}")
+
+if __name__ == "__main__":
+    main()
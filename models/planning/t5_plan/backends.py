@@ -0,0 +1,88 @@
+"""
+CPU inference backends for the seq2seq planner models (t5-small / t5-plan
+in inference.py, flan-t5-small in the controller's planner_text.py).
+
+    torch      fp32 PyTorch (reference)
+    int8       PyTorch with dynamic int8 quantization of every nn.Linear
+    onnx       ONNX Runtime, encoder + decoder with KV cache (optimum export)
+    onnx-int8  the same graphs with dynamic int8 quantized weights
+
+load_seq2seq() returns (tokenizer, model); every model has the usual
+generate(), so callers do not care which backend they got. ONNX exports
+are written once next to the checkpoint (or under EXPORT_DIR for hub
+models) and reused. The onnx backends need `optimum[onnxruntime]`.
+"""
+import os, re
+from pathlib import Path
+from typing import Tuple
+
+BACKENDS = ("torch", "int8", "onnx", "onnx-int8")
+EXPORT_DIR = Path(__file__).resolve().parents[3] / "data" / "onnx"
+_ONNX_FILES = ("encoder_model", "decoder_model", "decoder_with_past_model")
+
+def revision_suffix(backend: str) -> str:
+    """Appended to the model revision in cache keys: quantized backends may plan differently."""
+    return "" if backend == "torch" else f"+{backend}"
+
+def _export_dir(name_or_path: str, backend: str) -> Path:
+    p = Path(name_or_path)
+    base = p.parent / f"{p.name}-onnx" if p.is_dir() else EXPORT_DIR / re.sub(r"[^\w.-]+", "_", name_or_path)
+    return base.with_name(base.name + "-int8") if backend == "onnx-int8" else base
+
+def _import_ort():
+    try:
+        from optimum.onnxruntime import ORTModelForSeq2SeqLM, ORTQuantizer
+        from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    except ImportError as e:
+        raise ImportError("the onnx backends need optimum[onnxruntime]: pip install 'optimum[onnxruntime]'") from e
+    return ORTModelForSeq2SeqLM, ORTQuantizer, AutoQuantizationConfig
+
+def export_onnx(name_or_path: str, backend: str = "onnx") -> Path:
+    """Export (and for onnx-int8 quantize) the model unless a previous export exists; returns its directory."""
+    ORTModel, ORTQuantizer, AutoQuantizationConfig = _import_ort()
+    out = _export_dir(name_or_path, backend)
+    if (out / "config.json").exists():
+        return out
+    fp32 = _export_dir(name_or_path, "onnx")
+    if not (fp32 / "config.json").exists():
+        model = ORTModel.from_pretrained(name_or_path, export=True, use_cache=True)
+        model.save_pretrained(fp32)
+        _save_tokenizer(name_or_path, fp32)
+    if backend == "onnx":
+        return fp32
+    qconfig = AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+    for stem in _ONNX_FILES:
+        if (fp32 / f"{stem}.onnx").exists():
+            ORTQuantizer.from_pretrained(fp32, file_name=f"{stem}.onnx").quantize(
+                save_dir=out, quantization_config=qconfig)
+    # The quantizer writes <stem>_quantized.onnx; give them the names the loader expects
+    for stem in _ONNX_FILES:
+        q = out / f"{stem}_quantized.onnx"
+        if q.exists():
+            os.replace(q, out / f"{stem}.onnx")
+    _save_tokenizer(name_or_path, out)
+    return out
+
+def _save_tokenizer(name_or_path, out):
+    from transformers import AutoConfig, AutoTokenizer
+    AutoTokenizer.from_pretrained(name_or_path).save_pretrained(out)
+    AutoConfig.from_pretrained(name_or_path).save_pretrained(out)
+
+def load_seq2seq(name_or_path: str, backend: str = "torch") -> Tuple[object, object]:
+    """(tokenizer, model) for a checkpoint directory or hub name on the given backend."""
+    if backend not in BACKENDS:
+        raise ValueError(f"unknown backend {backend!r}, expected one of {BACKENDS}")
+    from transformers import AutoTokenizer
+    if backend.startswith("onnx"):
+        ORTModel = _import_ort()[0]
+        path = export_onnx(name_or_path, backend)
+        return AutoTokenizer.from_pretrained(path), ORTModel.from_pretrained(path, use_cache=True)
+
+    import torch
+    from transformers import AutoModelForSeq2SeqLM
+    tok = AutoTokenizer.from_pretrained(name_or_path)
+    model = AutoModelForSeq2SeqLM.from_pretrained(name_or_path)
+    model.eval()
+    if backend == "int8":
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return tok, model
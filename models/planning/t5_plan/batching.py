@@ -0,0 +1,78 @@
+import queue, threading, time
+from concurrent.futures import Future
+from typing import Any, Callable, List, Sequence
+
+class MicroBatcher:
+    """
+    Collects concurrent requests for up to max_wait_ms (or until max_batch
+    are waiting) and runs them through batch_fn in one call, so throughput
+    grows with load while a lone request waits at most max_wait_ms extra.
+
+    batch_fn takes a list of requests and returns a list of results in the
+    same order. submit() returns a Future; __call__ blocks for the result.
+    """
+
+    def __init__(self, batch_fn: Callable[[List[Any]], Sequence[Any]], max_batch: int = 8, max_wait_ms: float = 5.0):
+        self.batch_fn = batch_fn
+        self.max_batch = int(max_batch)
+        self.max_wait_s = float(max_wait_ms) / 1000.0
+        self.batches = 0
+        self.items = 0
+        self._q: "queue.Queue" = queue.Queue()
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name="MicroBatcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, request: Any) -> Future:
+        if self._closed:
+            raise RuntimeError("MicroBatcher is closed")
+        fut: Future = Future()
+        self._q.put((request, fut))
+        return fut
+
+    def __call__(self, request: Any, timeout: float = None) -> Any:
+        return self.submit(request).result(timeout)
+
+    def _run(self):
+        while True:
+            first = self._q.get()
+            if first is None:
+                return
+            batch = [first]
+            deadline = time.monotonic() + self.max_wait_s
+            while len(batch) < self.max_batch:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    break
+                try:
+                    item = self._q.get(timeout=left)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._q.put(None)  # finish this batch, then stop
+                    break
+                batch.append(item)
+            self._dispatch(batch)
+
+    def _dispatch(self, batch):
+        futs = [f for _, f in batch if f.set_running_or_notify_cancel()]
+        reqs = [r for r, f in batch if f.running()]
+        if not reqs:
+            return
+        try:
+            results = self.batch_fn(reqs)
+        except Exception as e:
+            for f in futs:
+                f.set_exception(e)
+            return
+        self.batches += 1
+        self.items += len(reqs)
+        for f, r in zip(futs, results):
+            f.set_result(r)
+
+    def close(self):
+        """Stop after serving everything already submitted."""
+        if not self._closed:
+            self._closed = True
+            self._q.put(None)
+            self._worker.join()
@@ -0,0 +1,267 @@
+"""
+Schema-constrained decoding for the T5 planner.
+
+PlanGrammar is a character-level automaton for the exact JSON layout the
+planner is trained on (json.dumps with default separators):
+
+    {"plan_id": "<id>", "steps": [{"op": "<op>", "<field>": <num>, ...}, ...],
+     "constraints": {"avoid": ["<name>", ...], "speed_limit": <num>}}
+
+Ops come from PLAN_SCHEMA's enum and each op's numeric fields from its
+step properties. PlanConstraint walks a trie of the tokenizer's pieces
+through that automaton to get the token ids allowed after any prefix, for
+generate(prefix_allowed_tokens_fn=...). EOS is allowed only once the JSON
+has closed, so generation stops right there.
+
+T5's vocabulary has no "{" or "}": they come out as <unk>. Where the
+grammar forces such characters, <unk> is allowed and stands for them, and
+the plan text is rebuilt from the grammar (text()) instead of
+tokenizer.decode(), which would drop them.
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+from .schema import PLAN_SCHEMA
+
+# Numeric fields each op carries, in training order; filtered against the schema
+OP_FIELDS = {"goto": ("x", "y"), "face": ("theta_deg",), "wait": ("seconds",), "stop": ()}
+
+_ID_CHARS = frozenset("0123456789abcdef-")
+_NAME_CHARS = frozenset("abcdefghijklmnopqrstuvwxyz0123456789_")
+_DIGITS = frozenset("0123456789")
+_END = ("END",)
+
+class PlanGrammar:
+    """
+    States are hashable tuples; feed(state, ch) returns the next state or
+    None if ch cannot continue a valid plan. is_done(state) once the
+    top-level object has closed.
+    """
+
+    def __init__(self, schema=PLAN_SCHEMA, max_steps: int = 8, max_id: int = 36,
+                 max_num: int = 8, max_avoid: int = 4):
+        step_props = schema["properties"]["steps"]["items"]["properties"]
+        self.ops = tuple(step_props["op"]["enum"])
+        self.fields = {
+            op: tuple(f for f in OP_FIELDS.get(op, ()) if step_props.get(f, {}).get("type") == "number")
+            for op in self.ops
+        }
+        self.max_steps, self.max_id, self.max_num, self.max_avoid = max_steps, max_id, max_num, max_avoid
+
+    # State constructors
+    @staticmethod
+    def _lit(s, nxt, i=0):
+        return ("L", s, i, nxt) if i < len(s) else nxt
+
+    def start(self):
+        return ("START",)
+
+    def _step(self, k):
+        return self._lit('{"op": "', ("OP", "", k))
+
+    def _fields(self, op, j, k):
+        fs = self.fields[op]
+        if j < len(fs):
+            return self._lit(f', "{fs[j]}": ', ("NUM", "", ("FIELDS", op, j + 1, k)))
+        return self._lit("}", ("AFTER_STEP", k + 1))
+
+    def _tail(self, i):
+        """'], "speed_limit": <num>}}' starting at character i."""
+        return self._lit('], "speed_limit": ', ("NUM", "", self._lit("}}", _END)), i)
+
+    def _resolve(self, st):
+        """Expand bookkeeping states into ones that consume characters."""
+        while st[0] == "FIELDS":
+            st = self._fields(st[1], st[2], st[3])
+        return st
+
+    # Transitions
+    def feed(self, st, ch) -> Optional[tuple]:
+        kind = st[0]
+        if kind == "L":
+            _, s, i, nxt = st
+            if ch != s[i]:
+                return None
+            return self._resolve(self._lit(s, nxt, i + 1))
+        if kind == "START":
+            head = self._lit('{"plan_id": "', ("ID", 0))
+            return head if ch == " " else self.feed(head, ch)
+        if kind == "ID":
+            n = st[1]
+            if ch in _ID_CHARS and n < self.max_id:
+                return ("ID", n + 1)
+            if ch == '"' and n > 0:
+                return self._lit('", "steps": [', self._step(0), 1)
+            return None
+        if kind == "OP":
+            buf, k = st[1], st[2]
+            if ch == '"' and buf in self.ops:
+                return self._resolve(self._fields(buf, 0, k))
+            nb = buf + ch
+            return ("OP", nb, k) if any(op.startswith(nb) for op in self.ops) else None
+        if kind == "NUM":
+            buf, nxt = st[1], st[2]
+            if len(buf) < self.max_num:
+                # JSON numbers: -?(0|[1-9][0-9]*)(.[0-9]+)?
+                if ch in _DIGITS and buf.lstrip("-") != "0":
+                    return ("NUM", buf + ch, nxt)
+                if ch == "-" and not buf:
+                    return ("NUM", "-", nxt)
+                if ch == "." and buf[-1:] in _DIGITS and "." not in buf and len(buf) + 1 < self.max_num:
+                    return ("NUM", buf + ".", nxt)
+            if buf[-1:] in _DIGITS:
+                return self.feed(self._resolve(nxt), ch)
+            return None
+        if kind == "AFTER_STEP":
+            k = st[1]
+            if ch == "," and k < self.max_steps:
+                return self._lit(", ", self._step(k), 1)
+            if ch == "]":
+                return self._lit('], "constraints": {"avoid": [', ("AVOID", 0, False), 1)
+            return None
+        if kind == "AVOID":
+            n, after_item = st[1], st[2]
+            if ch == "]":
+                return self._tail(1)
+            if after_item:
+                return self._lit(', "', ("NAME", "", n), 1) if ch == "," and n < self.max_avoid else None
+            return ("NAME", "", n) if ch == '"' else None
+        if kind == "NAME":
+            buf, n = st[1], st[2]
+            if ch in _NAME_CHARS and len(buf) < 32:
+                return ("NAME", buf + ch, n)
+            if ch == '"' and buf:
+                return ("AVOID", n + 1, True)
+            return None
+        return None  # END accepts nothing
+
+    def feed_text(self, st, text):
+        for ch in text:
+            st = self.feed(st, ch)
+            if st is None:
+                return None
+        return st
+
+    @staticmethod
+    def is_done(st) -> bool:
+        return st == _END
+
+    def forced_run(self, st, oov) -> str:
+        """Characters the state forces next that the vocabulary cannot spell (what an <unk> stands for)."""
+        if st[0] == "START":
+            st = self.feed(st, " ")
+        elif st[0] == "NUM" and st[1][-1:] in _DIGITS:
+            st = self._resolve(st[2])  # a number can end on the closing brace
+        if st[0] != "L":
+            return ""
+        _, s, i, _ = st
+        j = i
+        while j < len(s) and s[j] in oov:
+            j += 1
+        return s[i:j]
+
+class _Trie:
+    __slots__ = ("children", "ids")
+
+    def __init__(self):
+        self.children: Dict[str, "_Trie"] = {}
+        self.ids: List[int] = []
+
+class PlanConstraint:
+    """
+    prefix_allowed_tokens_fn for HF generate(), built from a tokenizer and a
+    PlanGrammar. Grammar state is memoized per decoder prefix, so each
+    generation step only feeds the newest token.
+    """
+
+    def __init__(self, tokenizer, grammar: Optional[PlanGrammar] = None, skip: int = 1,
+                 max_states: int = 100000):
+        """
+        skip: leading decoder ids that are not part of the text (T5's decoder start token).
+        max_states: the per-prefix memo is dropped once it grows past this.
+        """
+        self.g = grammar or PlanGrammar()
+        self.skip = skip
+        self.max_states = int(max_states)
+        self.eos = tokenizer.eos_token_id
+        self.unk = tokenizer.unk_token_id
+        special = set(tokenizer.all_special_ids)
+        pieces = tokenizer.convert_ids_to_tokens(list(range(len(tokenizer))))
+        self.text_of: Dict[int, str] = {}
+        self.root = _Trie()
+        for i, p in enumerate(pieces):
+            if i in special or p is None:
+                continue
+            t = p.replace("▁", " ")
+            if not t:
+                continue
+            self.text_of[i] = t
+            node = self.root
+            for ch in t:
+                node = node.children.setdefault(ch, _Trie())
+            node.ids.append(i)
+        # Characters the grammar emits that have no piece of their own: <unk> stands in for them
+        single = set(t[-1] for t in self.text_of.values() if len(t.lstrip(" ")) == 1)
+        self.oov = frozenset(ch for ch in '{}[]":,. -_0123456789abcdefghijklmnopqrstuvwxyz' if ch not in single)
+        self._states: Dict[Tuple[int, ...], Tuple[Optional[tuple], str]] = {(): (self.g.start(), "")}
+        self._allowed: Dict[tuple, List[int]] = {}
+
+    def reset(self):
+        self._states = {(): (self.g.start(), "")}
+
+    def _feed_token(self, st, tid) -> Tuple[Optional[tuple], str]:
+        if st is None:
+            return None, ""
+        if tid == self.unk:
+            run = self.g.forced_run(st, self.oov)
+            return (self.g.feed_text(st, run), run) if run else (None, "")
+        t = self.text_of.get(tid)
+        if t is None:
+            return None, ""
+        return self.g.feed_text(st, t), t
+
+    def state(self, ids: Sequence[int]) -> Tuple[Optional[tuple], str]:
+        """(grammar state, text so far) after the decoder ids (without the skipped start ids)."""
+        key = tuple(ids)
+        if len(self._states) > self.max_states:
+            self.reset()
+        hit = self._states.get(key)
+        if hit is None:
+            st, text = self.state(key[:-1])
+            nst, piece = self._feed_token(st, key[-1])
+            hit = (nst, text + piece)
+            self._states[key] = hit
+        return hit
+
+    def allowed(self, st) -> List[int]:
+        out = self._allowed.get(st)
+        if out is not None:
+            return out
+        if st is None or self.g.is_done(st):
+            out = [self.eos]
+        else:
+            out = []
+            stack = [(self.root, st)]
+            while stack:
+                node, s = stack.pop()
+                for ch, child in node.children.items():
+                    s2 = self.g.feed(s, ch)
+                    if s2 is not None:
+                        out.extend(child.ids)
+                        if child.children:
+                            stack.append((child, s2))
+            if self.g.forced_run(st, self.oov):
+                out.append(self.unk)
+            if not out:
+                out = [self.eos]  # dead end: stop and let validation fall back
+        self._allowed[st] = out
+        return out
+
+    def __call__(self, batch_id, input_ids) -> List[int]:
+        ids = input_ids.tolist() if hasattr(input_ids, "tolist") else list(input_ids)
+        return self.allowed(self.state(ids[self.skip:])[0])
+
+    def text(self, ids: Sequence[int]) -> str:
+        """Plan text for generated decoder ids, with <unk> restored to the characters it stood for."""
+        ids = list(ids)[self.skip:]
+        while ids and ids[-1] in (self.eos, 0):
+            ids.pop()
+        return self.state(ids)[1].strip()
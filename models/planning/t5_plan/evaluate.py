@@ -0,0 +1,188 @@
+"""
+Evaluate the planners on a synth_data.py dataset (input_text / target_text
+pairs, e.g. data/val.jsonl).
+
+Planners:
+    nl_to_plan  the T5 planner (inference.py), uncached, on the current backend and decoding
+    get_plan    the controller's LLM planner (planner_text._llm_plan), run in-process
+    stub_plan   the controller's rule-based planner
+
+Per planner: exact match (whole plan, ignoring plan_id), step accuracy
+(position-wise step matches over the longer of the two step lists), schema
+validity of the raw model output, fallback rate, p50/p95/p99 latency and
+generated tokens (the output re-tokenized). The legacy planners emit
+forward/turn/scan ops, so their accuracy only counts the ops they share
+with the dataset (goto, wait, stop).
+
+Each worker writes one record per example to <out>/<planner>.shard<i>.jsonl;
+the summary goes to <out>/summary.json. Shard across processes with
+--workers, or across machines with --shard i --num-shards n and a final
+--merge. --compare prints metric deltas against an earlier summary.json.
+
+    python -m models.planning.t5_plan.evaluate --data data/val.jsonl --out reports/eval/t5-plan --workers 4
+"""
+import argparse, json, math, multiprocessing as mp, sys, time
+from pathlib import Path
+from typing import Dict, List, Optional
+from .prompts import parse_input_text
+
+ROOT = Path(__file__).resolve().parents[3]
+_CONTROLLER = ROOT / "webots_project" / "controllers" / "roboai_controller"
+PLANNERS = ("nl_to_plan", "get_plan", "stub_plan")
+_LATENCY_PCTS = (50, 95, 99)
+
+def parse_example(ex: Dict) -> Dict:
+    """nl_to_plan arguments and the target plan from one dataset row."""
+    return {**parse_input_text(ex["input_text"]), "target": json.loads(ex["target_text"])}
+
+def load_dataset(path, limit: Optional[int] = None) -> List[Dict]:
+    rows = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                rows.append(parse_example(json.loads(line)))
+                if limit and len(rows) >= limit:
+                    break
+    return rows
+
+# Scoring
+
+def _norm_step(step: Dict) -> tuple:
+    return tuple(sorted((k, round(float(v), 3) if isinstance(v, (int, float)) else v) for k, v in step.items()))
+
+def score(steps: List[Dict], target_steps: List[Dict], ops=None) -> Dict:
+    """exact / step_acc of predicted steps against the target, optionally restricted to ops."""
+    if ops is not None:
+        steps = [s for s in steps if s.get("op") in ops]
+        target_steps = [s for s in target_steps if s.get("op") in ops]
+    a, b = [_norm_step(s) for s in steps], [_norm_step(s) for s in target_steps]
+    n = max(len(a), len(b))
+    return {"exact": a == b, "step_acc": sum(x == y for x, y in zip(a, b)) / n if n else 1.0}
+
+# Planner runners: each returns fn(example) -> (steps, constraints or None, valid, fallback, raw text)
+
+def _runner(planner: str):
+    if planner == "nl_to_plan":
+        from . import inference
+        def run(ex):
+            text = inference._generate_text(ex["instr"], ex["pose"], ex["goal_library"], ex["constraints"])
+            plan, ok = inference._decode_generated(text, ex["goal_library"], ex["constraints"], inference.DECODING)
+            return plan["steps"], plan["constraints"], ok, not ok, text
+        return run, lambda t: len(inference._tok(t).input_ids)
+
+    sys.path.insert(0, str(_CONTROLLER))
+    import planner_text
+    if planner == "get_plan":
+        def run(ex):
+            plan, ok, raw = planner_text._llm_generate(ex["instr"])
+            return plan, None, ok, not ok, raw
+        return run, lambda t: len(planner_text._get_model()[0](t).input_ids)
+    return (lambda ex: (planner_text.stub_plan(ex["instr"]), None, True, False, "")), (lambda t: 0)
+
+def _meta(planner: str) -> Dict:
+    if planner == "nl_to_plan":
+        from . import inference
+        return {"revision": inference.model_revision(), "backend": inference.BACKEND, "decoding": inference.DECODING}
+    if planner == "get_plan":
+        sys.path.insert(0, str(_CONTROLLER))
+        import planner_text
+        return {"revision": planner_text.LLM_MODEL, "backend": planner_text.LLM_BACKEND}
+    return {}
+
+def run_shard(planner: str, data: str, out: str, shard: int, num_shards: int, limit: Optional[int] = None) -> Path:
+    """Evaluate every num_shards-th example starting at shard; one JSON record per example."""
+    rows = load_dataset(data, limit)[shard::num_shards]
+    run, count_tokens = _runner(planner)
+    ops = None if planner == "nl_to_plan" else {"goto", "wait", "stop"}
+    path = Path(out) / f"{planner}.shard{shard}.jsonl"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", encoding="utf-8") as f:
+        if rows:
+            run(rows[0])  # warm-up: model load is not part of any latency
+        for ex in rows:
+            t0 = time.perf_counter()
+            steps, cons, valid, fallback, raw = run(ex)
+            ms = (time.perf_counter() - t0) * 1000.0
+            rec = {"instr": ex["instr"], "ms": ms, "valid": valid, "fallback": fallback,
+                   "tokens": count_tokens(raw) if raw else 0, **score(steps, ex["target"]["steps"], ops)}
+            if cons is not None:
+                rec["exact"] = rec["exact"] and cons == ex["target"]["constraints"]
+            f.write(json.dumps(rec) + "\n")
+    return path
+
+def _pct(xs: List[float], q: float) -> float:
+    xs = sorted(xs)
+    if not xs:
+        return float("nan")
+    k = (len(xs) - 1) * q / 100.0
+    lo, hi = math.floor(k), math.ceil(k)
+    return xs[lo] + (xs[hi] - xs[lo]) * (k - lo)
+
+def summarize(out: str, planners=PLANNERS) -> Dict:
+    """Merge shard files under out into summary.json."""
+    summary = {}
+    for planner in planners:
+        recs = [json.loads(line) for p in sorted(Path(out).glob(f"{planner}.shard*.jsonl"))
+                for line in p.open(encoding="utf-8")]
+        if not recs:
+            continue
+        n = len(recs)
+        ms = [r["ms"] for r in recs]
+        summary[planner] = {
+            "n": n,
+            "exact_match": sum(r["exact"] for r in recs) / n,
+            "step_accuracy": sum(r["step_acc"] for r in recs) / n,
+            "validity_rate": sum(r["valid"] for r in recs) / n,
+            "fallback_rate": sum(r["fallback"] for r in recs) / n,
+            **{f"latency_p{q}_ms": _pct(ms, q) for q in _LATENCY_PCTS},
+            "tokens_mean": sum(r["tokens"] for r in recs) / n,
+        }
+        meta = Path(out) / f"{planner}.meta.json"
+        if meta.exists():
+            summary[planner].update(json.loads(meta.read_text()))
+    (Path(out) / "summary.json").write_text(json.dumps(summary, indent=2))
+    return summary
+
+def compare(new: Dict, old: Dict):
+    for planner, m in new.items():
+        if planner not in old:
+            continue
+        print(f"{planner}:")
+        for k, v in m.items():
+            if isinstance(v, (int, float)) and isinstance(old[planner].get(k), (int, float)):
+                print(f"  {k:<18} {old[planner][k]:>10.4g} -> {v:<10.4g} ({v - old[planner][k]:+.4g})")
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--data", default=str(ROOT / "data" / "val.jsonl"))
+    ap.add_argument("--out", default=str(ROOT / "reports" / "eval"))
+    ap.add_argument("--planners", nargs="+", choices=PLANNERS, default=list(PLANNERS))
+    ap.add_argument("--limit", type=int, default=None, help="only the first N examples")
+    ap.add_argument("--workers", type=int, default=1, help="local processes, one shard each")
+    ap.add_argument("--shard", type=int, default=None, help="run only this shard (with --num-shards)")
+    ap.add_argument("--num-shards", type=int, default=None)
+    ap.add_argument("--merge", action="store_true", help="only merge existing shard files")
+    ap.add_argument("--compare", default=None, help="earlier summary.json to diff against")
+    args = ap.parse_args()
+
+    if not args.merge:
+        for planner in args.planners:
+            if args.shard is not None:
+                run_shard(planner, args.data, args.out, args.shard, args.num_shards or 1, args.limit)
+            else:
+                for old in Path(args.out).glob(f"{planner}.shard*.jsonl"):
+                    old.unlink()  # a previous run may have used more shards
+                n = max(1, args.workers)
+                with mp.get_context("spawn").Pool(n) as pool:
+                    pool.starmap(run_shard, [(planner, args.data, args.out, i, n, args.limit) for i in range(n)])
+            (Path(args.out) / f"{planner}.meta.json").write_text(json.dumps(_meta(planner)))
+        if args.shard is not None:
+            return  # --merge once every shard is done
+
+    summary = summarize(args.out, args.planners)
+    print(json.dumps(summary, indent=2))
+    if args.compare:
+        compare(summary, json.loads(Path(args.compare).read_text()))
+
+if __name__ == "__main__":
+    main()
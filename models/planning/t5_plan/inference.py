@@ -1,19 +1,45 @@
 import os, uuid
 from pathlib import Path
-from typing import Dict, Tuple
+from typing import Dict, List, Sequence, Tuple
 import torch
 
-from transformers import T5ForConditionalGeneration, T5TokenizerFast
 from .validate_and_decode import decode_and_validate
+from .plan_cache import PlanCache, make_key, pose_bucket, checkpoint_revision
+from .batching import MicroBatcher
+from .constrained import PlanConstraint
+from .backends import load_seq2seq, revision_suffix
+from .prompts import checkpoint_format, compact_prompt
 
 # Try to load fine-tuned model if present; otherwise fall back to base and few-shot examples
 _THIS_DIR = Path(__file__).resolve().parent
 _FINETUNED_DIR = _THIS_DIR / "t5-plan"
 _BASE_NAME = "t5-small"
 
+# "torch" (fp32), "int8", "onnx" or "onnx-int8"; see backends.py
+BACKEND = "torch"
+
 _tok = None
 _model = None
 _loaded = False
+_prompt_format = "full"
+
+# Plans are cached per instruction + context + checkpoint revision (see plan_cache.py)
+_CACHE_PATH = _THIS_DIR.parents[2] / "data" / "plan_cache.sqlite"
+_cache: PlanCache = None
+_revision = None
+
+GEN_KWARGS = dict(max_new_tokens=256, num_beams=4, early_stopping=True, no_repeat_ngram_size=3)
+
+# "beam": unconstrained beam search with GEN_KWARGS, validated afterwards.
+# "constrained": greedy decoding restricted to tokens that keep the output a
+# valid plan (see constrained.py), starting from a forced prefix. Opt-in
+# until benchmarks/bench_t5_decoding.py has been run on a trained checkpoint.
+DECODING = "beam"
+CONSTRAINED_GEN_KWARGS = dict(max_new_tokens=256, num_beams=1, do_sample=False)
+# Boilerplate every plan starts with; plan_id is replaced after decoding
+CONSTRAINED_PREFIX = '{"plan_id": "0", "steps": [{"op": "'
+_constraint: PlanConstraint = None
+_prefix_ids: List[int] = None
 
 FEW_SHOT_HEADER = (
     "You are a planner. Convert the instruction and context to a STRICT JSON plan.\n"
@@ -29,20 +55,57 @@ FEW_SHOT_HEADER = (
 )
 
 def _ensure_loaded():
-    global _tok, _model, _loaded
+    global _tok, _model, _loaded, _prompt_format
     if _loaded: return
     if _FINETUNED_DIR.exists() and (_FINETUNED_DIR / "config.json").exists():
-        _tok = T5TokenizerFast.from_pretrained(str(_FINETUNED_DIR))
-        _model = T5ForConditionalGeneration.from_pretrained(str(_FINETUNED_DIR))
+        _tok, _model = load_seq2seq(str(_FINETUNED_DIR), BACKEND)
+        _prompt_format = checkpoint_format(_FINETUNED_DIR)
     else:
-        _tok = T5TokenizerFast.from_pretrained(_BASE_NAME)
-        _model = T5ForConditionalGeneration.from_pretrained(_BASE_NAME)
-    _model.eval()
+        _tok, _model = load_seq2seq(_BASE_NAME, BACKEND)
+        _prompt_format = "full"
     _loaded = True
 
+def set_backend(backend: str):
+    """Switch backends; the model is reloaded on the next call."""
+    global BACKEND, _tok, _model, _loaded, _constraint, _prefix_ids, _revision
+    BACKEND = backend
+    _tok = _model = _constraint = _prefix_ids = _revision = None
+    _loaded = False
+
+def model_revision() -> str:
+    """Fingerprint of the checkpoint nl_to_plan would load; computed once per process."""
+    global _revision
+    if _revision is None:
+        if _FINETUNED_DIR.exists() and (_FINETUNED_DIR / "config.json").exists():
+            _revision = "t5-plan:" + checkpoint_revision(_FINETUNED_DIR)
+        else:
+            _revision = _BASE_NAME
+        _revision += revision_suffix(BACKEND)
+    return _revision
+
+def plan_cache() -> PlanCache:
+    global _cache
+    if _cache is None:
+        _cache = PlanCache(str(_CACHE_PATH))
+    return _cache
+
+def _get_constraint() -> Tuple[PlanConstraint, List[int]]:
+    """Constraint for the loaded tokenizer and the decoder ids of CONSTRAINED_PREFIX (built once)."""
+    global _constraint, _prefix_ids
+    if _constraint is None:
+        c = PlanConstraint(_tok)
+        start = [_model.config.decoder_start_token_id]
+        ids = start + _tok(CONSTRAINED_PREFIX, add_special_tokens=False).input_ids
+        # Use the prefix only if it tokenizes to text the grammar accepts
+        _prefix_ids = ids if c.state(ids[1:])[0] is not None else start
+        _constraint = c
+    return _constraint, _prefix_ids
+
 def _build_prompt(instr: str, pose: Tuple[float,float,float],
                   goal_library: Dict[str, Tuple[float,float]],
                   constraints: Dict):
+    if _prompt_format == "compact":
+        return compact_prompt(instr, pose, goal_library, constraints)
     gl = "; ".join([f"{k}=({v[0]},{v[1]})" for k,v in goal_library.items()])
     avoid = constraints.get("avoid", [])
     speed = constraints.get("speed_limit", 0.5)
@@ -56,40 +119,145 @@ def _build_prompt(instr: str, pose: Tuple[float,float,float],
     )
     return prompt
 
-@torch.inference_mode()
+def _cache_key(instr, pose, goal_library, constraints, decoding) -> str:
+    # Goals keep their order: it shapes the prompt and picks the fallback goal
+    return make_key("nl_to_plan", instr, model_revision(), pose=pose_bucket(pose),
+                    goals=[(k, list(v)) for k, v in goal_library.items()], constraints=constraints,
+                    decoding=decoding)
+
+def _fallback_plan(goal_library, constraints) -> Dict:
+    try:
+        gx, gy = next(iter(goal_library.values()))
+    except StopIteration:
+        gx, gy = 0.0, 0.0
+    return {
+        "plan_id": str(uuid.uuid4()),
+        "steps": [{"op":"goto","x":float(gx),"y":float(gy)}, {"op":"stop"}],
+        "constraints": {
+            "avoid": constraints.get("avoid", []),
+            "speed_limit": float(constraints.get("speed_limit", 0.5))
+        }
+    }
+
+def _decode(text, goal_library, constraints) -> Tuple[Dict, bool]:
+    """(plan, True) if text validates, else (fallback plan, False)."""
+    try:
+        return decode_and_validate(text), True
+    except Exception:
+        return _fallback_plan(goal_library, constraints), False
+
 def nl_to_plan(instr: str,
                pose: Tuple[float,float,float],
                goal_library: Dict[str, Tuple[float,float]],
-               constraints: Dict) -> Dict:
+               constraints: Dict,
+               use_cache: bool = True,
+               decoding: str = None) -> Dict:
     """
     Returns a dict matching PLAN_SCHEMA. On failure, returns a conservative fallback plan.
+    Validated plans are cached; fallbacks are not, so a later call can still succeed.
+    decoding: "constrained" or "beam"; defaults to DECODING.
     """
+    decoding = decoding or DECODING
+    key = None
+    if use_cache:
+        key = _cache_key(instr, pose, goal_library, constraints, decoding)
+        plan = plan_cache().get(key)
+        if plan is not None:
+            return plan
+    plan, ok = _generate_plan(instr, pose, goal_library, constraints, decoding)
+    if ok and key is not None:
+        plan_cache().put(key, plan)
+    return plan
+
+def _generate_plan(instr, pose, goal_library, constraints, decoding=DECODING) -> Tuple[Dict, bool]:
+    """(plan, True) from the model, or (fallback plan, False) when its output does not validate."""
+    text = _generate_text(instr, pose, goal_library, constraints, decoding)
+    return _decode_generated(text, goal_library, constraints, decoding)
+
+@torch.inference_mode()
+def _generate_text(instr, pose, goal_library, constraints, decoding=DECODING) -> str:
+    """Raw plan text the model generates for one request."""
     _ensure_loaded()
     prompt = _build_prompt(instr, pose, goal_library, constraints)
-    ids = _tok(prompt, return_tensors="pt", truncation=True).input_ids
-    out = _model.generate(
-        ids,
-        max_new_tokens=256,
-        num_beams=4,
-        early_stopping=True,
-        no_repeat_ngram_size=3
-    )
-    text = _tok.decode(out[0], skip_special_tokens=True)
+    enc = _tok(prompt, return_tensors="pt", truncation=True)
+    return _run_generate(enc, decoding)[0]
 
-    # Try strict decode; if it fails, produce a safe fallback
-    try:
-        plan = decode_and_validate(text)
-        return plan
-    except Exception:
-        try:
-            gx, gy = next(iter(goal_library.values()))
-        except StopIteration:
-            gx, gy = 0.0, 0.0
-        return {
-            "plan_id": str(uuid.uuid4()),
-            "steps": [{"op":"goto","x":float(gx),"y":float(gy)}, {"op":"stop"}],
-            "constraints": {
-                "avoid": constraints.get("avoid", []),
-                "speed_limit": float(constraints.get("speed_limit", 0.5))
-            }
-        }
+def _run_generate(enc, decoding) -> List[str]:
+    """Generated plan text for each row of a tokenized batch."""
+    return _ids_to_text(_generate_ids(enc, decoding), decoding)
+
+@torch.inference_mode()
+def _generate_ids(enc, decoding):
+    """Decoder token ids generate() returns for a tokenized batch (forced prefix included)."""
+    if decoding != "constrained":
+        return _model.generate(input_ids=enc.input_ids, attention_mask=enc.attention_mask, **GEN_KWARGS)
+    c, prefix = _get_constraint()
+    start = torch.tensor([prefix] * enc.input_ids.shape[0], dtype=torch.long)
+    return _model.generate(input_ids=enc.input_ids, attention_mask=enc.attention_mask, decoder_input_ids=start,
+                           prefix_allowed_tokens_fn=c, **CONSTRAINED_GEN_KWARGS)
+
+def _ids_to_text(out, decoding) -> List[str]:
+    if decoding != "constrained":
+        return _tok.batch_decode(out, skip_special_tokens=True)
+    # tokenizer.decode() would drop the <unk>s that stand for braces; rebuild the text from the grammar
+    c, _ = _get_constraint()
+    return [c.text(row.tolist()) for row in out]
+
+def _decode_generated(text, goal_library, constraints, decoding) -> Tuple[Dict, bool]:
+    plan, ok = _decode(text, goal_library, constraints)
+    if ok and decoding == "constrained":
+        plan["plan_id"] = str(uuid.uuid4())  # the forced prefix pins it to "0"
+    return plan, ok
+
+def nl_to_plan_batch(requests: Sequence[Dict], batch_size: int = 8, use_cache: bool = True,
+                     decoding: str = None) -> List[Dict]:
+    """
+    nl_to_plan over many requests at once. Each request is a dict with
+    instr, pose, goal_library and constraints (same meaning as nl_to_plan).
+    Prompts are sorted by token length and generated batch_size at a time
+    with padding, so similar lengths share a batch and little compute goes
+    to pad tokens. Every output is validated on its own; items that fail
+    get the same fallback plan nl_to_plan would return. Results keep the
+    order of requests.
+    """
+    decoding = decoding or DECODING
+    results: List[Dict] = [None] * len(requests)
+    keys = [None] * len(requests)
+    todo = []
+    for i, r in enumerate(requests):
+        if use_cache:
+            keys[i] = _cache_key(r["instr"], r["pose"], r["goal_library"], r["constraints"], decoding)
+            plan = plan_cache().get(keys[i])
+            if plan is not None:
+                results[i] = plan
+                continue
+        todo.append(i)
+    if not todo:
+        return results
+
+    _ensure_loaded()
+    prompts = {i: _build_prompt(requests[i]["instr"], requests[i]["pose"],
+                                requests[i]["goal_library"], requests[i]["constraints"]) for i in todo}
+    lengths = {i: len(ids) for i, ids in zip(todo, _tok([prompts[i] for i in todo], truncation=True).input_ids)}
+    todo.sort(key=lengths.__getitem__)
+    for s in range(0, len(todo), batch_size):
+        group = todo[s:s + batch_size]
+        for i, text in zip(group, _generate_batch([prompts[i] for i in group], decoding)):
+            r = requests[i]
+            plan, ok = _decode_generated(text, r["goal_library"], r["constraints"], decoding)
+            results[i] = plan
+            if ok and keys[i] is not None:
+                plan_cache().put(keys[i], plan)
+    return results
+
+@torch.inference_mode()
+def _generate_batch(prompts: List[str], decoding=DECODING) -> List[str]:
+    enc = _tok(prompts, return_tensors="pt", padding=True, truncation=True)
+    return _run_generate(enc, decoding)
+
+def micro_batcher(max_batch: int = 8, max_wait_ms: float = 5.0) -> MicroBatcher:
+    """
+    Queue that gathers concurrent nl_to_plan requests (dicts as in
+    nl_to_plan_batch) for a few ms and serves them as one batch.
+    """
+    return MicroBatcher(lambda reqs: nl_to_plan_batch(reqs, batch_size=max_batch), max_batch, max_wait_ms)
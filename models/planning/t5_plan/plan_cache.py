@@ -0,0 +1,139 @@
+import hashlib, json, os, re, sqlite3, threading, time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+# Context that only changes the plan when it moves by more than this is bucketed
+POSE_BUCKET_M = 0.25
+THETA_BUCKET_DEG = 15.0
+
+def normalize_instruction(text: str) -> str:
+    """Case, whitespace and trailing punctuation do not change the plan."""
+    t = re.sub(r"\s+", " ", str(text).strip().lower())
+    return t.rstrip(" .!?;,")
+
+def pose_bucket(pose) -> Tuple[int, int, int]:
+    x, y, th = (list(pose) + [0.0, 0.0, 0.0])[:3]
+    return (round(float(x) / POSE_BUCKET_M), round(float(y) / POSE_BUCKET_M),
+            round(float(th) / THETA_BUCKET_DEG))
+
+def checkpoint_revision(path) -> str:
+    """
+    Cheap fingerprint of a model checkpoint directory: names, sizes and
+    mtimes of its files plus the contents of config.json. Retraining or
+    replacing the checkpoint changes it, so cached plans go stale with it.
+    """
+    p = Path(path)
+    if not p.is_dir():
+        return str(path)
+    h = hashlib.sha1()
+    for f in sorted(p.iterdir()):
+        if f.is_file():
+            st = f.stat()
+            h.update(f"{f.name}:{st.st_size}:{st.st_mtime_ns};".encode())
+    cfg = p / "config.json"
+    if cfg.exists():
+        h.update(cfg.read_bytes())
+    return h.hexdigest()[:16]
+
+def make_key(kind: str, instruction: str, revision: str, **context) -> str:
+    """Cache key from the normalized instruction, the model revision and any context that shapes the plan."""
+    payload = json.dumps([kind, normalize_instruction(instruction), revision, context], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class PlanCache:
+    """
+    Two-level plan cache: an in-memory LRU in front of a SQLite file.
+    Entries expire after ttl_s; the memory level holds at most capacity
+    entries and the disk level about disk_capacity (trimmed every 100 puts,
+    soonest-expiring first).
+    Plans are stored as JSON, so every get() returns a fresh copy.
+
+    hits_mem / hits_disk / misses count lookups; see stats().
+    """
+
+    def __init__(self, path: Optional[str] = None, capacity: int = 256, ttl_s: float = 7 * 24 * 3600.0,
+                 disk_capacity: int = 10000):
+        self.capacity = int(capacity)
+        self.ttl_s = float(ttl_s)
+        self.disk_capacity = int(disk_capacity)
+        self._mem: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._puts = 0
+        self.hits_mem = self.hits_disk = self.misses = 0
+        self._db = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._db = sqlite3.connect(path, timeout=5.0, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS plans (key TEXT PRIMARY KEY, plan TEXT NOT NULL, expires REAL NOT NULL)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS plans_expires ON plans (expires)")
+            self._db.execute("DELETE FROM plans WHERE expires <= ?", (time.time(),))
+            self._db.commit()
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            hit = self._mem.get(key)
+            if hit is not None:
+                if hit[0] > now:
+                    self._mem.move_to_end(key)
+                    self.hits_mem += 1
+                    return json.loads(hit[1])
+                del self._mem[key]
+            if self._db is not None:
+                row = self._db.execute("SELECT plan, expires FROM plans WHERE key = ? AND expires > ?",
+                                       (key, now)).fetchone()
+                if row is not None:
+                    self._remember(key, row[1], row[0])
+                    self.hits_disk += 1
+                    return json.loads(row[0])
+            self.misses += 1
+            return None
+
+    def put(self, key: str, plan: Any):
+        text = json.dumps(plan)
+        expires = time.time() + self.ttl_s
+        with self._lock:
+            self._remember(key, expires, text)
+            if self._db is None:
+                return
+            self._db.execute("INSERT OR REPLACE INTO plans (key, plan, expires) VALUES (?, ?, ?)", (key, text, expires))
+            self._puts += 1
+            if self._puts % 100 == 0:
+                self._evict_disk()
+            self._db.commit()
+
+    def _remember(self, key, expires, text):
+        self._mem[key] = (expires, text)
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.capacity:
+            self._mem.popitem(last=False)
+
+    def _evict_disk(self):
+        self._db.execute("DELETE FROM plans WHERE expires <= ?", (time.time(),))
+        self._db.execute(
+            "DELETE FROM plans WHERE key IN (SELECT key FROM plans ORDER BY expires DESC LIMIT -1 OFFSET ?)",
+            (self.disk_capacity,))
+
+    def clear(self):
+        with self._lock:
+            self._mem.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM plans")
+                self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits_mem + self.hits_disk + self.misses
+        return {
+            "hits_mem": self.hits_mem,
+            "hits_disk": self.hits_disk,
+            "misses": self.misses,
+            "hit_rate": (self.hits_mem + self.hits_disk) / lookups if lookups else 0.0,
+            "mem_entries": len(self._mem),
+        }
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
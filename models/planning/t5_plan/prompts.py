@@ -0,0 +1,45 @@
+"""
+Prompt formats for the T5 planner.
+
+"full" is the scaffold synth_data.py writes (INSTRUCTION / ROBOT_STATE /
+GOAL_LIBRARY / CONSTRAINTS sections). "compact" carries the same fields in
+a fraction of the tokens:
+
+    plan: go to station_a | pose 0.0 0.0 0 | goals station_a 0.8 0.9; door 0.0 -1.2 | speed 0.5 avoid wet_floor
+
+t5_model.py --compact-prompt trains on it and records the format in the
+checkpoint (FORMAT_FILE), so inference.py builds matching prompts.
+"""
+import ast, json, re
+from pathlib import Path
+from typing import Dict, Tuple
+
+FORMATS = ("full", "compact")
+FORMAT_FILE = "prompt_format.json"
+
+def parse_input_text(text: str) -> Dict:
+    """instr, pose, goal_library and constraints from a full-format prompt."""
+    section = lambda name: text.split(f"{name}:\n", 1)[1].split("\n\n", 1)[0].strip()
+    x, y, th = (float(v) for v in re.findall(r"=(-?[\d.]+)", section("ROBOT_STATE"))[:3])
+    goals = {k: (float(a), float(b))
+             for k, a, b in re.findall(r"(\w+)=\((-?[\d.]+),\s*(-?[\d.]+)\)", section("GOAL_LIBRARY"))}
+    cons = section("CONSTRAINTS")
+    speed = float(re.search(r"speed_limit=(-?[\d.]+)", cons).group(1))
+    avoid = ast.literal_eval(re.search(r"avoid=(\[.*?\])", cons).group(1))
+    return {"instr": section("INSTRUCTION"), "pose": (x, y, th), "goal_library": goals,
+            "constraints": {"avoid": avoid, "speed_limit": speed}}
+
+def compact_prompt(instr: str, pose: Tuple[float, float, float], goal_library: Dict, constraints: Dict) -> str:
+    goals = "; ".join(f"{k} {v[0]} {v[1]}" for k, v in goal_library.items())
+    avoid = ",".join(constraints.get("avoid", [])) or "-"
+    return (f"plan: {instr} | pose {pose[0]} {pose[1]} {pose[2]} | goals {goals} | "
+            f"speed {constraints.get('speed_limit', 0.5)} avoid {avoid}")
+
+def compact_input(text: str) -> str:
+    """Rewrite a full-format prompt (a dataset input_text) in the compact format."""
+    return compact_prompt(**parse_input_text(text))
+
+def checkpoint_format(path) -> str:
+    """Prompt format a checkpoint was trained on ("full" when it does not say)."""
+    f = Path(path) / FORMAT_FILE
+    return json.loads(f.read_text())["format"] if f.exists() else "full"
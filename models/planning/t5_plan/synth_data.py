@@ -1,6 +1,30 @@
-import json, random, uuid, argparse, os
+"""
+Synthetic (input_text, target_text) pairs for the T5 planner.
+
+Output is a pure function of --seed and --shards: shard i of a split draws
+from its own Random seeded with (seed, split, i), plan_ids included, so
+the same command always writes the same files whatever --workers is.
+Shards are generated in a process pool and streamed to disk, then
+concatenated into the split's file (--keep-shards leaves the parts).
+
+--dedup keeps each instruction once per split and never in two splits.
+The distinct instructions (every template with every value of the fields
+it uses) are assigned by hash to a split (--val-frac of them to val) and
+to a shard; each shard enumerates the space lazily, keeps only its own
+slice and samples it without replacement, so no shard generates examples
+it throws away and nothing holds the whole space. A shard writes fewer
+examples if its slice runs out.
+
+--library points at a JSON file {"rooms": {name: [x, y]}, "templates": [...]}
+to replace the built-in ROOMS / TEMPLATES. Templates can use {dst}, {face},
+{secs} and {angle}.
+"""
+import json, random, uuid, argparse, hashlib, itertools, os, shutil
+from multiprocessing import Pool
 from pathlib import Path
 
+ROOT = Path(__file__).resolve().parents[3]
+
 ROOMS = {
     "charging_dock": (1.5,-0.7), "conveyor_belt": (1.3,-0.4),
     "station_a": (0.8,0.9), "station_b": (-0.6,0.4), "door": (0.0,-1.2)
@@ -15,29 +39,42 @@ TEMPLATES = [
     "go to {dst} then face {angle} degrees",
 ]
 
-def make_example():
-    dst = random.choice(list(ROOMS))
-    face = random.choice(list(ROOMS))
-    secs = random.choice([2,3,5,10])
-    angle = random.choice([0,90,180,-90])
-    tpl = random.choice(TEMPLATES)
+SECS = [2, 3, 5, 10]
+ANGLES = [0, 90, 180, -90]
+FIELDS = ("dst", "face", "secs", "angle")
+
+def load_library(path):
+    """(rooms, templates) from a JSON library file; missing keys keep the built-ins."""
+    lib = json.loads(Path(path).read_text(encoding="utf-8"))
+    rooms = {k: tuple(v) for k, v in lib.get("rooms", ROOMS).items()}
+    return rooms, list(lib.get("templates", TEMPLATES))
+
+def make_example(rng=random, rooms=ROOMS, templates=TEMPLATES):
+    dst = rng.choice(list(rooms))
+    face = rng.choice(list(rooms))
+    secs = rng.choice(SECS)
+    angle = rng.choice(ANGLES)
+    tpl = rng.choice(templates)
+    return _example(rng, tpl, rooms, dst=dst, face=face, secs=secs, angle=angle)
+
+def _example(rng, tpl, rooms, dst, face, secs, angle):
     instr = tpl.format(dst=dst, face=face, secs=secs, angle=angle)
 
     speed_limit = 0.3 if "slow" in instr else 0.5
     avoid = ["wet_floor"] if "avoiding" in instr else []
 
-    steps = [{"op":"goto","x":ROOMS[dst][0],"y":ROOMS[dst][1]}]
+    steps = [{"op":"goto","x":rooms[dst][0],"y":rooms[dst][1]}]
     if "face" in instr:
         if "{angle}" in tpl:
             steps.append({"op":"face","theta_deg": angle})
         else:
-            steps.append({"op":"face","theta_deg": random.choice([0,90,180,-90])})
+            steps.append({"op":"face","theta_deg": rng.choice([0,90,180,-90])})
     if "wait" in instr:
         steps.append({"op":"wait","seconds":secs})
-    if "stop" in instr or random.random() < 0.7:
+    if "stop" in instr or rng.random() < 0.7:
         steps.append({"op":"stop"})
 
-    goal_lib = "; ".join([f"{k}=({v[0]},{v[1]})" for k,v in ROOMS.items()])
+    goal_lib = "; ".join([f"{k}=({v[0]},{v[1]})" for k,v in rooms.items()])
     input_text = (
         f"INSTRUCTION:\n{instr}\n\n"
         f"ROBOT_STATE:\npose=(x=0.0,y=0.0,theta=0deg)\n\n"
@@ -47,27 +84,120 @@ def make_example():
     )
 
     target_text = json.dumps({
-        "plan_id": str(uuid.uuid4()),
+        "plan_id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
         "steps": steps,
         "constraints": {"avoid": avoid, "speed_limit": speed_limit}
     }, ensure_ascii=False)
 
     return {"input_text": input_text, "target_text": target_text}
 
-def dump(n: int, path: Path):
-    path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("w", encoding="utf-8") as f:
+def _instr_hash(instr: str) -> int:
+    return int.from_bytes(hashlib.blake2b(instr.encode("utf-8"), digest_size=8).digest(), "little")
+
+def instruction_space(rooms=ROOMS, templates=TEMPLATES, shard=0, n_shards=1, span=(0.0, 1.0)):
+    """
+    Lazily yields (template, fields) for the distinct instructions in one
+    slice of the space: those whose hash falls in span (a [lo, hi) fraction,
+    i.e. the split) and in shard of n_shards. Only the fields the template
+    uses are fixed, the others are drawn when the example is built.
+    """
+    values = {"dst": list(rooms), "face": list(rooms), "secs": SECS, "angle": ANGLES}
+    lo, hi = span
+    seen = set()
+    for tpl in templates:
+        used = [k for k in FIELDS if "{" + k + "}" in tpl]
+        for combo in itertools.product(*(values[k] for k in used)):
+            fields = dict(zip(used, combo))
+            instr = tpl.format(**{**dict.fromkeys(FIELDS, ""), **fields})
+            h = _instr_hash(instr)
+            # High bits pick the split, low bits the shard, so the two are independent
+            if not lo <= (h >> 32) / 2 ** 32 < hi or (h & 0xFFFFFFFF) % n_shards != shard or instr in seen:
+                continue
+            seen.add(instr)
+            yield tpl, fields
+
+def _examples(rng, n, space, rooms, templates):
+    if space is None:
         for _ in range(n):
-            ex = make_example()
-            f.write(json.dumps(ex)+"\n")
+            yield make_example(rng, rooms, templates)
+        return
+    # Without replacement: a partial Fisher-Yates shuffle of this shard's instructions
+    space = list(space)
+    for i in range(min(n, len(space))):
+        j = rng.randrange(i, len(space))
+        space[i], space[j] = space[j], space[i]
+        tpl, fields = space[i]
+        drawn = {"dst": rng.choice(list(rooms)), "face": rng.choice(list(rooms)),
+                 "secs": rng.choice(SECS), "angle": rng.choice(ANGLES)}
+        yield _example(rng, tpl, rooms, **{**drawn, **fields})
+
+def write_shard(job) -> int:
+    """Generate one shard to its file; returns the number of examples written."""
+    path, n, seed, split, shard, n_shards, span, rooms, templates = job
+    rng = random.Random(f"{seed}:{split}:{shard}")
+    space = instruction_space(rooms, templates, shard, n_shards, span) if span is not None else None
+    written = 0
+    buf = []
+    with open(path, "w", encoding="utf-8") as f:
+        for ex in _examples(rng, n, space, rooms, templates):
+            buf.append(json.dumps(ex) + "\n")
+            written += 1
+            if len(buf) >= 4096:
+                f.writelines(buf)
+                buf.clear()
+        f.writelines(buf)
+    return written
+
+def dump(n: int, path: Path, seed: int = 0, shards: int = 1, workers: int = 1, dedup: bool = False,
+         rooms=ROOMS, templates=TEMPLATES, keep_shards: bool = False, split: str = None,
+         span=(0.0, 1.0)) -> int:
+    """
+    Write n examples to path in shards (see module docstring); returns the
+    number written. With dedup, span is the [lo, hi) share of the
+    instruction space this split draws from.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    split = split or path.stem
+    sizes = [n // shards + (i < n % shards) for i in range(shards)]
+    parts = [path.with_name(f"{path.stem}-{i:05d}-of-{shards:05d}{path.suffix}") for i in range(shards)]
+    jobs = [(str(p), k, seed, split, i, shards, span if dedup else None, rooms, templates)
+            for i, (p, k) in enumerate(zip(parts, sizes))]
+    if workers > 1 and shards > 1:
+        with Pool(min(workers, shards)) as pool:
+            counts = pool.map(write_shard, jobs)
+    else:
+        counts = [write_shard(j) for j in jobs]
+
+    with path.open("wb") as out:
+        for p in parts:
+            with p.open("rb") as f:
+                shutil.copyfileobj(f, out, 1 << 20)
+            if not keep_shards:
+                os.remove(p)
+    written = sum(counts)
+    if written < n:
+        print(f"{path}: only {written} of {n} unique instructions")
+    return written
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--n-train", type=int, default=8000)
     parser.add_argument("--n-val", type=int, default=1000)
-    parser.add_argument("--out-train", type=Path, default=Path("../../data/train.jsonl"))
-    parser.add_argument("--out-val", type=Path, default=Path("../../data/val.jsonl"))
+    parser.add_argument("--out-train", type=Path, default=ROOT / "data" / "train.jsonl")
+    parser.add_argument("--out-val", type=Path, default=ROOT / "data" / "val.jsonl")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--shards", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--dedup", action="store_true", help="keep each instruction once, in one split only")
+    parser.add_argument("--val-frac", type=float, default=0.2, help="share of instructions held out for val with --dedup")
+    parser.add_argument("--library", type=Path, default=None, help="JSON file with rooms and templates")
+    parser.add_argument("--keep-shards", action="store_true")
     args = parser.parse_args()
 
-    dump(args.n_train, Path(__file__).resolve().parent.joinpath(args.out-train).resolve())
-    dump(args.n_val,   Path(__file__).resolve().parent.joinpath(args.out-val).resolve())
+    rooms, templates = load_library(args.library) if args.library else (ROOMS, TEMPLATES)
+    cut = 1.0 - args.val_frac
+    for split, n, out, span in (("train", args.n_train, args.out_train, (0.0, cut)),
+                                ("val", args.n_val, args.out_val, (cut, 1.0))):
+        dump(n, out, seed=args.seed, shards=args.shards, workers=args.workers, dedup=args.dedup,
+             rooms=rooms, templates=templates, keep_shards=args.keep_shards, split=split, span=span)
@@ -1,33 +1,99 @@
+import argparse, hashlib, json, sys, time
 from pathlib import Path
-from datasets import load_dataset
+from datasets import load_dataset, load_from_disk
 from transformers import (
     T5ForConditionalGeneration, T5TokenizerFast,
-    DataCollatorForSeq2Seq, Trainer, TrainingArguments
+    DataCollatorForSeq2Seq, Trainer, Seq2SeqTrainingArguments, TrainerCallback
 )
 
-ROOT = Path(__file__).resolve().parents[3]  
+ROOT = Path(__file__).resolve().parents[3]
+# Works both as a script (python models/planning/t5_plan/t5_model.py) and imported as a package module
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+from models.planning.t5_plan.prompts import FORMAT_FILE, compact_input
 DATA_TRAIN = ROOT / "data/train.jsonl"
 DATA_VAL   = ROOT / "data/val.jsonl"
 OUT_DIR    = Path(__file__).resolve().parent / "t5-plan"
+# Tokenized datasets, one directory per (tokenizer, data, prompt format)
+CACHE_DIR  = ROOT / "data/tokenized"
 
 MODEL_NAME = "t5-small"
+MAX_SOURCE_LEN = 512
+MAX_TARGET_LEN = 384
 
-def main():
-    tok = T5TokenizerFast.from_pretrained(MODEL_NAME)
-    model = T5ForConditionalGeneration.from_pretrained(MODEL_NAME)
+def _file_hash(path: Path) -> str:
+    h = hashlib.sha1()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def cache_key(tok, prompt_format: str) -> str:
+    """Changes with the tokenizer, either data file, the prompt format or the length limits."""
+    h = hashlib.sha1()
+    h.update(json.dumps([tok.name_or_path, type(tok).__name__, len(tok), prompt_format,
+                         MAX_SOURCE_LEN, MAX_TARGET_LEN]).encode())
+    for p in (DATA_TRAIN, DATA_VAL):
+        h.update(_file_hash(p).encode())
+    return h.hexdigest()[:16]
+
+def tokenized_dataset(tok, prompt_format: str = "full", rebuild: bool = False):
+    """
+    Train/val tokenized once and saved under CACHE_DIR; later runs load it
+    from disk. A "length" column (source + target tokens) feeds the
+    length-grouped sampler and the tokens/sec count.
+    """
+    path = CACHE_DIR / cache_key(tok, prompt_format)
+    if path.exists() and not rebuild:
+        return load_from_disk(str(path))
 
     ds = load_dataset("json", data_files={"train": str(DATA_TRAIN), "val": str(DATA_VAL)})
 
     def tok_fn(batch):
-        x = tok(batch["input_text"], max_length=512, truncation=True)
-        y = tok(batch["target_text"], max_length=384, truncation=True)
+        src = batch["input_text"]
+        if prompt_format == "compact":
+            src = [compact_input(t) for t in src]
+        x = tok(src, max_length=MAX_SOURCE_LEN, truncation=True)
+        y = tok(batch["target_text"], max_length=MAX_TARGET_LEN, truncation=True)
         x["labels"] = y["input_ids"]
+        x["length"] = [len(a) + len(b) for a, b in zip(x["input_ids"], y["input_ids"])]
         return x
 
     ds_tok = ds.map(tok_fn, batched=True, remove_columns=ds["train"].column_names)
+    ds_tok.save_to_disk(str(path))
+    return ds_tok
+
+class TokensPerSecond(TrainerCallback):
+    """Logs real (non-padding) training tokens per second for each epoch."""
+
+    def __init__(self, tokens_per_epoch: int):
+        self.tokens_per_epoch = tokens_per_epoch
+        self._t0 = None
+
+    def on_epoch_begin(self, args, state, control, **kwargs):
+        self._t0 = time.perf_counter()
+
+    def on_epoch_end(self, args, state, control, **kwargs):
+        secs = time.perf_counter() - self._t0
+        rate = self.tokens_per_epoch / secs if secs > 0 else 0.0
+        state.log_history.append({"epoch": state.epoch, "epoch_secs": secs, "train_tokens_per_sec": rate})
+        print(f"epoch {state.epoch:.0f}: {secs:.1f} s, {rate:,.0f} tokens/s")
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--compact-prompt", action="store_true",
+                    help="train on the compact prompt format (see prompts.py) instead of the full scaffold")
+    ap.add_argument("--rebuild-cache", action="store_true", help="re-tokenize even if a cached dataset exists")
+    cli = ap.parse_args()
+    prompt_format = "compact" if cli.compact_prompt else "full"
+
+    tok = T5TokenizerFast.from_pretrained(MODEL_NAME)
+    model = T5ForConditionalGeneration.from_pretrained(MODEL_NAME)
+
+    ds_tok = tokenized_dataset(tok, prompt_format, rebuild=cli.rebuild_cache)
     dc = DataCollatorForSeq2Seq(tok, model=model)
 
-    args = TrainingArguments(
+    args = Seq2SeqTrainingArguments(
         output_dir=str(OUT_DIR),
         per_device_train_batch_size=8,
         per_device_eval_batch_size=8,
@@ -39,16 +105,21 @@ def main():
         logging_steps=50,
         predict_with_generate=False,
         fp16=False,
+        # Batches of similar lengths: far less padding than random batches
+        group_by_length=True,
+        length_column_name="length",
     )
 
     trainer = Trainer(
         model=model, args=args,
         train_dataset=ds_tok["train"], eval_dataset=ds_tok["val"],
-        data_collator=dc, tokenizer=tok
+        data_collator=dc, tokenizer=tok,
+        callbacks=[TokensPerSecond(sum(ds_tok["train"]["length"]))],
     )
     trainer.train()
     trainer.save_model(str(OUT_DIR))
     tok.save_pretrained(str(OUT_DIR))
+    (OUT_DIR / FORMAT_FILE).write_text(json.dumps({"format": prompt_format}))
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,284 @@
+"""
+Analyze every run in a log directory: a markdown report per run (the
+trajectory metrics from notebooks/log_vis.ipynb) plus a fleet summary table.
+
+Runs are parsed in parallel across a process pool. Per-run metrics are
+cached in <logs>/.analysis_cache.json keyed by file size/mtime, falling back
+to a content hash when those change, so unchanged runs are never re-parsed.
+Reads run_<ts>.json, streamed run_<ts>_NNN.jsonl parts and run_<ts>_tick/
+telemetry.
+
+Usage:
+    python tools/analyze_logs.py [--logs data/logs] [--out reports] [--workers N] [--plots] [--force]
+"""
+import argparse, csv, hashlib, json, os, re, sys, time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+import numpy as np
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(REPO_ROOT, "webots_project", "controllers", "roboai_controller"))
+from logger import read_events, read_telemetry
+
+CACHE_NAME = ".analysis_cache.json"
+CACHE_VERSION = 1
+_RUN_RE = re.compile(r"^(run_\d{8}_\d{6})(?:_\d{3}\.jsonl|\.json|_tick)$")
+
+# Discovery and cache keys
+def discover(log_dir) -> Dict[str, List[str]]:
+    """{run_id: [files]} for every run in log_dir; telemetry dirs contribute their .npy files."""
+    runs: Dict[str, List[str]] = {}
+    for name in sorted(os.listdir(log_dir)):
+        m = _RUN_RE.match(name)
+        if not m:
+            continue
+        p = os.path.join(log_dir, name)
+        files = runs.setdefault(m.group(1), [])
+        if os.path.isdir(p):
+            files.extend(sorted(os.path.join(p, f) for f in os.listdir(p) if f.endswith(".npy")))
+        else:
+            files.append(p)
+    return {k: v for k, v in runs.items() if any(not f.endswith(".npy") for f in v)}
+
+def signature(files) -> List[List[Any]]:
+    out = []
+    for f in files:
+        st = os.stat(f)
+        out.append([os.path.basename(f), st.st_size, st.st_mtime_ns])
+    return out
+
+def content_hash(files) -> str:
+    h = hashlib.sha1()
+    for f in files:
+        h.update(os.path.basename(f).encode())
+        with open(f, "rb") as fh:
+            for block in iter(lambda: fh.read(1 << 20), b""):
+                h.update(block)
+    return h.hexdigest()
+
+def load_cache(path) -> Dict[str, Any]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+        if cache.get("version") == CACHE_VERSION:
+            return cache
+    except (OSError, ValueError):
+        pass
+    return {"version": CACHE_VERSION, "runs": {}}
+
+def save_cache(path, cache):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(cache, f)
+    os.replace(tmp, path)
+
+# Metrics
+def load_run(files):
+    """(events, ticks) where ticks is {t, x, y, theta, ...} as float arrays."""
+    logs = [f for f in files if not f.endswith(".npy")]
+    events = read_events(logs[0])
+    tick_dir = next((os.path.dirname(f) for f in files if f.endswith(".npy")), None)
+    if tick_dir:
+        ticks = {k: np.asarray(v, dtype=float) for k, v in read_telemetry(tick_dir).items()}
+    else:
+        rows = [e for e in events if e.get("op") == "spa_tick"]
+        ticks = {k: np.array([float(e.get(k, 0.0)) for e in rows]) for k in ("t", "x", "y", "theta")}
+    return events, ticks
+
+def _moving_avg(a, k=7):
+    if len(a) == 0:
+        return a
+    k = max(1, min(k, len(a)))
+    return np.convolve(a, np.ones(k) / k, mode="same")
+
+def trajectory_metrics(events, ticks) -> Dict[str, Any]:
+    t, x, y = ticks.get("t"), ticks.get("x"), ticks.get("y")
+    if t is None or len(t) == 0:
+        return {"ticks": 0}
+    th = ticks.get("theta", np.zeros(len(t)))
+    t = t - t[0]
+    dist = float(np.hypot(np.diff(x), np.diff(y)).sum()) if len(x) > 1 else 0.0
+    dur = float(t[-1])
+    th_u = np.unwrap(th)
+
+    stall = osc = False
+    if len(t) > 1:
+        dt = np.diff(t)
+        dt[dt <= 0] = 1e-6
+        speed = _moving_avg(np.hypot(np.diff(x), np.diff(y)) / dt)
+        dth_dt = np.diff(th_u) / dt
+        if len(speed) > 5 and dur > 0:
+            low = speed < max(0.02, 0.02 * float(np.nanmax(speed)))
+            # Longest run of consecutive low-speed ticks
+            edges = np.diff(np.r_[0, low.astype(np.int8), 0])
+            longest = int((np.flatnonzero(edges == -1) - np.flatnonzero(edges == 1)).max(initial=0))
+            stall = longest * float(np.median(dt)) >= 1.5
+        if len(dth_dt) > 10:
+            flips = int(np.sum(np.abs(np.diff(np.sign(dth_dt))) > 1e-3))
+            osc = flips > 0.25 * len(dth_dt)
+
+    front = [e["front"] for e in events if e.get("op") == "spa_forward_tick" and "front" in e]
+    flags = [name for name, on in (("possible stall", stall), ("heading oscillation", osc)) if on]
+    return {
+        "ticks": int(len(t)),
+        "duration_s": dur,
+        "distance_m": dist,
+        "avg_speed_mps": dist / dur if dur > 1e-6 else 0.0,
+        "turns": sum(1 for e in events if e.get("op") == "turn_start"),
+        "heading_change_deg": float(np.degrees(np.abs(np.diff(th_u)).sum())),
+        "wait_s": float(sum(e.get("seconds", 0.0) for e in events if e.get("op") == "wait_done")),
+        "front_max": float(max(front)) if front else None,
+        "start": [float(x[0]), float(y[0])],
+        "end": [float(x[-1]), float(y[-1])],
+        "goto_failed": sum(1 for e in events if e.get("op") == "goto_failed"),
+        "errors": sum(1 for e in events if e.get("op") == "error"),
+        "flags": flags,
+    }
+
+# Reports
+def write_report(run_id, m, out_dir, img=None):
+    path = os.path.join(out_dir, f"{run_id}_report.md")
+    lines = [f"# Run analysis — {run_id}"]
+    if img:
+        lines.append(f"![trajectory]({os.path.basename(img)})")
+    if not m.get("ticks"):
+        lines += ["", "No per-tick data in this run."]
+    else:
+        bits = [
+            f"Over {m['duration_s']:.1f} s, the robot traveled {m['distance_m']:.2f} m at an average speed of {m['avg_speed_mps']:.2f} m/s.",
+            f"It executed ~{m['turns']} turn(s) (total heading change ≈ {m['heading_change_deg']:.0f}°).",
+        ]
+        if m["wait_s"] > 0:
+            bits.append(f"Total wait time was {m['wait_s']:.1f} s.")
+        if m["front_max"] is not None:
+            bits.append(f"Peak front obstacle level observed was {m['front_max']:.2f} (normalized).")
+        (x0, y0), (x1, y1) = m["start"], m["end"]
+        bits.append(f"Trajectory: ({x0:.2f}, {y0:.2f}) → ({x1:.2f}, {y1:.2f}).")
+        if m["flags"]:
+            bits.append("Noticed: " + " and ".join(m["flags"]) + ".")
+        front = f"{m['front_max']:.2f}" if m["front_max"] is not None else None
+        lines += [
+            "", " ".join(bits), "",
+            "## Key metrics",
+            f"- Distance: **{m['distance_m']:.2f} m**",
+            f"- Duration: **{m['duration_s']:.1f} s**",
+            f"- Avg speed: **{m['avg_speed_mps']:.2f} m/s**",
+            f"- Turns: **{m['turns']}**  (total Δθ ≈ **{m['heading_change_deg']:.0f}°**)",
+            f"- Wait time: **{m['wait_s']:.1f} s**",
+            f"- Max front obstacle level: **{front}**" if front else "- Max front obstacle level: n/a",
+            f"- Anomalies: **{', '.join(m['flags']) if m['flags'] else 'none'}**",
+        ]
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines))
+
+def plot_trajectory(run_id, ticks, out_dir):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    path = os.path.join(out_dir, f"{run_id}_trajectory.png")
+    fig, ax = plt.subplots(figsize=(6, 6))
+    ax.plot(ticks["x"], ticks["y"], linewidth=1.5)
+    ax.scatter(ticks["x"][:1], ticks["y"][:1], marker="o", label="start")
+    ax.scatter(ticks["x"][-1:], ticks["y"][-1:], marker="x", label="end")
+    ax.set_xlabel("x (m)"); ax.set_ylabel("y (m)"); ax.axis("equal"); ax.legend(loc="best")
+    fig.tight_layout(); fig.savefig(path, dpi=120); plt.close(fig)
+    return path
+
+def analyze_run(job):
+    """Worker: parse one run and write its report. Returns (metrics, content hash)."""
+    run_id, files, out_dir, plots = job
+    try:
+        events, ticks = load_run(files)
+        m = trajectory_metrics(events, ticks)
+        img = plot_trajectory(run_id, ticks, out_dir) if plots and m.get("ticks") else None
+        write_report(run_id, m, out_dir, img)
+    except Exception as e:
+        m = {"ticks": 0, "error": repr(e)}
+    return m, content_hash(files)
+
+# Fleet summary
+COLUMNS = ("duration_s", "distance_m", "avg_speed_mps", "turns", "heading_change_deg", "goto_failed", "errors")
+
+def write_summary(results: Dict[str, Dict[str, Any]], out_dir):
+    rows = sorted(results.items())
+    with open(os.path.join(out_dir, "fleet_summary.csv"), "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(("run",) + COLUMNS + ("flags",))
+        for run_id, m in rows:
+            w.writerow([run_id] + [m.get(c, "") for c in COLUMNS] + [";".join(m.get("flags", []))])
+
+    good = [m for _, m in rows if m.get("ticks")]
+    lines = [
+        "# Fleet summary", "",
+        f"{len(rows)} runs, {len(good)} with trajectory data, "
+        f"{sum(1 for m in good if m['flags'])} flagged, {sum(1 for _, m in rows if 'error' in m)} unreadable.", "",
+    ]
+    if good:
+        dist = np.array([m["distance_m"] for m in good])
+        dur = np.array([m["duration_s"] for m in good])
+        lines += [f"Total distance {dist.sum():.2f} m over {dur.sum():.1f} s; "
+                  f"median run {np.median(dist):.2f} m / {np.median(dur):.1f} s.", ""]
+    lines += ["| run | duration (s) | distance (m) | avg speed (m/s) | turns | Δθ (°) | flags |",
+              "|---|---:|---:|---:|---:|---:|---|"]
+    for run_id, m in rows:
+        if not m.get("ticks"):
+            lines.append(f"| {run_id} | | | | | | {m.get('error', 'no tick data')} |")
+            continue
+        lines.append(f"| {run_id} | {m['duration_s']:.1f} | {m['distance_m']:.2f} | {m['avg_speed_mps']:.3f} | "
+                     f"{m['turns']} | {m['heading_change_deg']:.0f} | {', '.join(m['flags'])} |")
+    with open(os.path.join(out_dir, "fleet_summary.md"), "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--logs", default=os.path.join(REPO_ROOT, "data", "logs"))
+    ap.add_argument("--out", default=os.path.join(REPO_ROOT, "reports"))
+    ap.add_argument("--workers", type=int, default=None, help="process pool size (default: CPU count)")
+    ap.add_argument("--plots", action="store_true", help="also render trajectory PNGs (needs matplotlib)")
+    ap.add_argument("--force", action="store_true", help="ignore the cache and re-parse every run")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    os.makedirs(args.out, exist_ok=True)
+    cache_path = os.path.join(args.logs, CACHE_NAME)
+    cache = {"version": CACHE_VERSION, "runs": {}} if args.force else load_cache(cache_path)
+    runs = discover(args.logs)
+
+    results: Dict[str, Dict[str, Any]] = {}
+    todo: List[tuple] = []
+    for run_id, files in runs.items():
+        sig = signature(files)
+        hit: Optional[Dict[str, Any]] = cache["runs"].get(run_id)
+        report = os.path.join(args.out, f"{run_id}_report.md")
+        if hit and os.path.exists(report):
+            if hit["sig"] == sig:
+                results[run_id] = hit["metrics"]
+                continue
+            # Touched but maybe unchanged (copied, restored): hashing beats re-parsing
+            if hit.get("hash") == content_hash(files):
+                hit["sig"] = sig
+                results[run_id] = hit["metrics"]
+                continue
+        todo.append((run_id, files, sig))
+
+    jobs = [(run_id, files, args.out, args.plots) for run_id, files, _ in todo]
+    if len(jobs) > 1 and args.workers != 1:
+        workers = args.workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            done = list(ex.map(analyze_run, jobs, chunksize=max(1, len(jobs) // (4 * workers))))
+    else:
+        done = [analyze_run(j) for j in jobs]
+
+    for (run_id, _, sig), (m, digest) in zip(todo, done):
+        results[run_id] = m
+        cache["runs"][run_id] = {"sig": sig, "hash": digest, "metrics": m}
+    for run_id in set(cache["runs"]) - set(runs):
+        del cache["runs"][run_id]
+    save_cache(cache_path, cache)
+    write_summary(results, args.out)
+
+    print(f"{len(runs)} runs ({len(todo)} parsed, {len(runs) - len(todo)} cached) "
+          f"in {time.perf_counter() - t0:.2f} s -> {os.path.join(args.out, 'fleet_summary.md')}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Run a matrix of headless episodes (commands x configs x worlds x seeds)
+across a process pool and collect one results table.
+
+Every episode runs roboai_controller.main() against the headless simulator
+(webots_project/headless) with its own ControlConfig, so tuning values
+never touch module globals, and with its own memory-only plan cache, so
+no episode sees plans cached by another and none writes the shared
+data/plan_cache.sqlite. Seed 0 starts at the world's start pose; other
+seeds jitter it by up to --jitter-m / --jitter-rad.
+
+Per episode: plan success (the plan finished inside run_seconds with no
+goto_failed / unknown_step / plan_failed / error events), completion time
+(simulated seconds), ground-truth path length, collisions (separate contacts)
+and blocked time (simulated seconds spent pushing against obstacles). Written to
+<out>/episodes.csv, plus per-config means in <out>/scenario_summary.csv/.md.
+
+Matrix file (JSON; paths relative to the repo root):
+    {
+      "commands": ["Go forward for 3 seconds, turn left 90, scan, then stop."],
+      "worlds": ["webots_project/headless/worlds/boxes.json"],
+      "seeds": 4,                                   # or an explicit list
+      "configs": {"baseline": {}},                  # named overrides (config.py names)
+      "sweep": {"BASE_SPEED": [1.5, 2.0, 2.5], "AVOID_GAIN": [2.0, 3.0]},  # cartesian product
+      "run_seconds": 40
+    }
+
+Usage:
+    python tools/run_scenarios.py tools/scenarios/sweep_example.json [--out reports/scenarios] [--workers N]
+"""
+import argparse, contextlib, csv, io, itertools, json, math, os, random, shutil, sys, time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+HEADLESS_DIR = os.path.join(REPO_ROOT, "webots_project", "headless")
+CONTROLLER_DIR = os.path.join(REPO_ROOT, "webots_project", "controllers", "roboai_controller")
+# The headless controller.py must shadow Webots' module
+sys.path[:0] = [HEADLESS_DIR, CONTROLLER_DIR]
+
+FAILURE_OPS = {"goto_failed", "unknown_step", "plan_failed", "error"}
+EPISODE_FIELDS = ["episode", "config", "command", "world", "seed", "success", "done", "completion_s",
+                  "path_length_m", "collisions", "blocked_s", "failures", "sim_s", "wall_s"]
+
+def expand(matrix: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """One dict per episode from a matrix file."""
+    configs = dict(matrix.get("configs") or {})
+    sweep = matrix.get("sweep") or {}
+    if sweep:
+        keys = list(sweep)
+        for values in itertools.product(*(sweep[k] for k in keys)):
+            configs[",".join(f"{k}={v}" for k, v in zip(keys, values))] = dict(zip(keys, values))
+    configs = configs or {"baseline": {}}
+    seeds = matrix.get("seeds", [0])
+    seeds = list(range(seeds)) if isinstance(seeds, int) else list(seeds)
+    worlds = matrix.get("worlds") or [os.path.join(HEADLESS_DIR, "worlds", "arena.json")]
+    commands = matrix.get("commands") or [None]
+    run_seconds = float(matrix.get("run_seconds", 40.0))
+    episodes = []
+    for (name, overrides), command, world, seed in itertools.product(configs.items(), commands, worlds, seeds):
+        episodes.append({"episode": len(episodes), "config": name, "overrides": overrides, "command": command,
+                         "world": world, "seed": seed, "run_seconds": run_seconds})
+    return episodes
+
+def run_episode(job) -> Dict[str, Any]:
+    ep, out, jitter_m, jitter_rad, keep_logs = job
+    import controller, roboai_controller
+    from config import ControlConfig
+    from logger import read_events
+    from world import World
+    from models.planning.t5_plan.plan_cache import PlanCache
+
+    world = World.load(os.path.join(REPO_ROOT, ep["world"]))
+    x, y, th = world.start
+    if ep["seed"]:
+        rng = random.Random(ep["seed"])
+        x, y, th = (x + rng.uniform(-jitter_m, jitter_m), y + rng.uniform(-jitter_m, jitter_m),
+                    th + rng.uniform(-jitter_rad, jitter_rad))
+    robot = controller.Robot(world=world, pose=(x, y, th))
+    cfg = ControlConfig().override(**ep["overrides"])
+    log_dir = os.path.join(out, "logs", f"episode_{ep['episode']:05d}")
+
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        res = roboai_controller.main(robot=robot, cfg=cfg, command=ep["command"], log_dir=log_dir,
+                                     run_seconds=ep["run_seconds"], map_path=None, wait_for_plan=True,
+                                     plan_cache=PlanCache(None))
+    wall = time.perf_counter() - t0
+
+    failures = sum(1 for e in read_events(res["log"]) if e.get("op") in FAILURE_OPS)
+    if not keep_logs:
+        shutil.rmtree(log_dir, ignore_errors=True)
+    return {
+        "episode": ep["episode"], "config": ep["config"], "command": ep["command"] or "", "world": ep["world"],
+        "seed": ep["seed"], "success": bool(res["done"] and not failures), "done": bool(res["done"]),
+        "completion_s": res["sim_seconds"] if res["done"] else float("nan"),
+        "path_length_m": robot.distance, "collisions": robot.collisions, "blocked_s": robot.blocked_s,
+        "failures": failures, "sim_s": robot.time, "wall_s": wall,
+    }
+
+def _mean(xs):
+    xs = [x for x in xs if not math.isnan(x)]
+    return sum(xs) / len(xs) if xs else float("nan")
+
+def summarize(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Per-config means over commands, worlds and seeds; best success rate, then fastest, first."""
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for r in rows:
+        groups.setdefault(r["config"], []).append(r)
+    out = []
+    for name, rs in groups.items():
+        out.append({
+            "config": name, "episodes": len(rs),
+            "success_rate": sum(r["success"] for r in rs) / len(rs),
+            "completion_s": _mean([r["completion_s"] for r in rs]),
+            "path_length_m": _mean([r["path_length_m"] for r in rs]),
+            "collisions": _mean([float(r["collisions"]) for r in rs]),
+            "blocked_s": _mean([r["blocked_s"] for r in rs]),
+        })
+    out.sort(key=lambda s: (-s["success_rate"], s["completion_s"] if not math.isnan(s["completion_s"]) else math.inf))
+    return out
+
+def write_results(rows, summary, out):
+    os.makedirs(out, exist_ok=True)
+    with open(os.path.join(out, "episodes.csv"), "w", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=EPISODE_FIELDS)
+        w.writeheader()
+        w.writerows(sorted(rows, key=lambda r: r["episode"]))
+    fields = list(summary[0]) if summary else ["config"]
+    with open(os.path.join(out, "scenario_summary.csv"), "w", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=fields)
+        w.writeheader()
+        w.writerows(summary)
+    lines = ["# Scenario summary", "",
+             "| config | episodes | success | completion (s) | path (m) | collisions | blocked (s) |",
+             "|---|---:|---:|---:|---:|---:|---:|"]
+    for s in summary:
+        lines.append(f"| {s['config']} | {s['episodes']} | {s['success_rate']:.0%} | {s['completion_s']:.2f} | "
+                     f"{s['path_length_m']:.2f} | {s['collisions']:.1f} | {s['blocked_s']:.2f} |")
+    with open(os.path.join(out, "scenario_summary.md"), "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("matrix", help="scenario matrix JSON file")
+    ap.add_argument("--out", default=os.path.join(REPO_ROOT, "reports", "scenarios"))
+    ap.add_argument("--workers", type=int, default=None, help="process pool size (default: CPU count)")
+    ap.add_argument("--jitter-m", type=float, default=0.05)
+    ap.add_argument("--jitter-rad", type=float, default=0.26)
+    ap.add_argument("--keep-logs", action="store_true", help="keep each episode's run log under <out>/logs")
+    args = ap.parse_args()
+
+    with open(args.matrix, "r", encoding="utf-8") as f:
+        episodes = expand(json.load(f))
+    t0 = time.perf_counter()
+    jobs = [(ep, args.out, args.jitter_m, args.jitter_rad, args.keep_logs) for ep in episodes]
+    workers = args.workers or os.cpu_count() or 1
+    if len(jobs) > 1 and workers != 1:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            rows = list(ex.map(run_episode, jobs, chunksize=max(1, len(jobs) // (4 * workers))))
+    else:
+        rows = [run_episode(j) for j in jobs]
+
+    summary = summarize(rows)
+    write_results(rows, summary, args.out)
+    print(f"{len(rows)} episodes in {time.perf_counter() - t0:.1f} s -> {os.path.join(args.out, 'scenario_summary.md')}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from logger import RunLogger
+from planner_text import get_plan, stub_plan
+
+Plan = List[Dict[str, Any]]
+
+class AsyncPlanner:
+    """
+    Runs get_plan() on a background worker so the control loop never waits
+    on the language model. request() starts planning a command and returns
+    at once; poll() is called once per tick and hands back the finished plan
+    (or None), so the caller swaps it in at a tick boundary.
+
+    Only the newest request counts: a request made while another is pending
+    supersedes it, and the older result is discarded. A worker thread is
+    enough since planning is a socket round-trip to planner_service.py (or
+    torch, which releases the GIL).
+    """
+
+    def __init__(self, log: RunLogger, plan_fn: Callable[[str], Plan] = get_plan):
+        self.log = log
+        self.plan_fn = plan_fn
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="planner")
+        self._future: Optional[Future] = None
+        self._command: Optional[str] = None
+        self._t0 = 0.0
+
+    @property
+    def pending(self) -> bool:
+        return self._future is not None
+
+    def request(self, command: str) -> Future:
+        if self._future is not None:
+            self._future.cancel()  # no-op if already running; its result is dropped either way
+            self.log.event(op="plan_superseded", command=self._command)
+        self._command = command
+        self._t0 = time.monotonic()
+        self._future = self._pool.submit(self.plan_fn, command)
+        self.log.event(op="plan_requested", command=command)
+        return self._future
+
+    def poll(self) -> Optional[Tuple[str, Plan]]:
+        """(command, plan) once the newest request has finished, else None. Never blocks."""
+        f = self._future
+        if f is None or not f.done():
+            return None
+        self._future = None
+        try:
+            plan = f.result()
+        except Exception as e:
+            self.log.event(op="plan_failed", command=self._command, error=repr(e))
+            plan = stub_plan(self._command)
+        self.log.event(op="plan_built", command=self._command, plan=plan,
+                       secs=time.monotonic() - self._t0)
+        return self._command, plan
+
+    def wait(self, timeout: Optional[float] = None):
+        """Block until the pending request (if any) has finished; poll() then returns it."""
+        if self._future is not None:
+            wait([self._future], timeout)
+
+    def close(self):
+        self._future = None
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -1,4 +1,5 @@
 import os
+from dataclasses import dataclass, replace
 
 # Timing
 TIME_STEP_MS = 64
@@ -31,10 +32,122 @@ FORWARD_SPEED = 2.0
 TURN_SPEED    = 1.5
 SECS_PER_DEG  = 0.010
 
+@dataclass(frozen=True)
+class ControlConfig:
+    """
+    The hand-tuned motion values above as one object, so a run can use its
+    own values (PlanExecutor(cfg=...), roboai_controller.main(cfg=...))
+    without touching module globals.
+    """
+    base_speed: float = BASE_SPEED
+    avoid_gain: float = AVOID_GAIN
+    front_thresh: float = FRONT_THRESH
+    forward_speed: float = FORWARD_SPEED
+    turn_speed: float = TURN_SPEED
+    secs_per_deg: float = SECS_PER_DEG
+
+    def override(self, **values) -> "ControlConfig":
+        """Copy with some values changed; keys may use the config.py spelling (BASE_SPEED=2.5)."""
+        return replace(self, **{k.lower(): float(v) for k, v in values.items()})
+
+# Path following (goto / return_base)
+BASE_XY          = (0.0, 0.0)   # odometry frame: where the run started
+GOTO_TOL_M       = 0.05
+GOTO_TIMEOUT_S   = 60.0
+HEADING_GAIN     = 3.0
+TURN_IN_PLACE_DEG = 30.0
+# Costmap: cells within ROBOT_RADIUS_M of an obstacle are not planned through;
+# forward speed scales down once clearance drops below SLOW_DIST_M.
+ROBOT_RADIUS_M     = 0.06       # e-puck body radius (37 mm) plus margin
+COSTMAP_MAX_DIST_M = 0.5
+SLOW_DIST_M        = 0.25
+MIN_SPEED_SCALE    = 0.3
+
 # Diff-drive kinematics (for pose estimate)
 WHEEL_RADIUS_M = 0.0205
 AXLE_LENGTH_M  = 0.053
 
+# Occupancy map: "dense" (fixed MAP_SIZE_M box) or "tiled" (grows where scans land)
+MAP_BACKEND     = "dense"
+MAP_SIZE_M      = 20.0
+MAP_RESOLUTION  = 0.05
+MAP_TILE_CELLS  = 64
+# Persistent map (dense: .npy file, tiled: directory); reopened on the next run.
+# None keeps the map in memory only.
+MAP_PATH          = None
+MAP_FLUSH_SECONDS = 5.0
+
 # Logs to <repo>/data/logs
 REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
-LOG_DIR = os.path.join(REPO_ROOT, "data", "logs")
\ No newline at end of file
+LOG_DIR = os.path.join(REPO_ROOT, "data", "logs")
+
+# Streaming logs: events go as JSON lines through a bounded queue to a writer
+# thread (run_<ts>_000.jsonl, _001, ... on rotation). False keeps the old
+# single run_<ts>.json written at close.
+LOG_STREAM         = True
+LOG_QUEUE_SIZE     = 8192       # events; when full, new events are dropped and counted
+LOG_FSYNC_SECONDS  = 2.0
+LOG_ROTATE_BYTES   = 64 * 1024 * 1024
+LOG_ROTATE_SECONDS = 3600.0     # None disables time-based rotation
+# Columnar telemetry: per-tick numbers go to run_<ts>_tick/<field>.npy instead of
+# spa_tick events; rows are handed to the writer in chunks of this many.
+LOG_TELEMETRY        = True
+TELEMETRY_CHUNK_ROWS = 1024
+# Log filtering. Levels: "debug" < "info" < "warn" < "error"; events below
+# LOG_LEVEL are not written. Ops not listed in LOG_OP_LEVELS are "info".
+# LOG_DECIMATE keeps every Nth event of an op, LOG_RATE_LIMIT_HZ caps an op's rate.
+# At "info" per-tick debug events are not even built; set "debug" to trace them.
+LOG_LEVEL     = "info"
+LOG_OP_LEVELS = {
+    "spa_tick": "debug", "spa_forward_tick": "debug",
+    "goto_failed": "warn", "unknown_step": "warn", "error": "error",
+}
+LOG_DECIMATE      = {}          # e.g. {"spa_forward_tick": 10}
+LOG_RATE_LIMIT_HZ = {}          # e.g. {"spa_forward_tick": 2.0}
+# Flight recorder: the last LOG_FLIGHT_SECONDS of events at LOG_FLIGHT_LEVEL or
+# above (other filters ignored) and of every telemetry channel's rows, at full
+# rate, are kept in memory and written out when an event at LOG_FLIGHT_TRIGGER
+# level or above fires. 0 disables it. Per-tick state comes from the "tick"
+# channel for free; LOG_FLIGHT_LEVEL = "debug" also records per-tick debug
+# events, which then have to be built every tick.
+LOG_FLIGHT_SECONDS = 10.0
+LOG_FLIGHT_LEVEL   = "info"
+LOG_FLIGHT_TRIGGER = "warn"
+# Tick profiler (profiler.py): per-stage wall time of each control tick, logged
+# as a tick_profile event (p50/p95/max over the last PROFILE_WINDOW_TICKS ticks,
+# ticks over the TIME_STEP_MS budget) every PROFILE_SUMMARY_TICKS ticks.
+# TickProfiler.enabled can also be switched during a run.
+PROFILE_TICKS         = True
+PROFILE_WINDOW_TICKS  = 1024
+PROFILE_SUMMARY_TICKS = 160     # ~10 s of control at 64 ms
+
+# Multi-rate loop (scheduler.py): control (sense, odometry, plan swap, execute)
+# runs every tick; other stages run at their own period and are postponed when
+# they would push a tick past SCHED_BUDGET_FRACTION of TIME_STEP_MS.
+SCHED_BUDGET_FRACTION = 0.8
+SCHED_COST_ALPHA      = 0.2     # smoothing of each task's measured run time
+SCHED_MAX_SHED_TICKS  = 8       # a task postponed this many ticks in a row runs anyway
+# Mapping: lidar scans go into the map every MAP_PERIOD_S, and only once the
+# pose has changed by MAP_MIN_MOVE_M or MAP_MIN_TURN_DEG since the last update.
+MAP_PERIOD_S     = 0.128
+MAP_MIN_MOVE_M   = 0.02
+MAP_MIN_TURN_DEG = 2.0
+
+# Planner service (planner_service.py): a long-lived process that keeps the
+# language model loaded. The controller talks to it over a localhost socket
+# and falls back to the rule-based planner when it is not running.
+USE_PLANNER_SERVICE  = True
+PLANNER_HOST         = "127.0.0.1"
+PLANNER_PORT         = 8765
+PLANNER_CONNECT_S    = 0.2      # connect timeout: how long a down service can delay startup
+PLANNER_TIMEOUT_S    = 30.0     # per-request timeout once connected
+# Planning runs off the control loop (async_planner.py); the robot holds still
+# until a plan is ready. With COMMAND_FROM_CUSTOM_DATA, writing a new command
+# into the robot's customData field replans mid-run.
+COMMAND_FROM_CUSTOM_DATA = True
+
+# Plan cache (models/planning/t5_plan/plan_cache.py): repeated instructions are
+# answered from memory or this SQLite file instead of re-running the model.
+PLAN_CACHE_PATH  = os.path.join(REPO_ROOT, "data", "plan_cache.sqlite")   # None: memory only
+PLAN_CACHE_SIZE  = 256
+PLAN_CACHE_TTL_S = 7 * 24 * 3600.0
@@ -0,0 +1,147 @@
+import math
+import numpy as np
+
+def _edt_capped(occ, R):
+    """
+    Exact squared Euclidean distance (in cells) from every cell to the nearest
+    True cell of occ, valid up to R cells; farther cells get a value > R*R.
+    Separable: vertical distances per column, then a min over horizontal
+    offsets, each done as 2R+1 shifted-slice passes.
+    """
+    h, w = occ.shape
+    big = R + 1
+    base = np.where(occ, 0, big).astype(np.int32)
+    col = base.copy()
+    for dy in range(1, R + 1):
+        np.minimum(col[dy:], base[:-dy] + dy, out=col[dy:])
+        np.minimum(col[:-dy], base[dy:] + dy, out=col[:-dy])
+    sq = col * col
+    d2 = sq.copy()
+    for dx in range(1, R + 1):
+        np.minimum(d2[:, dx:], sq[:, :-dx] + dx * dx, out=d2[:, dx:])
+        np.minimum(d2[:, :-dx], sq[:, dx:] + dx * dx, out=d2[:, :-dx])
+    return d2
+
+class Costmap:
+    """
+    Inflated costmap over a dense OccupancyGrid: per-cell distance to the
+    nearest occupied cell (capped at max_dist_m) plus a lethal zone within
+    robot_radius_m of obstacles.
+
+    Attaches to the grid; when cells flip between occupied and not, only
+    the blocks around them are re-transformed, so the per-tick cost follows
+    what changed rather than the map size. Queries are O(1) array lookups.
+    Layers attached here get on_update(flat_idx) for cells whose lethal
+    state flipped.
+    """
+
+    BLOCK = 32  # cells; flipped cells are re-transformed in blocks of this size
+
+    def __init__(self, occ_grid, robot_radius_m=0.06, max_dist_m=0.5, occ_thresh=0.2):
+        self.g = occ_grid
+        self.res = occ_grid.res
+        self.robot_radius_m = float(robot_radius_m)
+        self.max_dist_m = float(max_dist_m)
+        self.occ_thresh = float(occ_thresh)
+        self.R = max(1, int(math.ceil(self.max_dist_m / self.res)))
+        self.layers = []
+
+        self.occ = occ_grid.grid > self.occ_thresh
+        self.dist = np.empty(occ_grid.grid.shape, dtype=np.float32)
+        self.lethal = np.zeros(occ_grid.grid.shape, dtype=bool)
+        self._touched = []
+        self._n_touched = 0
+        self._transform(slice(0, occ_grid.h), slice(0, occ_grid.w), slice(0, occ_grid.h), slice(0, occ_grid.w))
+        occ_grid.attach(self)
+
+    def attach(self, layer):
+        self.layers.append(layer)
+        return layer
+
+    def on_update(self, flat_idx):
+        if self._n_touched > self.occ.size // 4:
+            return
+        self._touched.append(flat_idx)
+        self._n_touched += flat_idx.size
+
+    # Recompute
+    def _transform(self, ry, rx, wy, wx):
+        """
+        Distance-transform obstacles in region (ry, rx) and store results for
+        window (wy, wx). Returns flat indices of cells whose lethal state flipped.
+        """
+        d2 = _edt_capped(self.occ[ry, rx], self.R)
+        d = np.sqrt(d2[wy.start - ry.start:wy.stop - ry.start, wx.start - rx.start:wx.stop - rx.start]) * self.res
+        np.minimum(d, self.max_dist_m, out=d)
+        self.dist[wy, wx] = d
+        lethal = d <= self.robot_radius_m
+        cy, cx = np.nonzero(lethal != self.lethal[wy, wx])
+        self.lethal[wy, wx] = lethal
+        return (cy + wy.start) * self.occ.shape[1] + (cx + wx.start)
+
+    def refresh(self):
+        """Apply occupancy flips since the last refresh. Returns the number of flipped cells."""
+        if not self._touched:
+            return 0
+        h, w = self.occ.shape
+        if self._n_touched > self.occ.size // 4:
+            now = self.g.grid > self.occ_thresh
+            flipped = np.flatnonzero(now != self.occ)
+        else:
+            # Duplicates are harmless: the fancy-indexed toggle below writes each cell once
+            idx = np.concatenate(self._touched)
+            flat_occ = self.occ.reshape(-1)
+            now_idx = self.g.grid.reshape(-1)[idx] > self.occ_thresh
+            flipped = idx[now_idx != flat_occ[idx]]
+        self._touched.clear()
+        self._n_touched = 0
+        if flipped.size == 0:
+            return 0
+
+        self.occ.reshape(-1)[flipped] ^= True
+
+        B, R = self.BLOCK, self.R
+        gy, gx = np.divmod(flipped, w)
+        blocks = np.unique((gy // B) * ((w + B - 1) // B) + gx // B)
+        by, bx = np.divmod(blocks, (w + B - 1) // B)
+        changed = []
+        if blocks.size * (B + 4 * R) ** 2 > self.occ.size:
+            changed.append(self._transform(slice(0, h), slice(0, w), slice(0, h), slice(0, w)))
+        else:
+            for y0, x0 in zip((by * B).tolist(), (bx * B).tolist()):
+                # Cells within R of the block can change; obstacles within R of those matter
+                wy = slice(max(0, y0 - R), min(h, y0 + B + R))
+                wx = slice(max(0, x0 - R), min(w, x0 + B + R))
+                ry = slice(max(0, y0 - 2 * R), min(h, y0 + B + 2 * R))
+                rx = slice(max(0, x0 - 2 * R), min(w, x0 + B + 2 * R))
+                changed.append(self._transform(ry, rx, wy, wx))
+
+        changed = np.concatenate(changed)
+        if changed.size:
+            for layer in self.layers:
+                layer.on_update(changed)
+        return int(flipped.size)
+
+    # Queries
+    def clearance(self, gx, gy):
+        """Distance (m) from cell (gx, gy) to the nearest obstacle, capped at max_dist_m."""
+        self.refresh()
+        return float(self.dist[gy, gx])
+
+    def clearance_at(self, x_m, y_m):
+        """clearance() at a world point; out-of-map points report 0."""
+        gx, gy = self.g.world_to_grid(x_m, y_m)
+        if 0 <= gx < self.g.w and 0 <= gy < self.g.h:
+            return self.clearance(gx, gy)
+        return 0.0
+
+    def is_lethal(self, gx, gy):
+        self.refresh()
+        return bool(self.lethal[gy, gx])
+
+    def cost(self, gx, gy):
+        """1.0 inside the lethal zone, falling linearly to 0.0 at max_dist_m."""
+        d = self.clearance(gx, gy)
+        if d <= self.robot_radius_m:
+            return 1.0
+        return max(0.0, (self.max_dist_m - d) / (self.max_dist_m - self.robot_radius_m))
@@ -1,11 +1,17 @@
 from __future__ import annotations
+import math
 from typing import List, Dict, Optional, Tuple, Any
-from config import TIME_STEP_MS, SECS_PER_DEG, TURN_SPEED
+from config import TIME_STEP_MS, ControlConfig
+from config import BASE_XY, GOTO_TOL_M, GOTO_TIMEOUT_S, HEADING_GAIN, TURN_IN_PLACE_DEG
+from config import SLOW_DIST_M, MIN_SPEED_SCALE
 from logger import RunLogger
-from navigator import steer
+from navigator import steer, clamp, MAX_WHEEL_CMD
 from controller import Robot
 from motion import Drive
 from sensors import Sensors
+from state import StateEstimator
+from path_planner import GridPlanner
+from costmap import Costmap
 
 class PlanExecutor:
     """
@@ -14,24 +20,34 @@ class PlanExecutor:
       - turn(dir, deg)
       - scan(sensor)
       - wait(seconds)
+      - goto(x, y)
       - return_base
       - stop
 
     It keeps your original behavior but adds 'wait' support and
-    ensures timers reset correctly across ops.
+    ensures timers reset correctly across ops. goto/return_base follow
+    paths from the GridPlanner when one (and a StateEstimator) is given;
+    with a Costmap they also slow down near obstacles.
     """
 
-    def __init__(self, robot: "Robot", drive: Drive, sensors: Sensors, log: RunLogger):
+    def __init__(self, robot: "Robot", drive: Drive, sensors: Sensors, log: RunLogger,
+                 est: Optional[StateEstimator] = None, planner: Optional[GridPlanner] = None,
+                 costmap: Optional[Costmap] = None, cfg: Optional[ControlConfig] = None):
         self.robot = robot
         self.drive = drive
         self.sensors = sensors
         self.log = log
+        self.est = est
+        self.planner = planner
+        self.costmap = costmap
+        self.cfg = cfg or ControlConfig()
 
         self.plan: List[Dict[str, Any]] = []
         self.idx = 0
         self.op_timer = 0.0
         self.turn_target_secs: Optional[float] = None
         self.last_cmd: Tuple[float, float] = (0.0, 0.0)
+        self.path: Optional[List[Tuple[float, float]]] = None
 
     # lifecycle
 
@@ -42,12 +58,62 @@ class PlanExecutor:
         self.op_timer = 0.0
         self.turn_target_secs = None
         self.last_cmd = (0.0, 0.0)
+        self.path = None
         self.log.event(op="plan_loaded", steps=len(self.plan))
 
+    def hold(self):
+        """Safe holding behavior while no plan is ready: motors stopped, plan position kept."""
+        self.drive.stop()
+        self.last_cmd = (0.0, 0.0)
+
     def _wait_step(self) -> bool:
         """Advance Webots simulation by one controller tick. Returns True if simulation stopped."""
         return self.robot.step(TIME_STEP_MS) == -1
 
+    # path following
+
+    def _follow(self, goal: Tuple[float, float], dt: float) -> bool:
+        """One tick toward goal along the planned path. Returns True when the op is over."""
+        st = self.est.state
+        pose = (st.x, st.y)
+        if self.path is None and self.op_timer == 0.0:
+            self.path = self.planner.set_goal(pose, goal)
+            self.log.event(op="path_planned", x=goal[0], y=goal[1],
+                           waypoints=len(self.path) if self.path else 0)
+        else:
+            # Incremental repair: only map changes since the last tick are replanned
+            self.path = self.planner.replan(pose)
+        self.op_timer += dt
+
+        if math.hypot(goal[0] - st.x, goal[1] - st.y) <= GOTO_TOL_M:
+            self.log.event(op="goto_done", x=goal[0], y=goal[1], secs=self.op_timer)
+            return True
+        if not self.path:
+            self.log.event(op="goto_failed", reason="no_path", x=goal[0], y=goal[1])
+            return True
+        if self.op_timer >= GOTO_TIMEOUT_S:
+            self.log.event(op="goto_failed", reason="timeout", x=goal[0], y=goal[1])
+            return True
+
+        # Steer at the first waypoint not already reached
+        wx, wy = next(((px, py) for px, py in self.path[1:]
+                       if math.hypot(px - st.x, py - st.y) > GOTO_TOL_M), self.path[-1])
+        err = math.atan2(wy - st.y, wx - st.x) - st.theta
+        err = math.atan2(math.sin(err), math.cos(err))
+        if abs(err) > math.radians(TURN_IN_PLACE_DEG):
+            ts = clamp(self.cfg.turn_speed, -MAX_WHEEL_CMD, MAX_WHEEL_CMD)
+            l, r = (-ts, ts) if err > 0 else (ts, -ts)
+        else:
+            v = self.cfg.forward_speed
+            if self.costmap is not None:
+                # Ease off near obstacles: full speed beyond SLOW_DIST_M of clearance
+                v *= clamp(self.costmap.clearance_at(st.x, st.y) / SLOW_DIST_M, MIN_SPEED_SCALE, 1.0)
+            l = clamp(v - HEADING_GAIN * err, -MAX_WHEEL_CMD, MAX_WHEEL_CMD)
+            r = clamp(v + HEADING_GAIN * err, -MAX_WHEEL_CMD, MAX_WHEEL_CMD)
+        self.drive.set_velocity(l, r)
+        self.last_cmd = (l, r)
+        return False
+
     # main tick
 
     def step(self, dt: float, ir: List[Optional[float]]) -> bool:
@@ -67,10 +133,12 @@ class PlanExecutor:
         # FORWARD
         if op == "forward":
             secs = float(step.get("seconds", 1.0))
-            l, r, front = steer(ir)
+            c = self.cfg
+            l, r, front = steer(ir, c.base_speed, c.avoid_gain, c.front_thresh)
             self.drive.set_velocity(l, r)
             self.last_cmd = (l, r)
-            self.log.event(op="spa_forward_tick", l=l, r=r, front=front)
+            if self.log.enabled("spa_forward_tick"):
+                self.log.event(op="spa_forward_tick", l=l, r=r, front=front)
             self.op_timer += dt
             if self.op_timer >= secs:
                 self.drive.stop()
@@ -84,14 +152,15 @@ class PlanExecutor:
             if self.turn_target_secs is None:
                 deg = abs(float(step.get("deg", 90)))
                 # Convert degrees to target time
-                self.turn_target_secs = max(0.0, SECS_PER_DEG * deg)
+                self.turn_target_secs = max(0.0, self.cfg.secs_per_deg * deg)
                 direction = str(step.get("dir", "left")).lower()
+                ts = clamp(self.cfg.turn_speed, -MAX_WHEEL_CMD, MAX_WHEEL_CMD)
                 if direction == "left":
-                    self.drive.set_velocity(-TURN_SPEED, TURN_SPEED)
-                    self.last_cmd = (-TURN_SPEED, TURN_SPEED)
+                    self.drive.set_velocity(-ts, ts)
+                    self.last_cmd = (-ts, ts)
                 else:
-                    self.drive.set_velocity(TURN_SPEED, -TURN_SPEED)
-                    self.last_cmd = (TURN_SPEED, -TURN_SPEED)
+                    self.drive.set_velocity(ts, -ts)
+                    self.last_cmd = (ts, -ts)
                 self.log.event(op="turn_start", dir=direction, deg=deg, secs=self.turn_target_secs)
 
             self.op_timer += dt
@@ -122,13 +191,24 @@ class PlanExecutor:
                 self.idx += 1
                 self.op_timer = 0.0
 
-        # RETURN TO BASE (stubbed)
-        elif op == "return_base":
-            # Currently just logs + proceeds
-            self.drive.stop()
-            self.log.event(op="return_base")
-            self.idx += 1
-            self.last_cmd = (0.0, 0.0)
+        # GOTO / RETURN TO BASE (path following)
+        elif op in ("goto", "return_base"):
+            if op == "return_base":
+                goal = BASE_XY
+            else:
+                goal = (float(step.get("x", 0.0)), float(step.get("y", 0.0)))
+            if self.planner is None or self.est is None:
+                # No map/pose to plan on: log and move on
+                self.drive.stop()
+                self.log.event(op=op, skipped=True, x=goal[0], y=goal[1])
+                self.idx += 1
+                self.last_cmd = (0.0, 0.0)
+            elif self._follow(goal, dt):
+                self.drive.stop()
+                self.last_cmd = (0.0, 0.0)
+                self.idx += 1
+                self.op_timer = 0.0
+                self.path = None
 
         # STOP
         elif op == "stop":
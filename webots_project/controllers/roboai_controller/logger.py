@@ -1,21 +1,414 @@
-import json, os, time
-from typing import Any, Dict
-from config import LOG_DIR
+import collections, glob, json, os, queue, struct, threading, time
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from config import LOG_DIR, LOG_STREAM, LOG_QUEUE_SIZE, LOG_FSYNC_SECONDS, LOG_ROTATE_BYTES, LOG_ROTATE_SECONDS
+from config import TELEMETRY_CHUNK_ROWS
+from config import LOG_LEVEL, LOG_OP_LEVELS, LOG_DECIMATE, LOG_RATE_LIMIT_HZ, LOG_FLIGHT_SECONDS, LOG_FLIGHT_TRIGGER
+from config import LOG_FLIGHT_LEVEL
+
+LEVELS = {"debug": 10, "info": 20, "warn": 30, "error": 40}
+
+_STOP = object()
+_FLUSH = object()
+
+class _GrowingNpy:
+    """
+    Append-only 1-D .npy file. The header has a fixed size and is rewritten
+    in place with the current row count on sync(), so the file is a valid
+    .npy (and np.load(mmap_mode="r")-able) after every sync.
+    """
+
+    HEADER = 128
+
+    def __init__(self, path: str, dtype):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.n = 0
+        self._dirty = True
+        self._f = open(path, "wb+")
+        self._write_header()
+
+    def _write_header(self):
+        d = "{'descr': %r, 'fortran_order': False, 'shape': (%d,), }" % (
+            np.lib.format.dtype_to_descr(self.dtype), self.n)
+        hdr = d.ljust(self.HEADER - 11) + "\n"
+        self._f.seek(0)
+        self._f.write(b"\x93NUMPY\x01\x00" + struct.pack("<H", len(hdr)) + hdr.encode("latin1"))
+        self._f.seek(0, os.SEEK_END)
+
+    def append(self, arr: np.ndarray):
+        self._f.write(np.ascontiguousarray(arr, dtype=self.dtype).tobytes())
+        self.n += len(arr)
+        self._dirty = True
+
+    def sync(self):
+        if not self._dirty:
+            return
+        self._f.flush()
+        self._write_header()
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        self._dirty = False
+
+    def close(self):
+        self.sync()
+        self._f.close()
+
+class _Chunk:
+    """A filled block of telemetry rows on its way to the writer."""
+    __slots__ = ("files", "cols", "n")
+
+    def __init__(self, files, cols, n):
+        self.files, self.cols, self.n = files, cols, n
+
+    def write(self):
+        for f, col in zip(self.files, self.cols):
+            f.append(col[:self.n])
+
+class _StreamWriter(threading.Thread):
+    """
+    Drains the event queue into newline-delimited JSON files. Serialization,
+    writes and fsync all happen here, never on the control loop's thread.
+    Files rotate to the next part (<prefix>_001.jsonl, ...) by size or age.
+    """
+
+    def __init__(self, prefix: str, q: "queue.Queue", meta: Dict[str, Any]):
+        super().__init__(name="RunLoggerWriter", daemon=True)
+        self.prefix = prefix
+        self.q = q
+        self.meta = meta
+        self.paths: List[str] = []
+        self.written = 0
+        self.npy: List[_GrowingNpy] = []
+        self._f = None
+        self._bytes = 0
+        self._opened = 0.0
+        self._synced = 0.0
+
+    def _open_next(self):
+        if self._f is not None:
+            self._sync()
+            self._f.close()
+        path = f"{self.prefix}_{len(self.paths):03d}.jsonl"
+        self.paths.append(path)
+        self._f = open(path, "w", encoding="utf-8")
+        self._bytes = 0
+        self._opened = time.monotonic()
+        self._write({"op": "log_meta", "part": len(self.paths) - 1, "t": time.time(), **self.meta})
+
+    def _write(self, rec):
+        line = json.dumps(rec, default=str) + "\n"
+        self._f.write(line)
+        self._bytes += len(line)
+
+    def _sync(self):
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        for f in self.npy:
+            f.sync()
+        self._synced = time.monotonic()
+
+    def _should_rotate(self) -> bool:
+        if LOG_ROTATE_BYTES and self._bytes >= LOG_ROTATE_BYTES:
+            return True
+        return bool(LOG_ROTATE_SECONDS) and time.monotonic() - self._opened >= LOG_ROTATE_SECONDS
+
+    def run(self):
+        self._open_next()
+        while True:
+            try:
+                rec = self.q.get(timeout=LOG_FSYNC_SECONDS)
+            except queue.Empty:
+                rec = _FLUSH
+            if rec is _STOP:
+                break
+            if rec is _FLUSH:
+                self._sync()
+                continue
+            if isinstance(rec, _Chunk):
+                rec.write()
+                continue
+            if self._should_rotate():
+                self._open_next()
+            self._write(rec)
+            self.written += 1
+            if time.monotonic() - self._synced >= LOG_FSYNC_SECONDS:
+                self._sync()
+        self._sync()
+        self._f.close()
+
+class TelemetryChannel:
+    """
+    Fixed-schema, high-rate numeric telemetry stored column-wise: one
+    growing .npy per field under <run prefix>_<name>/, plus a float64 "t"
+    column. Rows fill preallocated chunk arrays; full chunks are handed to
+    the logger's writer thread, so record() never touches the disk.
+    Read back with read_telemetry().
+
+    While the logger's flight recorder is on, handed-off chunks are also
+    kept until they are older than its window, so recent() can return the
+    last few seconds of rows at no extra cost per row.
+    """
+
+    def __init__(self, log: "RunLogger", name: str, fields: Sequence, chunk_rows: int = TELEMETRY_CHUNK_ROWS):
+        """fields: names (stored as float32) or (name, dtype) pairs."""
+        self.log = log
+        self.name = name
+        self.dir = f"{log.prefix}_{name}"
+        os.makedirs(self.dir, exist_ok=True)
+        schema = [("t", np.float64)] + [(f, np.float32) if isinstance(f, str) else (f[0], f[1]) for f in fields]
+        self.fields = [n for n, _ in schema]
+        self.chunk_rows = int(chunk_rows)
+        self._files = [_GrowingNpy(os.path.join(self.dir, f"{n}.npy"), dt) for n, dt in schema]
+        self._recent: Deque[Tuple[List[np.ndarray], int]] = collections.deque()
+        self._new_chunk()
+
+    def _new_chunk(self):
+        self._cols = [np.empty(self.chunk_rows, dtype=f.dtype) for f in self._files]
+        self._i = 0
+
+    def record(self, *values):
+        """One row, values in field order (t is filled in)."""
+        i = self._i
+        cols = self._cols
+        cols[0][i] = time.time()
+        for k, v in enumerate(values, 1):
+            cols[k][i] = v
+        self._i = i + 1
+        if self._i == self.chunk_rows:
+            self.handoff()
+
+    def handoff(self):
+        """Pass the rows recorded so far to the writer and start a fresh chunk."""
+        if self._i:
+            self.log._submit(_Chunk(self._files, self._cols, self._i))
+            if self.log._flight is not None:
+                # The writer only reads a handed-off chunk, so it can be shared
+                recent = self._recent
+                recent.append((self._cols, self._i))
+                horizon = time.time() - self.log.flight_seconds
+                while recent and recent[0][0][0][recent[0][1] - 1] < horizon:
+                    recent.popleft()
+            self._new_chunk()
+
+    def recent(self, seconds: float) -> Dict[str, list]:
+        """{field: values} for the rows recorded in the last seconds (kept chunks only)."""
+        chunks = list(self._recent) + [(self._cols, self._i)]
+        horizon = time.time() - seconds
+        out: Dict[str, list] = {f: [] for f in self.fields}
+        for cols, n in chunks:
+            keep = cols[0][:n] >= horizon
+            for f, c in zip(self.fields, cols):
+                out[f].extend(c[:n][keep].tolist())
+        return out
+
+    def close(self):
+        for f in self._files:
+            f.close()
 
 class RunLogger:
-    def __init__(self):
+    """
+    Run event log. In streaming mode (LOG_STREAM) event() only enqueues the
+    dict; a background thread writes it as a JSON line, fsyncs periodically
+    and rotates files, so memory stays bounded and a crash loses at most the
+    last few seconds. If the queue is full the event is dropped and counted
+    rather than blocking the control loop.
+
+    Dense per-tick numbers go through channel() instead of event(): see
+    TelemetryChannel.
+
+    Events are filtered by per-op level (LOG_OP_LEVELS vs LOG_LEVEL), then
+    decimation (LOG_DECIMATE) and rate limits (LOG_RATE_LIMIT_HZ). Hot paths
+    can skip building an event with enabled(op). The flight recorder keeps
+    the last LOG_FLIGHT_SECONDS of events at LOG_FLIGHT_LEVEL or above,
+    otherwise unfiltered, and of every telemetry channel's rows (full rate),
+    and writes them as one flight_record event when a warn/error-level event
+    fires; the triggering event itself follows as a normal event.
+
+    With stream=False events are kept in memory and written as one JSON
+    document at close (the original format).
+    """
+
+    def __init__(self, stream: Optional[bool] = None, log_dir: Optional[str] = None):
         ts = time.strftime("%Y%m%d_%H%M%S")
-        os.makedirs(LOG_DIR, exist_ok=True)
-        self.path = os.path.join(LOG_DIR, f"run_{ts}.json")
-        self.buffer: Dict[str, Any] = {"events": [], "meta": {"start_time": ts}}
+        log_dir = log_dir or LOG_DIR
+        os.makedirs(log_dir, exist_ok=True)
+        self.stream = LOG_STREAM if stream is None else bool(stream)
+        self.prefix = os.path.join(log_dir, f"run_{ts}")
+        self.dropped = 0
+        self.channels: Dict[str, TelemetryChannel] = {}
+        self._pending: List[_Chunk] = []
+        self._q = None
+
+        self.level = LEVELS[LOG_LEVEL]
+        self._op_levels = {op: LEVELS[lv] for op, lv in LOG_OP_LEVELS.items()}
+        self.decimate = dict(LOG_DECIMATE)
+        self.rate_limit_hz = dict(LOG_RATE_LIMIT_HZ)
+        self._seen: Dict[str, int] = {}
+        self._last_emit: Dict[str, float] = {}
+        self.flight_seconds = float(LOG_FLIGHT_SECONDS)
+        self.flight_level = LEVELS[LOG_FLIGHT_LEVEL]
+        self.flight_trigger = LEVELS[LOG_FLIGHT_TRIGGER]
+        self._flight = collections.deque(maxlen=LOG_QUEUE_SIZE) if self.flight_seconds > 0 else None
+        if self.stream:
+            self._q = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+            self._writer = _StreamWriter(self.prefix, self._q, {"start_time": ts})
+            self._writer.start()
+            self.path = f"{self.prefix}_000.jsonl"
+        else:
+            self.path = os.path.join(log_dir, f"run_{ts}.json")
+            self.buffer: Dict[str, Any] = {"events": [], "meta": {"start_time": ts}}
+
+    @property
+    def paths(self) -> List[str]:
+        """Files written so far (all rotated parts in streaming mode)."""
+        return list(self._writer.paths) if self.stream else [self.path]
+
+    # Filtering
+    def set_level(self, level: str, op: Optional[str] = None):
+        """Change the global level, or one op's level, at runtime."""
+        if op is None:
+            self.level = LEVELS[level]
+        else:
+            self._op_levels[op] = LEVELS[level]
+
+    def enabled(self, op: str) -> bool:
+        """False when event(op=...) would certainly be discarded, so callers can skip building it."""
+        lvl = self._op_levels.get(op, LEVELS["info"])
+        return lvl >= self.level or (self._flight is not None and lvl >= self.flight_level)
+
+    def _passes(self, op, t) -> bool:
+        n = self.decimate.get(op)
+        if n:
+            k = self._seen.get(op, 0)
+            self._seen[op] = k + 1
+            if k % n:
+                return False
+        hz = self.rate_limit_hz.get(op)
+        if hz:
+            if t - self._last_emit.get(op, float("-inf")) < 1.0 / hz:
+                return False
+            self._last_emit[op] = t
+        return True
+
+    def dump_flight(self, reason: str):
+        """Write the recorder's last flight_seconds of events and telemetry as one flight_record event."""
+        if self._flight is None:
+            return
+        events = list(self._flight)
+        self._flight.clear()
+        telemetry = {name: ch.recent(self.flight_seconds) for name, ch in self.channels.items()}
+        if not events and not any(rows["t"] for rows in telemetry.values()):
+            return
+        self._emit({"op": "flight_record", "reason": reason, "t": time.time(),
+                    "seconds": self.flight_seconds, "events": events, "telemetry": telemetry})
 
     def event(self, **kwargs):
-        kwargs["t"] = time.time()
-        self.buffer["events"].append(kwargs)
+        op = kwargs.get("op")
+        lvl = self._op_levels.get(op, LEVELS["info"])
+        t = kwargs["t"] = time.time()
+        if self._flight is not None and lvl >= self.flight_level:
+            fl = self._flight
+            if lvl >= self.flight_trigger:
+                self.dump_flight(op)
+            fl.append(kwargs)
+            while t - fl[0]["t"] > self.flight_seconds:
+                fl.popleft()
+        if lvl < self.level or not self._passes(op, t):
+            return
+        self._emit(kwargs)
+
+    def _emit(self, kwargs):
+        if self._q is None:
+            self.buffer["events"].append(kwargs)
+            return
+        try:
+            self._q.put_nowait(kwargs)
+        except queue.Full:
+            self.dropped += 1
+
+    def channel(self, name: str, fields: Sequence, chunk_rows: int = TELEMETRY_CHUNK_ROWS) -> TelemetryChannel:
+        """Open a columnar telemetry channel for this run (see TelemetryChannel)."""
+        ch = TelemetryChannel(self, name, fields, chunk_rows)
+        self.channels[name] = ch
+        if self.stream:
+            self._writer.npy.extend(ch._files)
+        self.event(op="telemetry_channel", name=name, fields=ch.fields, dir=os.path.basename(ch.dir))
+        return ch
+
+    def _submit(self, chunk: _Chunk):
+        if self._q is None:
+            chunk.write()
+            return
+        # Chunks are rare and hold many rows: keep them if the queue is full and retry next time
+        self._pending.append(chunk)
+        while self._pending:
+            try:
+                self._q.put_nowait(self._pending[0])
+            except queue.Full:
+                return
+            self._pending.pop(0)
 
     def flush(self):
-        with open(self.path, "w", encoding="utf-8") as f:
-            json.dump(self.buffer, f, indent=2)
+        if self._q is None:
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(self.buffer, f, indent=2)
+            return
+        try:
+            self._q.put_nowait(_FLUSH)
+        except queue.Full:
+            pass  # the writer is busy draining and will sync on its own
 
     def close(self):
-        self.flush()
\ No newline at end of file
+        for ch in self.channels.values():
+            ch.handoff()
+        if self._q is None:
+            self.flush()
+        elif self._writer.is_alive():
+            # Blocking puts are fine here: the run is over
+            for chunk in self._pending:
+                self._q.put(chunk)
+            self._pending.clear()
+            self._q.put({"op": "log_closed", "t": time.time(), "dropped": self.dropped})
+            self._q.put(_STOP)
+            self._writer.join()
+        for ch in self.channels.values():
+            ch.close()
+
+def read_events(path: str) -> List[Dict[str, Any]]:
+    """
+    Events from a run log: a run_<ts>.json document, or any part of a
+    streamed run (all run_<ts>_NNN.jsonl parts are read in order). A torn
+    last line from a crash is skipped.
+    """
+    if not path.endswith(".jsonl"):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f).get("events", [])
+    prefix = path.rsplit("_", 1)[0]
+    events = []
+    for part in sorted(glob.glob(glob.escape(prefix) + "_[0-9][0-9][0-9].jsonl")):
+        with open(part, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    events.append(json.loads(line))
+                except ValueError:
+                    continue
+    return events
+
+def read_telemetry(path: str) -> Dict[str, np.ndarray]:
+    """
+    Memory-map a telemetry channel directory written by TelemetryChannel.
+    Returns {field: read-only array}, trimmed to rows present in every
+    column (a crash can leave one column a sync ahead of another).
+    """
+    cols = {}
+    for f in sorted(glob.glob(os.path.join(glob.escape(path), "*.npy"))):
+        with open(f, "rb") as fh:
+            np.lib.format.read_magic(fh)
+            shape, _, dtype = np.lib.format.read_array_header_1_0(fh)
+            offset = fh.tell()
+        n = min(shape[0], (os.path.getsize(f) - offset) // dtype.itemsize)
+        name = os.path.splitext(os.path.basename(f))[0]
+        cols[name] = np.memmap(f, dtype=dtype, mode="r", offset=offset, shape=(n,)) if n else np.empty(0, dtype)
+    n = min((len(c) for c in cols.values()), default=0)
+    return {k: c[:n] for k, c in cols.items()}
@@ -0,0 +1,99 @@
+import math
+import numpy as np
+
+class MapPyramid:
+    """
+    Quadtree-style pyramid over an OccupancyGrid. Level 0 is the grid itself;
+    each cell of level k holds the max log-odds of its 2x2 children at level
+    k-1, so a coarse cell below a threshold guarantees every base cell under
+    it is below it too.
+
+    Attaches itself to the grid and refreshes only the ancestors of cells
+    changed by each update_from_scan.
+    """
+
+    def __init__(self, occ_grid, levels=None):
+        """
+        occ_grid: dense OccupancyGrid to mirror
+        levels: number of coarser levels; default goes down to a single cell
+        """
+        self.g = occ_grid
+        if levels is None:
+            levels = max(1, math.ceil(math.log2(max(occ_grid.w, occ_grid.h, 2))))
+        self.levels = [occ_grid.grid]
+        for _ in range(levels):
+            h, w = self.levels[-1].shape
+            self.levels.append(np.empty(((h + 1) // 2, (w + 1) // 2), dtype=np.float32))
+        self.rebuild()
+        occ_grid.attach(self)
+
+    def rebuild(self):
+        """Recompute every coarse level from the base grid."""
+        for k in range(1, len(self.levels)):
+            child = self.levels[k - 1]
+            h, w = child.shape
+            if h % 2 or w % 2:
+                # Pad by repeating the last row/col: duplicates don't change a max
+                child = np.pad(child, ((0, h % 2), (0, w % 2)), mode="edge")
+            H, W = self.levels[k].shape
+            self.levels[k][...] = child.reshape(H, 2, W, 2).max(axis=(1, 3))
+
+    def on_update(self, flat_idx):
+        """Refresh the parents of changed base cells, level by level."""
+        if flat_idx.size == 0:
+            return
+        gy, gx = np.divmod(flat_idx, self.g.w)
+        for k in range(1, len(self.levels)):
+            child = self.levels[k - 1]
+            ch, cw = child.shape
+            key = np.unique((gy >> 1) * self.levels[k].shape[1] + (gx >> 1))
+            gy, gx = np.divmod(key, self.levels[k].shape[1])
+            y0, x0 = 2 * gy, 2 * gx
+            y1, x1 = np.minimum(y0 + 1, ch - 1), np.minimum(x0 + 1, cw - 1)
+            self.levels[k][gy, gx] = np.maximum(
+                np.maximum(child[y0, x0], child[y0, x1]),
+                np.maximum(child[y1, x0], child[y1, x1]),
+            )
+
+    # Queries
+    def cell_size_m(self, level):
+        return self.g.res * (1 << level)
+
+    def level_free(self, level, cx, cy, thresh=0.0):
+        """True if every base cell under cell (cx, cy) of the given level is below thresh."""
+        return self.levels[level][cy, cx] < thresh
+
+    def box_free(self, x0_m, y0_m, x1_m, y1_m, thresh=0.0):
+        """
+        True if every base cell overlapping the world box [x0,x1] x [y0,y1] has
+        log-odds below thresh (unknown cells count as not free). Starts at the
+        level where the box covers at most 2x2 cells, which answers open space
+        in O(1), and only descends into coarse cells that are not free.
+        Boxes reaching outside the map are not free.
+        """
+        gx0, gy0 = self.g.world_to_grid(min(x0_m, x1_m), min(y0_m, y1_m))
+        gx1, gy1 = self.g.world_to_grid(max(x0_m, x1_m), max(y0_m, y1_m))
+        if gx0 < 0 or gy0 < 0 or gx1 >= self.g.w or gy1 >= self.g.h:
+            return False
+        span = max(gx1 - gx0, gy1 - gy0) + 1
+        level = min(len(self.levels) - 1, math.ceil(math.log2(span)))
+        return self._free_in(level, gx0, gy0, gx1, gy1, thresh)
+
+    def _free_in(self, level, gx0, gy0, gx1, gy1, thresh):
+        """Check the base-cell box [gx0..gx1] x [gy0..gy1] using cells of the given level."""
+        lv = self.levels[level]
+        cx0, cy0, cx1, cy1 = gx0 >> level, gy0 >> level, gx1 >> level, gy1 >> level
+        block = lv[cy0:cy1 + 1, cx0:cx1 + 1]
+        if (block < thresh).all():
+            return True
+        if level == 0:
+            return False
+        # Descend only into the coarse cells that might hold an obstacle
+        for cy, cx in zip(*np.nonzero(block >= thresh)):
+            cy, cx = cy + cy0, cx + cx0
+            size = 1 << level
+            sub = (max(gx0, cx * size), max(gy0, cy * size),
+                   min(gx1, cx * size + size - 1), min(gy1, cy * size + size - 1))
+            if not self._free_in(level - 1, *sub, thresh):
+                return False
+        return True
@@ -1,29 +1,47 @@
 from typing import List, Tuple
+import numpy as np
 from config import IR_MAX, FRONT_THRESH, LEFT_GROUP, RIGHT_GROUP, FRONT_GROUP, BASE_SPEED, AVOID_GAIN
 
+MAX_WHEEL_CMD = 6.28
+NUM_IR = 8
+LEFT_IDX = np.array(LEFT_GROUP, dtype=np.intp)
+RIGHT_IDX = np.array(RIGHT_GROUP, dtype=np.intp)
+FRONT_IDX = np.array(FRONT_GROUP, dtype=np.intp)
+# n @ SIDE_SUMS -> (right_sum, left_sum) per robot
+SIDE_SUMS = np.zeros((NUM_IR, 2))
+SIDE_SUMS[RIGHT_IDX, 0] = 1.0
+SIDE_SUMS[LEFT_IDX, 1] = 1.0
+
 def clamp(v, lo, hi): return max(lo, min(hi, v))
 
-def steer(ir: List[float], base_speed: float = BASE_SPEED) -> Tuple[float, float, float]:
+def steer_batch(ir: np.ndarray, base_speed=BASE_SPEED, avoid_gain=AVOID_GAIN,
+                front_thresh=FRONT_THRESH) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    steer() for N robots at once. ir is an (N, 8) array of raw IR readings
+    (NaN for a missing reading); the gains may be scalars or (N,) arrays.
+    Returns (cmds, front): (N, 2) left/right wheel commands and the (N,)
+    normalized front obstacle levels.
+    """
+    n = np.clip(np.nan_to_num(np.asarray(ir, dtype=np.float64), nan=0.0) / IR_MAX, 0.0, 1.0)
+    front = n[:, FRONT_IDX].max(axis=1)
+    sides = n @ SIDE_SUMS
+    base = np.asarray(base_speed, dtype=np.float64).reshape(-1, 1)
+    # Left wheel slows for obstacles on the right and vice versa
+    cmds = base - np.asarray(avoid_gain, dtype=np.float64).reshape(-1, 1) * sides
+    # Too close: turn on the spot, right if left_sum >= right_sum, else left
+    spin = np.where(sides[:, 1:] >= sides[:, :1], 1.0, -1.0) * base * np.array([1.0, -1.0])
+    cmds = np.where((front >= front_thresh)[:, None], spin, cmds)
+    np.clip(cmds, -MAX_WHEEL_CMD, MAX_WHEEL_CMD, out=cmds)
+    return cmds, front
+
+def steer(ir: List[float], base_speed: float = BASE_SPEED, avoid_gain: float = AVOID_GAIN,
+          front_thresh: float = FRONT_THRESH) -> Tuple[float, float, float]:
     """
     Returns (left_cmd, right_cmd, front_level) given raw IR readings (None allowed).
     front_level is the normalized front obstacle level [0..1].
     """
-    vals = [x if x is not None else 0.0 for x in ir]
-    n = [clamp(v / IR_MAX, 0.0, 1.0) for v in vals]
-
-    front = max(n[i] for i in FRONT_GROUP if i < len(n))
-    # Turn away if too close
-    if front >= FRONT_THRESH:
-        left_sum  = sum(n[i] for i in LEFT_GROUP  if i < len(n))
-        right_sum = sum(n[i] for i in RIGHT_GROUP if i < len(n))
-        if left_sum >= right_sum:
-            l, r =  base_speed, -base_speed   # turn right
-        else:
-            l, r = -base_speed,  base_speed   # turn left
-        return (clamp(l, -6.28, 6.28), clamp(r, -6.28, 6.28), front)
-
-    left_sum  = sum(n[i] for i in LEFT_GROUP  if i < len(n))
-    right_sum = sum(n[i] for i in RIGHT_GROUP if i < len(n))
-    l = base_speed - AVOID_GAIN * right_sum
-    r = base_speed - AVOID_GAIN * left_sum
-    return (clamp(l, -6.28, 6.28), clamp(r, -6.28, 6.28), front)
+    row = np.zeros((1, NUM_IR))
+    vals = [x if x is not None else 0.0 for x in ir[:NUM_IR]]
+    row[0, :len(vals)] = vals
+    cmds, front = steer_batch(row, base_speed, avoid_gain, front_thresh)
+    return (float(cmds[0, 0]), float(cmds[0, 1]), float(front[0]))
@@ -1,6 +1,136 @@
-import math
+import json, math, mmap, os
 import numpy as np
 
+def trace_rays(pose_xytheta, ranges, angle_min, angle_inc, range_max, origin_m, res):
+    """
+    Vectorized traversal of one lidar scan.
+    Walks every beam from the robot cell to its endpoint cell with an integer
+    Bresenham/DDA line, so each beam visits each cell at most once.
+
+    Returns (free_gx, free_gy, hit_gx, hit_gy) as int64 arrays in (unbounded)
+    grid coordinates. Free cells exclude the endpoint cell; hit cells are only
+    produced for beams that returned before range_max.
+    """
+    x, y, th = pose_xytheta
+    r = np.asarray(ranges, dtype=np.float64).reshape(-1)
+    empty = np.empty(0, dtype=np.int64)
+    if r.size == 0:
+        return empty, empty, empty, empty
+
+    # Beam geometry; inf/nan count as "no return"
+    a = th + angle_min + np.arange(r.size) * angle_inc
+    finite = np.isfinite(r)
+    r_c = np.where(finite, np.clip(r, 0.0, range_max), range_max)
+    hit = finite & (r < range_max * 0.99)
+
+    sx = math.floor((x - origin_m[0]) / res)
+    sy = math.floor((y - origin_m[1]) / res)
+    ex = np.floor((x + r_c * np.cos(a) - origin_m[0]) / res).astype(np.int64)
+    ey = np.floor((y + r_c * np.sin(a) - origin_m[1]) / res).astype(np.int64)
+
+    # Integer line from start cell to end cell, one cell per step on the major axis
+    dx, dy = ex - sx, ey - sy
+    steps = np.maximum(np.abs(dx), np.abs(dy))
+    total = int(steps.sum())
+    if total:
+        beam = np.repeat(np.arange(r.size), steps)
+        first = np.cumsum(steps) - steps
+        k = np.arange(total, dtype=np.int64) - np.repeat(first, steps)
+        n = steps[beam]
+        # round(k * d / n) in exact integer arithmetic
+        free_gx = sx + (2 * k * dx[beam] + n) // (2 * n)
+        free_gy = sy + (2 * k * dy[beam] + n) // (2 * n)
+    else:
+        free_gx, free_gy = empty, empty
+
+    return free_gx, free_gy, ex[hit], ey[hit]
+
+def _meta_path(path):
+    return os.path.splitext(path)[0] + ".json"
+
+def _unique_counts(flat):
+    """Sorted unique values of an int array and how often each occurs."""
+    s = np.sort(flat)
+    if s.size == 0:
+        return s, s
+    first = np.flatnonzero(np.r_[True, s[1:] != s[:-1]])
+    return s[first], np.diff(np.r_[first, s.size])
+
+# Cell classes reported by ProbabilityLayer.classes()
+FREE, UNKNOWN, OCCUPIED = -1, 0, 1
+
+class ProbabilityLayer:
+    """
+    Cached probability and free/unknown/occupied views of an OccupancyGrid.
+    Cells changed by update_from_scan are only marked stale; the next read
+    recomputes just those cells in place. Readers get the same read-only
+    arrays every time, so polling them allocates nothing.
+    """
+
+    def __init__(self, occ_grid, free_thresh=-0.2, occ_thresh=+0.2):
+        """
+        free_thresh / occ_thresh: log-odds below / above which a cell is FREE / OCCUPIED
+        """
+        self.g = occ_grid
+        self.free_thresh, self.occ_thresh = float(free_thresh), float(occ_thresh)
+        self._prob = np.empty(occ_grid.grid.shape, dtype=np.float32)
+        self._cls = np.empty(occ_grid.grid.shape, dtype=np.int8)
+        self._prob_view = self._prob.view()
+        self._prob_view.flags.writeable = False
+        self._cls_view = self._cls.view()
+        self._cls_view.flags.writeable = False
+        self._stale = []
+        self._n_stale = 0
+        self._all_stale = True
+        occ_grid.attach(self)
+
+    def on_update(self, flat_idx):
+        if self._all_stale or flat_idx.size == 0:
+            return
+        self._stale.append(flat_idx)
+        self._n_stale += flat_idx.size
+        # Past a quarter of the map a full recompute is cheaper than scattered updates
+        if self._n_stale > self._prob.size // 4:
+            self.invalidate()
+
+    def invalidate(self):
+        """Mark every cell stale (e.g. after writing to occ_grid.grid directly)."""
+        self._all_stale = True
+        self._stale.clear()
+        self._n_stale = 0
+
+    def refresh(self):
+        """Recompute stale cells in place."""
+        grid = self.g.grid
+        if self._all_stale:
+            p = self._prob
+            np.negative(grid, out=p)
+            np.exp(p, out=p)
+            p += 1.0
+            np.reciprocal(p, out=p)
+            self._cls.fill(UNKNOWN)
+            self._cls[grid < self.free_thresh] = FREE
+            self._cls[grid > self.occ_thresh] = OCCUPIED
+            self._all_stale = False
+        elif self._stale:
+            # Repeated indices just rewrite the same value, so no dedup is needed
+            idx = np.concatenate(self._stale) if len(self._stale) > 1 else self._stale[0]
+            v = grid.reshape(-1)[idx]
+            self._prob.reshape(-1)[idx] = 1.0 / (1.0 + np.exp(-v))
+            self._cls.reshape(-1)[idx] = (v > self.occ_thresh).view(np.int8) - (v < self.free_thresh).view(np.int8)
+        self._stale.clear()
+        self._n_stale = 0
+
+    def prob(self):
+        """Read-only probabilities (0..1), refreshed in place; the same array on every call."""
+        self.refresh()
+        return self._prob_view
+
+    def classes(self):
+        """Read-only FREE/UNKNOWN/OCCUPIED int8 classes, refreshed in place."""
+        self.refresh()
+        return self._cls_view
+
 class OccupancyGrid:
     def __init__(
         self,
@@ -12,13 +142,23 @@ class OccupancyGrid:
         lo_min=-4.0,
         lo_max=+4.0,
         origin_center=True,
+        path=None,
+        mode="w+",
     ):
         """
         width_m, height_m: map dimensions in meters
         resolution: cell size (m/cell)
         log-odds params: lo_occ (hit), lo_free (miss), clamped to [lo_min, lo_max]
         origin_center: if True, world (0,0) is grid center. If False, origin at lower-left.
+        path: optional .npy file backing the grid through np.memmap (metadata goes
+              to a .json sidecar). mode "w+" creates it, "r+" reopens it for
+              updates, "r" opens it read-only with zero copies. See open().
         """
+        self._params = dict(
+            width_m=width_m, height_m=height_m, resolution=resolution,
+            lo_occ=lo_occ, lo_free=lo_free, lo_min=lo_min, lo_max=lo_max,
+            origin_center=origin_center,
+        )
         self.res = float(resolution)
         self.w = int(round(width_m / resolution))
         self.h = int(round(height_m / resolution))
@@ -27,14 +167,45 @@ class OccupancyGrid:
         else:
             self.origin_m = (0.0, 0.0)
 
-        self.grid = np.zeros((self.h, self.w), dtype=np.float32)
+        self.path = path
+        self._dirty = set()
+        self.layers = []
+        self._prob_layer = None
+        if path is None:
+            self.grid = np.zeros((self.h, self.w), dtype=np.float32)
+        elif mode == "w+":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self.grid = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=(self.h, self.w))
+            with open(_meta_path(path), "w", encoding="utf-8") as f:
+                json.dump(self._params, f, indent=2)
+        else:
+            self.grid = np.load(path, mmap_mode=mode)
+            if self.grid.shape != (self.h, self.w) or self.grid.dtype != np.float32:
+                raise ValueError(f"{path}: expected float32 {(self.h, self.w)}, got {self.grid.dtype} {self.grid.shape}")
+        # Dirty regions are bands of whole rows spanning at least one page
+        self._band_rows = max(1, -(-mmap.PAGESIZE // (self.w * self.grid.itemsize)))
         self.lo_occ, self.lo_free = float(lo_occ), float(lo_free)
         self.lo_min, self.lo_max = float(lo_min), float(lo_max)
 
+    def attach(self, layer):
+        """
+        Register a derived layer; layer.on_update(flat_idx) is called after
+        every update_from_scan with the flat indices of the cells it changed.
+        """
+        self.layers.append(layer)
+        return layer
+
+    @classmethod
+    def open(cls, path, mode="r+"):
+        """Open a map saved by a file-backed grid. mode="r" maps it read-only without copying."""
+        with open(_meta_path(path), "r", encoding="utf-8") as f:
+            params = json.load(f)
+        return cls(**params, path=path, mode=mode)
+
     # Transformations
     def world_to_grid(self, x_m, y_m):
-        gx = int((x_m - self.origin_m[0]) / self.res)
-        gy = int((y_m - self.origin_m[1]) / self.res)
+        gx = math.floor((x_m - self.origin_m[0]) / self.res)
+        gy = math.floor((y_m - self.origin_m[1]) / self.res)
         return gx, gy
 
     def grid_to_world(self, gx, gy):
@@ -46,8 +217,24 @@ class OccupancyGrid:
     def update_from_scan(self, pose_xytheta, ranges, angle_min, angle_inc, range_max):
         """
         pose_xytheta: (x,y,theta) in meters/radians, world frame
-        ranges: list of floats in meters
+        ranges: list/array of floats in meters
         angle_min, angle_inc, range_max: lidar model params
+
+        Batched NumPy path: all beams are traced at once (see trace_rays) and
+        free/occupied log-odds are scatter-added per cell.
+        """
+        fgx, fgy, hgx, hgy = trace_rays(
+            pose_xytheta, ranges, angle_min, angle_inc, range_max, self.origin_m, self.res
+        )
+        free_idx, free_n = _unique_counts(self._flat_index(fgx, fgy))
+        hit_idx, hit_n = _unique_counts(self._flat_index(hgx, hgy))
+        self._apply(free_idx, free_n * self.lo_free, hit_idx, hit_n * self.lo_occ)
+
+    def update_from_scan_sampled(self, pose_xytheta, ranges, angle_min, angle_inc, range_max):
+        """
+        Reference per-sample implementation (pure Python, fixed res-length steps).
+        Kept for parity checks and benchmarks against update_from_scan; it does
+        not track dirty regions.
         """
         x, y, th = pose_xytheta
 
@@ -72,11 +259,85 @@ class OccupancyGrid:
                     self.grid[gy, gx] += self.lo_occ
 
         np.clip(self.grid, self.lo_min, self.lo_max, out=self.grid)
+        if self.layers:
+            every = np.arange(self.grid.size)
+            for layer in self.layers:
+                layer.on_update(every)
+
+    def _flat_index(self, gx, gy):
+        """Flat indices of the in-bounds cells among (gx, gy)."""
+        inside = (gx >= 0) & (gx < self.w) & (gy >= 0) & (gy < self.h)
+        return gy[inside] * self.w + gx[inside]
+
+    def _apply(self, free_idx, free_delta, hit_idx, hit_delta):
+        """Scatter-add log-odds deltas at unique flat indices, then clamp only those cells."""
+        flat = self.grid.reshape(-1)
+        flat[free_idx] += free_delta
+        flat[hit_idx] += hit_delta
+        for idx in (free_idx, hit_idx):
+            flat[idx] = np.clip(flat[idx], self.lo_min, self.lo_max)
+            if self.path is not None:
+                self._dirty.update(np.unique(idx // (self.w * self._band_rows)).tolist())
+        if self.layers:
+            touched = np.concatenate((free_idx, hit_idx))
+            for layer in self.layers:
+                layer.on_update(touched)
+
+    # Persistence
+    def flush(self):
+        """
+        Write dirty row bands of a file-backed grid to disk; clean regions are
+        never rewritten. Returns the number of bytes synced.
+        """
+        if self.path is None or not self._dirty:
+            return 0
+        mm = getattr(self.grid, "_mmap", None)
+        if mm is None:
+            self.grid.flush()
+            self._dirty.clear()
+            return self.grid.nbytes
+
+        row_bytes = self.w * self.grid.itemsize
+        band_bytes = self._band_rows * row_bytes
+        base = self.grid.offset % mmap.ALLOCATIONGRANULARITY
+        end = base + self.grid.nbytes
+        synced = 0
+        bands = sorted(self._dirty)
+        run_start = prev = bands[0]
+        for b in bands[1:] + [None]:
+            if b is not None and b == prev + 1:
+                prev = b
+                continue
+            lo = base + run_start * band_bytes
+            hi = min(base + (prev + 1) * band_bytes, end)
+            lo -= lo % mmap.PAGESIZE
+            mm.flush(lo, hi - lo)
+            synced += hi - lo
+            if b is not None:
+                run_start = prev = b
+        self._dirty.clear()
+        return synced
+
+    def close(self):
+        self.flush()
 
     # Queries and Visualization Helpers
     def is_free(self, gx, gy, thresh=0.0):
         return self.grid[gy, gx] < thresh
 
+    def prob_layer(self):
+        """Cached ProbabilityLayer for this grid, created and attached on first use."""
+        if self._prob_layer is None:
+            self._prob_layer = ProbabilityLayer(self)
+        return self._prob_layer
+
     def prob(self):
-        """Return probabilities (0..1) view from log-odds grid, for quick viz."""
-        return 1.0 - 1.0 / (1.0 + np.exp(self.grid))
+        """
+        Return probabilities (0..1) view from log-odds grid, for quick viz.
+        Read-only and cached: only cells changed since the last call are recomputed.
+        """
+        return self.prob_layer().prob()
+
+    def classes(self):
+        """Read-only FREE/UNKNOWN/OCCUPIED classification of every cell (cached like prob())."""
+        return self.prob_layer().classes()
@@ -0,0 +1,312 @@
+import heapq, math
+from typing import List, Optional, Tuple
+import numpy as np
+
+SQRT2 = math.sqrt(2.0)
+INF = float("inf")
+
+# 8-connected moves: (dx, dy, cost)
+_MOVES = (
+    (1, 0, 1.0), (-1, 0, 1.0), (0, 1, 1.0), (0, -1, 1.0),
+    (1, 1, SQRT2), (1, -1, SQRT2), (-1, 1, SQRT2), (-1, -1, SQRT2),
+)
+
+def _octile(w, a, b):
+    ay, ax = divmod(a, w)
+    by, bx = divmod(b, w)
+    dx, dy = abs(ax - bx), abs(ay - by)
+    return dx + dy + (SQRT2 - 2.0) * min(dx, dy)
+
+def _neighbors(blocked, w, h, i):
+    """(j, cost) for traversable 8-neighbours of cell i; diagonals may not cut blocked corners."""
+    y, x = divmod(i, w)
+    out = []
+    for dx, dy, c in _MOVES:
+        nx, ny = x + dx, y + dy
+        if 0 <= nx < w and 0 <= ny < h:
+            j = ny * w + nx
+            if blocked[j]:
+                continue
+            if dx and dy and (blocked[y * w + nx] or blocked[ny * w + x]):
+                continue
+            out.append((j, c))
+    return out
+
+def astar(blocked, w, h, start, goal) -> Optional[List[int]]:
+    """
+    One-shot heap-based A* over flat cell indices with an octile heuristic.
+    blocked: indexable of length w*h, truthy for untraversable cells.
+    Returns the cell path start..goal, or None if the goal is unreachable.
+    """
+    if blocked[goal]:
+        return None
+    g = {start: 0.0}
+    parent = {start: -1}
+    heap = [(_octile(w, start, goal), 0.0, start)]
+    closed = set()
+    while heap:
+        _, gc, u = heapq.heappop(heap)
+        if u == goal:
+            path = [u]
+            while parent[path[-1]] != -1:
+                path.append(parent[path[-1]])
+            return path[::-1]
+        if u in closed:
+            continue
+        closed.add(u)
+        for v, c in _neighbors(blocked, w, h, u):
+            ng = gc + c
+            if ng < g.get(v, INF):
+                g[v] = ng
+                parent[v] = u
+                heapq.heappush(heap, (ng + _octile(w, v, goal), ng, v))
+    return None
+
+def _key_less(a, b, eps=1e-9):
+    """Lexicographic a < b on D* Lite keys, treating float-rounding ties in k1 as equal."""
+    if a[0] < b[0] - eps:
+        return True
+    return abs(a[0] - b[0]) <= eps and a[1] < b[1]
+
+class DStarLite:
+    """
+    Incremental planner (D* Lite, Koenig & Likhachev). Searches backwards from
+    the goal, so when cells change or the robot moves only the affected part
+    of the previous search is repaired instead of planning from scratch.
+    """
+
+    def __init__(self, blocked, w, h, start, goal):
+        """blocked: shared mutable bytearray (w*h); call update_cells() after changing it."""
+        self.blocked, self.w, self.h = blocked, w, h
+        self.start, self.goal = start, goal
+        self._last = start
+        self.km = 0.0
+        self.g = [INF] * (w * h)
+        self.rhs = [INF] * (w * h)
+        self.rhs[goal] = 0.0
+        self._heap = []
+        self._open = {}
+        self._push(goal, (_octile(w, start, goal), 0.0))
+        self.expanded = 0
+
+    # Priority queue with lazy deletion
+    def _push(self, u, key):
+        self._open[u] = key
+        heapq.heappush(self._heap, (key[0], key[1], u))
+
+    def _top(self):
+        while self._heap:
+            k1, k2, u = self._heap[0]
+            if self._open.get(u) == (k1, k2):
+                return (k1, k2), u
+            heapq.heappop(self._heap)
+        return (INF, INF), None
+
+    def _key(self, u):
+        m = min(self.g[u], self.rhs[u])
+        return (m + _octile(self.w, self.start, u) + self.km, m)
+
+    def _update_vertex(self, u):
+        if u != self.goal:
+            best = INF
+            # The robot's own cell is never treated as an obstacle
+            if not self.blocked[u] or u == self.start:
+                g = self.g
+                for v, c in _neighbors(self.blocked, self.w, self.h, u):
+                    if c + g[v] < best:
+                        best = c + g[v]
+            self.rhs[u] = best
+        self._open.pop(u, None)
+        if self.g[u] != self.rhs[u]:
+            self._push(u, self._key(u))
+
+    def compute(self):
+        """Expand nodes until the start's cost is consistent."""
+        g, rhs = self.g, self.rhs
+        while True:
+            k_old, u = self._top()
+            if u is None:
+                break
+            if not (_key_less(k_old, self._key(self.start)) or rhs[self.start] != g[self.start]):
+                break
+            heapq.heappop(self._heap)
+            del self._open[u]
+            self.expanded += 1
+            k_new = self._key(u)
+            if k_old < k_new:
+                self._push(u, k_new)
+            elif g[u] > rhs[u]:
+                g[u] = rhs[u]
+                for s, _ in self._preds(u):
+                    self._update_vertex(s)
+            else:
+                g[u] = INF
+                self._update_vertex(u)
+                for s, _ in self._preds(u):
+                    self._update_vertex(s)
+
+    def _preds(self, u):
+        # Costs are symmetric, but a blocked cell still has free predecessors to notify
+        y, x = divmod(u, self.w)
+        out = []
+        for dx, dy, c in _MOVES:
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < self.w and 0 <= ny < self.h:
+                out.append((ny * self.w + nx, c))
+        return out
+
+    def move_start(self, start):
+        """The robot moved: shift the heuristic origin (km) without touching the queue."""
+        if start != self.start:
+            self.km += _octile(self.w, self._last, start)
+            self._last = start
+            old, self.start = self.start, start
+            if self.blocked[old]:
+                self._update_vertex(old)
+            if self.blocked[start]:
+                self._update_vertex(start)
+
+    def update_cells(self, changed):
+        """Cells whose blocked state flipped; repairs every edge around them."""
+        seen = set()
+        for c in changed:
+            for v, _ in self._preds(c) + [(c, 0.0)]:
+                if v not in seen:
+                    seen.add(v)
+                    self._update_vertex(v)
+
+    def path(self, max_len=None) -> Optional[List[int]]:
+        """Greedy descent on g from start to goal; None if the goal is unreachable."""
+        if self.g[self.start] == INF:
+            return None
+        max_len = max_len or self.w * self.h
+        path = [self.start]
+        u = self.start
+        while u != self.goal and len(path) < max_len:
+            best, nxt = INF, None
+            for v, c in _neighbors(self.blocked, self.w, self.h, u):
+                if c + self.g[v] < best:
+                    best, nxt = c + self.g[v], v
+            if nxt is None:
+                return None
+            path.append(nxt)
+            u = nxt
+        return path if u == self.goal else None
+
+class GridPlanner:
+    """
+    Path planning over a dense OccupancyGrid. Cells with log-odds above
+    occ_thresh are blocked; free and unknown cells are traversable.
+
+    plan() runs one-shot A*. set_goal()/replan() keep a D* Lite search alive:
+    the planner attaches to the grid, and each replan() only repairs the
+    cells whose blocked state flipped since the previous call.
+
+    With a Costmap, cells in its lethal zone (within the robot radius of an
+    obstacle) are blocked instead, so paths keep the robot's body clear.
+    """
+
+    def __init__(self, occ_grid, occ_thresh=0.2, costmap=None):
+        self.g = occ_grid
+        self.w, self.h = occ_grid.w, occ_grid.h
+        self.occ_thresh = float(occ_thresh)
+        self.costmap = costmap
+        self.blocked = bytearray(self._blocked_now().tobytes())
+        self._blocked_np = np.frombuffer(self.blocked, dtype=np.uint8)
+        self._touched = []
+        self._n_touched = 0
+        self._dstar: Optional[DStarLite] = None
+        self._goal_xy: Optional[Tuple[float, float]] = None
+        (occ_grid if costmap is None else costmap).attach(self)
+
+    def _blocked_now(self):
+        if self.costmap is not None:
+            return self.costmap.lethal
+        return self.g.grid > self.occ_thresh
+
+    # Map sync
+    def on_update(self, flat_idx):
+        if self._n_touched > self.w * self.h // 4:
+            return
+        self._touched.append(flat_idx)
+        self._n_touched += flat_idx.size
+
+    def _sync(self) -> List[int]:
+        """Refresh blocked cells from the grid (or costmap); returns the cells that flipped."""
+        if self.costmap is not None:
+            self.costmap.refresh()
+        if not self._touched:
+            return []
+        if self._n_touched > self.w * self.h // 4:
+            now = self._blocked_now().reshape(-1)
+            idx = np.flatnonzero(now != self._blocked_np.astype(bool))
+            now = now[idx]
+        else:
+            idx = np.unique(np.concatenate(self._touched))
+            if self.costmap is not None:
+                now = self.costmap.lethal.reshape(-1)[idx]
+            else:
+                now = self.g.grid.reshape(-1)[idx] > self.occ_thresh
+            changed = now != self._blocked_np[idx].astype(bool)
+            idx, now = idx[changed], now[changed]
+        self._blocked_np[idx] = now
+        self._touched.clear()
+        self._n_touched = 0
+        return idx.tolist()
+
+    # Coordinates
+    def cell(self, xy) -> Optional[int]:
+        gx, gy = self.g.world_to_grid(xy[0], xy[1])
+        if 0 <= gx < self.w and 0 <= gy < self.h:
+            return gy * self.w + gx
+        return None
+
+    def _to_world(self, path, goal_xy):
+        """Cell path -> world waypoints at cell centers, keeping only direction changes."""
+        if path is None:
+            return None
+        pts = []
+        for k, i in enumerate(path):
+            if 0 < k < len(path) - 1:
+                a, b = path[k - 1], path[k + 1]
+                if i - a == b - i:
+                    continue
+            gy, gx = divmod(i, self.w)
+            pts.append(self.g.grid_to_world(gx + 0.5, gy + 0.5))
+        pts[-1] = (float(goal_xy[0]), float(goal_xy[1]))
+        return pts
+
+    # Planning
+    def plan(self, start_xy, goal_xy) -> Optional[List[Tuple[float, float]]]:
+        """One-shot A* from start to goal (world meters). Returns waypoints or None."""
+        self._sync()
+        s, t = self.cell(start_xy), self.cell(goal_xy)
+        if s is None or t is None:
+            return None
+        return self._to_world(astar(self.blocked, self.w, self.h, s, t), goal_xy)
+
+    def set_goal(self, start_xy, goal_xy) -> Optional[List[Tuple[float, float]]]:
+        """Start an incremental search toward goal_xy and return the first path."""
+        self._sync()
+        s, t = self.cell(start_xy), self.cell(goal_xy)
+        if s is None or t is None:
+            self._dstar = None
+            return None
+        self._goal_xy = goal_xy
+        self._dstar = DStarLite(self.blocked, self.w, self.h, s, t)
+        self._dstar.compute()
+        return self._to_world(self._dstar.path(), goal_xy)
+
+    def replan(self, start_xy) -> Optional[List[Tuple[float, float]]]:
+        """Repair the current search for the new start and any map changes."""
+        if self._dstar is None:
+            return None
+        changed = self._sync()
+        s = self.cell(start_xy)
+        if s is None:
+            return None
+        self._dstar.move_start(s)
+        if changed:
+            self._dstar.update_cells(changed)
+        self._dstar.compute()
+        return self._to_world(self._dstar.path(), self._goal_xy)
@@ -0,0 +1,70 @@
+import json, socket
+from typing import Any, Dict, Optional
+from config import PLANNER_HOST, PLANNER_PORT, PLANNER_CONNECT_S, PLANNER_TIMEOUT_S
+
+class PlannerUnavailable(RuntimeError):
+    """The planner service is not running or did not answer."""
+
+class PlannerClient:
+    """
+    Thin client for planner_service.py: one JSON request per line, one JSON
+    reply per line, over a persistent localhost connection. Imports nothing
+    heavier than the standard library, so the controller never loads torch.
+    """
+
+    def __init__(self, host: str = PLANNER_HOST, port: int = PLANNER_PORT,
+                 connect_timeout: float = PLANNER_CONNECT_S, timeout: float = PLANNER_TIMEOUT_S):
+        self.addr = (host, int(port))
+        self.connect_timeout = float(connect_timeout)
+        self.timeout = float(timeout)
+        self._sock: Optional[socket.socket] = None
+        self._rfile = None
+
+    def _connect(self):
+        try:
+            s = socket.create_connection(self.addr, timeout=self.connect_timeout)
+        except OSError as e:
+            raise PlannerUnavailable(f"planner service not reachable at {self.addr}: {e}") from e
+        s.settimeout(self.timeout)
+        self._sock, self._rfile = s, s.makefile("rb")
+
+    def close(self):
+        if self._sock is not None:
+            self._rfile.close()
+            self._sock.close()
+        self._sock = self._rfile = None
+
+    def call(self, method: str, **params) -> Any:
+        """Send one request and return its result. Raises PlannerUnavailable on any transport failure."""
+        req = (json.dumps({"method": method, **params}) + "\n").encode("utf-8")
+        # A kept-alive connection may have been dropped by a service restart: retry once on a fresh one
+        for attempt in (0, 1):
+            if self._sock is None:
+                self._connect()
+            try:
+                self._sock.sendall(req)
+                line = self._rfile.readline()
+                if not line:
+                    raise OSError("connection closed")
+                break
+            except OSError as e:
+                self.close()
+                if attempt:
+                    raise PlannerUnavailable(str(e)) from e
+        reply: Dict[str, Any] = json.loads(line)
+        if not reply.get("ok"):
+            raise RuntimeError(reply.get("error", "planner service error"))
+        return reply.get("result")
+
+    def ping(self) -> bool:
+        try:
+            return self.call("ping") == "pong"
+        except (PlannerUnavailable, RuntimeError):
+            return False
+
+    def get_plan(self, user_text: str):
+        return self.call("get_plan", text=user_text)
+
+    def nl_to_plan(self, instr: str, pose, goal_library: Dict, constraints: Dict):
+        return self.call("nl_to_plan", instr=instr, pose=list(pose),
+                         goal_library={k: list(v) for k, v in goal_library.items()}, constraints=constraints)
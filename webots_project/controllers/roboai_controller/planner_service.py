@@ -0,0 +1,93 @@
+"""
+Long-lived planner process. Loads the language model(s) once, warms them up,
+then answers get_plan / nl_to_plan requests from PlannerClient over a
+localhost socket (one JSON object per line each way). Run it next to Webots:
+
+    python webots_project/controllers/roboai_controller/planner_service.py [--t5] [--port 8765] [--backend int8]
+
+--t5 also loads the fine-tuned T5 planner (models/planning/t5_plan) for
+nl_to_plan; otherwise it is loaded on the first nl_to_plan request.
+Concurrent nl_to_plan requests (several robots) are micro-batched into one
+generate() call. --backend picks the CPU inference backend for both models
+(see models/planning/t5_plan/backends.py).
+"""
+import argparse, json, socketserver, sys, threading, time
+from config import PLANNER_HOST, PLANNER_PORT, REPO_ROOT
+import planner_text
+
+_model_lock = threading.Lock()  # one get_plan generation at a time; the pipeline is not shared safely
+_t5_lock = threading.Lock()
+_batcher = None
+_backend = "torch"
+
+def _t5():
+    """MicroBatcher over nl_to_plan_batch; its single worker thread owns the T5 model."""
+    global _batcher
+    with _t5_lock:
+        if _batcher is None:
+            sys.path.insert(0, REPO_ROOT)
+            from models.planning.t5_plan import inference
+            inference.set_backend(_backend)
+            _batcher = inference.micro_batcher()
+    return _batcher
+
+def handle(req):
+    method = req.get("method")
+    if method == "ping":
+        return "pong"
+    if method == "get_plan":
+        with _model_lock:
+            # null when the model output did not parse: the client falls back and does not cache
+            return planner_text._llm_plan(str(req["text"]))
+    if method == "nl_to_plan":
+        return _t5()({
+            "instr": str(req["instr"]),
+            "pose": tuple(req.get("pose", (0.0, 0.0, 0.0))),
+            "goal_library": {k: tuple(v) for k, v in req.get("goal_library", {}).items()},
+            "constraints": req.get("constraints", {}),
+        })
+    raise ValueError(f"unknown method: {method!r}")
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        # One connection carries many requests; it ends when the client closes it
+        for line in self.rfile:
+            t0 = time.perf_counter()
+            try:
+                reply = {"ok": True, "result": handle(json.loads(line))}
+            except Exception as e:
+                reply = {"ok": False, "error": repr(e)}
+            reply["ms"] = 1e3 * (time.perf_counter() - t0)
+            self.wfile.write((json.dumps(reply) + "\n").encode("utf-8"))
+            self.wfile.flush()
+
+class PlannerServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--host", default=PLANNER_HOST)
+    ap.add_argument("--port", type=int, default=PLANNER_PORT)
+    ap.add_argument("--t5", action="store_true", help="load and warm up the T5 planner at startup")
+    ap.add_argument("--backend", default="torch", choices=("torch", "int8", "onnx", "onnx-int8"))
+    args = ap.parse_args()
+
+    global _backend
+    _backend = planner_text.LLM_BACKEND = args.backend
+
+    t0 = time.perf_counter()
+    planner_text.warmup()
+    if args.t5:
+        _t5()({"instr": "move forward then stop", "pose": (0.0, 0.0, 0.0), "goal_library": {"base": (0.0, 0.0)},
+               "constraints": {}})
+    print(f"planner service warm in {time.perf_counter() - t0:.1f} s, listening on {args.host}:{args.port}")
+
+    with PlannerServer((args.host, args.port), _Handler) as srv:
+        try:
+            srv.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+if __name__ == "__main__":
+    main()
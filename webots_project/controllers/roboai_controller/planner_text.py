@@ -1,6 +1,13 @@
 from __future__ import annotations
-from typing import List, Dict, Any
-import json, re
+from typing import List, Dict, Any, Optional, Tuple
+import hashlib, json, re, sys
+from config import USE_PLANNER_SERVICE, REPO_ROOT, PLAN_CACHE_PATH, PLAN_CACHE_SIZE, PLAN_CACHE_TTL_S
+from planner_client import PlannerClient, PlannerUnavailable
+
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+from models.planning.t5_plan.plan_cache import PlanCache, make_key
+from models.planning.t5_plan.backends import load_seq2seq, revision_suffix
 
 # A Plan is a JSON array of step dicts with specific ops.
 Plan = List[Dict[str, Any]]
@@ -8,9 +15,13 @@ Plan = List[Dict[str, Any]]
 # Flip this to True to use the LLM path.
 USE_LLM = True
 
+LLM_MODEL = "google/flan-t5-small"
+# Inference backend for LLM_MODEL: "torch", "int8", "onnx" or "onnx-int8" (see t5_plan/backends.py)
+LLM_BACKEND = "torch"
+
 # Allowed ops and field normalization
 
-_ALLOWED_OPS = {"forward", "turn", "scan", "return_base", "wait", "stop"}
+_ALLOWED_OPS = {"forward", "turn", "scan", "goto", "return_base", "wait", "stop"}
 
 def _normalize_step(step: Dict[str, Any]) -> Dict[str, Any]:
     """Coerce fields to the right types and prune extras."""
@@ -56,6 +67,13 @@ def _normalize_step(step: Dict[str, Any]) -> Dict[str, Any]:
             secs = 1.0
         s["seconds"] = max(0.05, float(secs))
 
+    elif op == "goto":
+        for k in ("x", "y"):
+            try:
+                s[k] = float(step.get(k, 0.0))
+            except Exception:
+                s[k] = 0.0
+
     elif op in {"return_base", "stop"}:
         pass  # no extra fields
 
@@ -122,20 +140,41 @@ def stub_plan(user_text: str) -> Plan:
 
 # LLM path (still legacy ops to fit executor)
 
-def _llm_plan(user_text: str) -> Plan:
-    """
-    Use an LLM (FLAN-T5 small) to map NL → legacy ops.
-    We instruct the model to return ONLY a JSON array with allowed ops.
-    """
-    from transformers import pipeline
-    gen = pipeline("text2text-generation", model="google/flan-t5-small")
-
-    prompt = (
+_model = None
+_client = None
+_cache = None
+
+def plan_cache() -> PlanCache:
+    global _cache
+    if _cache is None:
+        _cache = PlanCache(PLAN_CACHE_PATH, capacity=PLAN_CACHE_SIZE, ttl_s=PLAN_CACHE_TTL_S)
+    return _cache
+
+def _get_model():
+    """(tokenizer, model), loaded once per process (model load is the expensive part)."""
+    global _model
+    if _model is None:
+        _model = load_seq2seq(LLM_MODEL, LLM_BACKEND)
+    return _model
+
+def _generate(prompt: str, max_new_tokens: int = 160) -> str:
+    # generate() directly rather than transformers.pipeline: it works the same on the
+    # torch models and on optimum's ORT models, which the pipeline does not accept
+    import torch
+    tok, model = _get_model()
+    enc = tok(prompt, return_tensors="pt", truncation=True)
+    with torch.inference_mode():
+        out = model.generate(**enc, max_new_tokens=max_new_tokens)
+    return tok.decode(out[0], skip_special_tokens=True)
+
+def _llm_prompt(user_text: str) -> str:
+    return (
         "Translate the following ROBOT INSTRUCTION into a STRICT JSON array of steps.\n"
         "Allowed ops ONLY: \n"
         "  - forward(seconds: number)\n"
         "  - turn(dir: 'left'|'right', deg: number)\n"
         "  - scan(sensor: string)\n"
+        "  - goto(x: number, y: number)\n"
         "  - return_base\n"
         "  - wait(seconds: number)\n"
         "  - stop\n"
@@ -147,21 +186,69 @@ def _llm_plan(user_text: str) -> Plan:
         f"Instruction: {user_text}\nOutput:\n"
     )
 
-    out = gen(prompt, max_new_tokens=160)[0]["generated_text"]
+def _prompt_version() -> str:
+    """Hash of the prompt template, part of the cache key so editing the prompt invalidates old plans."""
+    return hashlib.sha256(_llm_prompt("").encode("utf-8")).hexdigest()[:16]
+
+def _llm_plan(user_text: str) -> Optional[Plan]:
+    """
+    Use an LLM (FLAN-T5 small) to map NL → legacy ops.
+    We instruct the model to return ONLY a JSON array with allowed ops.
+    None when the output does not parse, so callers can tell a model plan
+    from the rule-based fallback.
+    """
+    plan, parsed, _ = _llm_generate(user_text)
+    return plan if parsed else None
+
+def _llm_generate(user_text: str) -> Tuple[Plan, bool, str]:
+    """(plan, parsed, raw model output); parsed is False when the rule-based fallback was used."""
+    out = _generate(_llm_prompt(user_text))
     try:
         parsed = _safe_json_array(out)
-        return _validate_and_fix(parsed)
+        return _validate_and_fix(parsed), True, out
     except Exception:
         # Fallback to rules if parsing fails
-        return stub_plan(user_text)
+        return stub_plan(user_text), False, out
+
+def warmup():
+    """Load the model and run one generation so the first real request pays inference only."""
+    _llm_plan("go forward 1 second then stop")
+
+def _service_plan(user_text: str) -> Optional[Plan]:
+    """Plan via the planner service; None when it is not running or the model output did not parse."""
+    global _client
+    if _client is None:
+        _client = PlannerClient()
+    try:
+        plan = _client.get_plan(user_text)
+        # The service answers null when the model output did not parse
+        return _validate_and_fix(plan) if plan is not None else None
+    except (PlannerUnavailable, RuntimeError, TypeError, ValueError):
+        return None
 
 # Public entrypoint
 
-def get_plan(user_text: str) -> Plan:
-    if USE_LLM:
+def get_plan(user_text: str, cache: Optional[PlanCache] = None) -> Plan:
+    """cache defaults to the process-wide plan_cache() (PLAN_CACHE_PATH)."""
+    if not USE_LLM:
+        return stub_plan(user_text)
+    if cache is None:
+        cache = plan_cache()
+    key = make_key("get_plan", user_text, LLM_MODEL + revision_suffix(LLM_BACKEND), prompt=_prompt_version())
+    plan = cache.get(key)
+    if plan is not None:
+        return plan
+    if USE_PLANNER_SERVICE:
+        # The model lives in planner_service.py; this process never imports torch
+        plan = _service_plan(user_text)
+    else:
         try:
-            return _llm_plan(user_text)
+            plan = _llm_plan(user_text)
         except Exception:
-            # strongly prefer returning a valid plan instead of throwing
-            return stub_plan(user_text)
-    return stub_plan(user_text)
+            plan = None
+    if plan is None:
+        # strongly prefer returning a valid plan instead of throwing; not cached,
+        # so the model gets another chance once it is available or parses
+        return stub_plan(user_text)
+    cache.put(key, plan)
+    return plan
@@ -0,0 +1,100 @@
+import time
+from typing import Any, Dict, Optional
+import numpy as np
+from config import TIME_STEP_MS, PROFILE_TICKS, PROFILE_WINDOW_TICKS, PROFILE_SUMMARY_TICKS
+from logger import RunLogger
+
+class _Stage:
+    __slots__ = ("buf", "n")
+
+    def __init__(self, window: int):
+        self.buf = np.zeros(window)
+        self.n = 0      # samples recorded so far; the ring holds the last len(buf)
+
+    def add(self, secs: float):
+        self.buf[self.n % len(self.buf)] = secs
+        self.n += 1
+
+    def stats(self) -> Dict[str, float]:
+        s = self.buf[:min(self.n, len(self.buf))]
+        p50, p95 = np.percentile(s, (50, 95))
+        return {"p50_ms": 1e3 * float(p50), "p95_ms": 1e3 * float(p95), "max_ms": 1e3 * float(s.max())}
+
+class TickProfiler:
+    """
+    Wall-clock cost of each stage of a control tick. The loop calls begin()
+    once the simulator hands control back, lap(stage) after each stage and
+    end() when the tick's work is done; each lap is one perf_counter() read
+    and a ring-buffer store.
+
+    Every PROFILE_SUMMARY_TICKS ticks a tick_profile event goes to the run
+    log with p50 / p95 / max per stage (and for the whole tick) over the
+    last PROFILE_WINDOW_TICKS ticks, and how many ticks overran the
+    TIME_STEP_MS budget. The time spent inside robot.step() is the
+    simulator's and is not counted.
+
+    enabled can be flipped at any time; while it is False every call returns
+    after a single attribute check.
+    """
+
+    def __init__(self, log: RunLogger, budget_ms: float = TIME_STEP_MS, enabled: bool = PROFILE_TICKS,
+                 window: int = PROFILE_WINDOW_TICKS, summary_ticks: int = PROFILE_SUMMARY_TICKS):
+        self.log = log
+        self.budget = budget_ms / 1000.0
+        self.enabled = enabled
+        self.window = int(window)
+        self.summary_ticks = int(summary_ticks)
+        self.stages: Dict[str, _Stage] = {}
+        self.total = _Stage(self.window)
+        self.ticks = 0
+        self.overruns = 0           # over the whole run
+        self._window_overruns = 0   # since the last summary
+        self._summarized_at = 0     # ticks at the last summary
+        self._t0 = self._last = None
+
+    def begin(self):
+        if not self.enabled:
+            return
+        self._t0 = self._last = time.perf_counter()
+
+    def lap(self, stage: str):
+        """Charge the time since begin() or the previous lap to stage."""
+        if not self.enabled or self._last is None:
+            return
+        now = time.perf_counter()
+        st = self.stages.get(stage)
+        if st is None:
+            st = self.stages[stage] = _Stage(self.window)
+        st.add(now - self._last)
+        self._last = now
+
+    def end(self) -> Optional[float]:
+        """Close the tick; returns its duration in seconds (None when disabled)."""
+        if not self.enabled or self._t0 is None:
+            return None
+        secs = time.perf_counter() - self._t0
+        self._t0 = self._last = None
+        self.total.add(secs)
+        self.ticks += 1
+        if secs > self.budget:
+            self.overruns += 1
+            self._window_overruns += 1
+        if self.summary_ticks and self.ticks % self.summary_ticks == 0:
+            self.summary()
+        return secs
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "ticks": self.ticks, "budget_ms": 1e3 * self.budget,
+            "overruns": self.overruns, "window_overruns": self._window_overruns,
+            "tick": self.total.stats() if self.total.n else None,
+            "stages": {name: st.stats() for name, st in self.stages.items() if st.n},
+        }
+
+    def summary(self):
+        """Log a tick_profile event now (also done every summary_ticks ticks); no-op if no tick ran since the last."""
+        if self.ticks == self._summarized_at:
+            return
+        self.log.event(op="tick_profile", **self.report())
+        self._window_overruns = 0
+        self._summarized_at = self.ticks
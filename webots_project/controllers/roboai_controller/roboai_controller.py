@@ -1,75 +1,184 @@
+import functools, math, os
 from controller import Robot
 from config import TIME_STEP_MS, LEFT_MOTOR_NAME, RIGHT_MOTOR_NAME
+from config import MAP_BACKEND, MAP_SIZE_M, MAP_RESOLUTION, MAP_TILE_CELLS, MAP_PATH, MAP_FLUSH_SECONDS
+from config import MAP_PERIOD_S, MAP_MIN_MOVE_M, MAP_MIN_TURN_DEG
+from config import ROBOT_RADIUS_M, COSTMAP_MAX_DIST_M, LOG_TELEMETRY, COMMAND_FROM_CUSTOM_DATA, ControlConfig
 from motion import Drive
 from sensors import Sensors
 from logger import RunLogger
 from state import StateEstimator
+from async_planner import AsyncPlanner
 from planner_text import get_plan
+from profiler import TickProfiler
+from scheduler import TickScheduler
 from executor import PlanExecutor
 from sensors import LidarWrapper
 from occupancy_grid import OccupancyGrid
+from tiled_grid import TiledOccupancyGrid
+from path_planner import GridPlanner
+from costmap import Costmap
 
 RUN_SECONDS = 40.0
 COMMAND = "Go forward for 3 seconds, turn left 90, scan, then stop."
-
-def main():
+# Per-tick telemetry columns (formerly the spa_tick event fields)
+TICK_FIELDS = ("x", "y", "theta", "vl", "vr", "left_cmd", "right_cmd")
+
+def make_grid(map_path=MAP_PATH):
+    """Build the occupancy map from config, reopening a persisted one when present."""
+    if MAP_BACKEND == "tiled":
+        if map_path and os.path.exists(os.path.join(map_path, "meta.json")):
+            return TiledOccupancyGrid.open(map_path)
+        return TiledOccupancyGrid(resolution=MAP_RESOLUTION, tile_cells=MAP_TILE_CELLS, path=map_path)
+    if map_path and os.path.exists(map_path):
+        return OccupancyGrid.open(map_path)
+    return OccupancyGrid(width_m=MAP_SIZE_M, height_m=MAP_SIZE_M, resolution=MAP_RESOLUTION, path=map_path)
+
+def main(robot=None, cfg: ControlConfig = None, command: str = None, log_dir: str = None,
+         run_seconds: float = RUN_SECONDS, map_path=MAP_PATH, wait_for_plan: bool = False, plan_cache=None):
+    """
+    Run one episode. Every argument defaults to what a Webots launch uses;
+    batch runs (tools/run_scenarios.py) pass their own robot, tuning values,
+    command and log directory. wait_for_plan blocks until the first plan is
+    ready instead of holding the robot, so simulated episodes do not depend
+    on how fast the planner happens to be. plan_cache replaces the shared
+    on-disk plan cache (e.g. a memory-only PlanCache per episode).
+    Returns a summary: done (the plan finished), sim_seconds and the event log path.
+    """
     print("roboai_controller (SPA + planners) loaded")
-    robot = Robot()
-    log = RunLogger()
+    robot = robot or Robot()
+    log = RunLogger(log_dir=log_dir)
 
     sensors = Sensors(robot)
     drive = Drive(robot, LEFT_MOTOR_NAME, RIGHT_MOTOR_NAME)
     est = StateEstimator()
+    tick = log.channel("tick", TICK_FIELDS) if LOG_TELEMETRY else None
+    prof = TickProfiler(log)
 
     lidar = LidarWrapper(robot, name="LDS-01", timestep=TIME_STEP_MS)
-    occ_grid = OccupancyGrid(width_m=20.0, height_m=20.0, resolution=0.05)
-
-    # High-level plan
-    plan = get_plan(COMMAND)
-    print("Plan:", plan)
-    log.event(op="plan_built", command=COMMAND, plan=plan)
-
-    execu = PlanExecutor(robot, drive, sensors, log)
-    execu.load(plan)
+    occ_grid = make_grid(map_path)
+
+    # High-level plan: built in the background while the loop already ticks
+    command = command or (COMMAND_FROM_CUSTOM_DATA and robot.getCustomData().strip()) or COMMAND
+    plans = AsyncPlanner(log, plan_fn=functools.partial(get_plan, cache=plan_cache))
+    plans.request(command)
+    if wait_for_plan:
+        plans.wait()
+
+    # Path planning runs on the dense grid; the tiled map has no planner yet
+    costmap = planner = None
+    if isinstance(occ_grid, OccupancyGrid):
+        costmap = Costmap(occ_grid, robot_radius_m=ROBOT_RADIUS_M, max_dist_m=COSTMAP_MAX_DIST_M)
+        planner = GridPlanner(occ_grid, costmap=costmap)
+    execu = PlanExecutor(robot, drive, sensors, log, est=est, planner=planner, costmap=costmap, cfg=cfg)
 
     dt = TIME_STEP_MS / 1000.0
     elapsed = 0.0
-    while elapsed < RUN_SECONDS:
-        if robot.step(TIME_STEP_MS) == -1:
-            break
+    done = False
+    ir = enc = state = None
+    mapped_at = None   # pose of the last map update
 
-        # Sense
+    # Control path: every tick, in this order, never shed
+    def sense():
+        nonlocal ir, enc
         ir = sensors.read_ir()
         enc = sensors.read_encoders()
 
-        # State
+    def odometry():
+        nonlocal state
         state = est.update(enc, dt)
 
+    def replan():
+        nonlocal command
+        # New command: replan in the background
+        if COMMAND_FROM_CUSTOM_DATA:
+            text = robot.getCustomData().strip()
+            if text and text != command:
+                command = text
+                plans.request(command)
+        # Swap a finished plan in at the tick boundary
+        ready = plans.poll()
+        if ready is not None:
+            print("Plan:", ready[1])
+            execu.load(ready[1])
+
+    def act():
+        nonlocal done
+        # Plan + Act; hold still while a plan is pending
+        if plans.pending:
+            execu.hold()
+            done = False
+        else:
+            done = execu.step(dt, ir)
+
+    # Lower rate / sheddable work
+    def pose_unchanged() -> bool:
+        if mapped_at is None:
+            return False
+        x, y, th = mapped_at
+        turn = abs(math.atan2(math.sin(state.theta - th), math.cos(state.theta - th)))
+        return math.hypot(state.x - x, state.y - y) < MAP_MIN_MOVE_M and turn < math.radians(MAP_MIN_TURN_DEG)
+
+    def update_map():
+        nonlocal mapped_at
         ranges, angle_min, angle_inc, range_max = lidar.read_scan()
-        x, y, th = state.x, state.y, state.theta
-        occ_grid.update_from_scan((x, y, th), ranges, angle_min, angle_inc, range_max)
-
-        # Plan + Act
-        done = execu.step(dt, ir)
+        prof.lap("lidar")  # the grid update is charged to "map"
+        mapped_at = (state.x, state.y, state.theta)
+        occ_grid.update_from_scan(mapped_at, ranges, angle_min, angle_inc, range_max)
 
-        # Log tick state
+    def log_tick():
         lcmd, rcmd = execu.last_cmd
-        log.event(
-            op="spa_tick",
-            x=state.x, y=state.y, theta=state.theta,
-            vl=state.vl, vr=state.vr,
-            left_cmd=lcmd, right_cmd=rcmd
-        )
-
-        if done:
-            break
-
-        elapsed += dt
-
+        if tick is not None:
+            tick.record(state.x, state.y, state.theta, state.vl, state.vr, lcmd, rcmd)
+        elif log.enabled("spa_tick"):
+            log.event(
+                op="spa_tick",
+                x=state.x, y=state.y, theta=state.theta,
+                vl=state.vl, vr=state.vr,
+                left_cmd=lcmd, right_cmd=rcmd
+            )
+
+    sched = TickScheduler(TIME_STEP_MS, profiler=prof)
+    sched.add("sense", sense, critical=True)
+    sched.add("odometry", odometry, critical=True)
+    sched.add("plan", replan, critical=True)
+    sched.add("execute", act, critical=True)
+    sched.add("map", update_map, period_s=MAP_PERIOD_S, priority=1, skip_if=pose_unchanged)
+    sched.add("log", log_tick, priority=2)
+    if map_path:
+        sched.add("map_flush", occ_grid.flush, period_s=MAP_FLUSH_SECONDS, priority=3)
+    try:
+        while elapsed < run_seconds:
+            if robot.step(TIME_STEP_MS) == -1:
+                break
+            prof.begin()
+            sched.run()
+            prof.end()
+
+            if done:
+                break
+
+            elapsed += dt
+    except Exception as e:
+        # error level: also writes out the flight recorder before the log closes
+        log.event(op="error", error=repr(e))
+        plans.close()
+        drive.stop()
+        occ_grid.close()
+        log.close()
+        raise
+
+    plans.close()
     drive.stop()
+    occ_grid.close()
+    prof.summary()
+    log.event(op="schedule", tasks=sched.report())
+    if MAP_BACKEND == "tiled":
+        log.event(op="map_memory", **occ_grid.memory_report())
     log.event(op="stop")
     log.close()
     print("roboai_controller finished")
+    return {"done": done, "sim_seconds": elapsed, "log": log.path}
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,90 @@
+import time
+from typing import Callable, Dict, List, Optional
+from config import TIME_STEP_MS, SCHED_BUDGET_FRACTION, SCHED_COST_ALPHA, SCHED_MAX_SHED_TICKS
+from profiler import TickProfiler
+
+class Task:
+    def __init__(self, name: str, fn: Callable[[], None], period_ticks: int, priority: int,
+                 skip_if: Optional[Callable[[], bool]], critical: bool):
+        self.name = name
+        self.fn = fn
+        self.period_ticks = max(1, int(period_ticks))
+        self.priority = priority
+        self.skip_if = skip_if
+        self.critical = critical
+        self.last_tick: Optional[int] = None
+        self.cost = 0.0         # smoothed run time (s), used to decide shedding
+        self.runs = 0
+        self.skipped = 0        # skip_if said there was nothing to do
+        self.shed = 0           # postponed because the tick budget was nearly spent
+        self.postponed = 0      # consecutive ticks shed
+
+    def due(self, tick: int) -> bool:
+        return self.last_tick is None or tick - self.last_tick >= self.period_ticks
+
+class TickScheduler:
+    """
+    Cooperative multi-rate scheduler for the control loop. Each stage is
+    registered as a task with a period (rounded to whole ticks), a priority
+    (lower runs first) and an optional skip_if() checked when it is due.
+    run() is called once per tick and runs the due tasks in priority order.
+
+    Critical tasks (the control path) always run. Any other task is shed,
+    i.e. postponed to the next tick while staying due, when its smoothed
+    run time would push the tick past SCHED_BUDGET_FRACTION of the budget.
+    A skipped or shed task does not reset its period, so it is reconsidered
+    on every following tick until it runs; after SCHED_MAX_SHED_TICKS
+    postponements in a row it runs regardless, so it cannot starve.
+
+    With a profiler, each task that runs is charged to a stage of its name,
+    and the skip_if() check of a skipped task to "<name>.skip", so neither
+    lands in the next task's lap.
+    """
+
+    def __init__(self, budget_ms: float = TIME_STEP_MS, profiler: Optional[TickProfiler] = None):
+        self.dt = budget_ms / 1000.0
+        self.budget = self.dt * SCHED_BUDGET_FRACTION
+        self.profiler = profiler
+        self.tasks: List[Task] = []
+        self.tick = 0
+
+    def add(self, name: str, fn: Callable[[], None], period_s: Optional[float] = None, priority: int = 0,
+            skip_if: Optional[Callable[[], bool]] = None, critical: bool = False) -> Task:
+        """period_s=None runs the task every tick."""
+        period = round(period_s / self.dt) if period_s else 1
+        task = Task(name, fn, period, priority, skip_if, critical)
+        self.tasks.append(task)
+        self.tasks.sort(key=lambda t: t.priority)  # stable: equal priorities keep registration order
+        return task
+
+    def run(self):
+        t0 = time.perf_counter()
+        prof = self.profiler
+        for task in self.tasks:
+            if not task.due(self.tick):
+                continue
+            if task.skip_if is not None and task.skip_if():
+                task.skipped += 1
+                if prof is not None:
+                    prof.lap(task.name + ".skip")
+                continue
+            start = time.perf_counter()
+            if (not task.critical and task.postponed < SCHED_MAX_SHED_TICKS
+                    and start - t0 + task.cost > self.budget):
+                task.shed += 1
+                task.postponed += 1
+                continue
+            task.fn()
+            end = time.perf_counter()
+            task.cost += SCHED_COST_ALPHA * (end - start - task.cost) if task.runs else end - start
+            task.runs += 1
+            task.postponed = 0
+            task.last_tick = self.tick
+            if prof is not None:
+                prof.lap(task.name)
+        self.tick += 1
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        return {t.name: {"period_ticks": t.period_ticks, "priority": t.priority, "runs": t.runs,
+                         "skipped": t.skipped, "shed": t.shed, "cost_ms": 1e3 * t.cost}
+                for t in self.tasks}
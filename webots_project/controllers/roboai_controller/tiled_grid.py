@@ -0,0 +1,219 @@
+import glob, json, math, os, re
+from typing import Dict, Tuple
+import numpy as np
+from occupancy_grid import trace_rays, _unique_counts
+
+_TILE_RE = re.compile(r"tile_(-?\d+)_(-?\d+)\.npy$")
+
+class TiledOccupancyGrid:
+    """
+    Sparse log-odds map made of fixed-size square tiles allocated lazily
+    wherever scans land. Grid coordinates are unbounded (negative allowed),
+    so the map grows in every direction without pre-sizing.
+
+    Same query API as OccupancyGrid: world_to_grid / grid_to_world /
+    update_from_scan / is_free / prob.
+
+    With a path, every tile is its own np.memmap'd .npy file in that
+    directory; only tiles touched since the last flush() are synced. A map
+    opened with mode "r" never writes there: tiles it lacks are read-only
+    zeros, so updates fail as they do on the mapped tiles.
+    """
+
+    def __init__(
+        self,
+        resolution=0.05,
+        tile_cells=64,
+        lo_occ=+0.85,
+        lo_free=-0.40,
+        lo_min=-4.0,
+        lo_max=+4.0,
+        origin_m=(0.0, 0.0),
+        path=None,
+        mode="w+",
+    ):
+        """
+        resolution: cell size (m/cell)
+        tile_cells: tile edge length in cells (tiles are tile_cells x tile_cells)
+        log-odds params: lo_occ (hit), lo_free (miss), clamped to [lo_min, lo_max]
+        origin_m: world position of the corner of cell (0,0)
+        path: optional directory backing the tiles. mode "w+" starts a new map
+              there, "r+" reopens it for updates, "r" maps it read-only. See open().
+        """
+        self.res = float(resolution)
+        self.tile = int(tile_cells)
+        self.origin_m = (float(origin_m[0]), float(origin_m[1]))
+        self.lo_occ, self.lo_free = float(lo_occ), float(lo_free)
+        self.lo_min, self.lo_max = float(lo_min), float(lo_max)
+        self.tiles: Dict[Tuple[int, int], np.ndarray] = {}
+        self.path = path
+        self.mode = mode
+        self._dirty = set()
+        if path is None:
+            return
+        if mode == "w+":
+            os.makedirs(path, exist_ok=True)
+            for f in glob.glob(os.path.join(path, "tile_*.npy")):
+                os.remove(f)
+            params = dict(
+                resolution=resolution, tile_cells=tile_cells, lo_occ=lo_occ, lo_free=lo_free,
+                lo_min=lo_min, lo_max=lo_max, origin_m=list(self.origin_m),
+            )
+            with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+                json.dump(params, f, indent=2)
+        else:
+            for f in glob.glob(os.path.join(path, "tile_*.npy")):
+                m = _TILE_RE.search(f)
+                if m:
+                    self.tiles[(int(m.group(1)), int(m.group(2)))] = np.load(f, mmap_mode=mode)
+
+    @classmethod
+    def open(cls, path, mode="r+"):
+        """Open a tile directory written by a file-backed map. mode="r" maps tiles read-only."""
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            params = json.load(f)
+        return cls(**params, path=path, mode=mode)
+
+    # Transformations
+    def world_to_grid(self, x_m, y_m):
+        gx = math.floor((x_m - self.origin_m[0]) / self.res)
+        gy = math.floor((y_m - self.origin_m[1]) / self.res)
+        return gx, gy
+
+    def grid_to_world(self, gx, gy):
+        x = gx * self.res + self.origin_m[0]
+        y = gy * self.res + self.origin_m[1]
+        return x, y
+
+    # Tiles
+    def _tile(self, tx, ty):
+        t = self.tiles.get((tx, ty))
+        if t is None:
+            if self.path is not None and self.mode == "r":
+                t = np.zeros((self.tile, self.tile), dtype=np.float32)
+                t.setflags(write=False)
+                return t
+            if self.path is None:
+                t = np.zeros((self.tile, self.tile), dtype=np.float32)
+            else:
+                f = os.path.join(self.path, f"tile_{tx}_{ty}.npy")
+                t = np.lib.format.open_memmap(f, mode="w+", dtype=np.float32, shape=(self.tile, self.tile))
+            self.tiles[(tx, ty)] = t
+        if self.path is not None and self.mode != "r":
+            self._dirty.add((tx, ty))
+        return t
+
+    def tile_memory(self) -> Dict[Tuple[int, int], int]:
+        """Bytes held by each allocated tile, keyed by (tx, ty)."""
+        return {k: int(t.nbytes) for k, t in self.tiles.items()}
+
+    @property
+    def nbytes(self) -> int:
+        return sum(int(t.nbytes) for t in self.tiles.values())
+
+    def memory_report(self) -> Dict[str, float]:
+        """Summary of map memory: tile count, bytes per tile, total bytes and mapped area."""
+        per_tile = self.tile * self.tile * np.dtype(np.float32).itemsize
+        side_m = self.tile * self.res
+        return {
+            "tiles": len(self.tiles),
+            "tile_cells": self.tile,
+            "bytes_per_tile": per_tile,
+            "total_bytes": self.nbytes,
+            "area_m2": len(self.tiles) * side_m * side_m,
+        }
+
+    def bounds(self):
+        """Cell bounds (gx0, gy0, gx1, gy1) of allocated tiles, end-exclusive; None if empty."""
+        if not self.tiles:
+            return None
+        txs = [k[0] for k in self.tiles]
+        tys = [k[1] for k in self.tiles]
+        return (min(txs) * self.tile, min(tys) * self.tile,
+                (max(txs) + 1) * self.tile, (max(tys) + 1) * self.tile)
+
+    # Main Update Function
+    def update_from_scan(self, pose_xytheta, ranges, angle_min, angle_inc, range_max):
+        """
+        pose_xytheta: (x,y,theta) in meters/radians, world frame
+        ranges: list/array of floats in meters
+        angle_min, angle_inc, range_max: lidar model params
+        """
+        fgx, fgy, hgx, hgy = trace_rays(
+            pose_xytheta, ranges, angle_min, angle_inc, range_max, self.origin_m, self.res
+        )
+        if fgx.size + hgx.size == 0:
+            return
+
+        # Per-cell counts, keyed relative to this scan's bounding box
+        gx_all = np.concatenate((fgx, hgx))
+        gy_all = np.concatenate((fgy, hgy))
+        x0, y0 = int(gx_all.min()), int(gy_all.min())
+        span = int(gx_all.max()) - x0 + 1
+        cells, deltas = [], []
+        for gx, gy, lo in ((fgx, fgy, self.lo_free), (hgx, hgy, self.lo_occ)):
+            key, n = _unique_counts((gy - y0) * span + (gx - x0))
+            cells.append(key)
+            deltas.append(n * lo)
+        key = np.concatenate(cells)
+        delta = np.concatenate(deltas)
+        is_hit = np.r_[np.zeros(cells[0].size, bool), np.ones(cells[1].size, bool)]
+        gx = key % span + x0
+        gy = key // span + y0
+
+        # Group cells by tile and scatter-add into each
+        T = self.tile
+        tx, ty = gx // T, gy // T
+        tkey = (ty - ty.min()) * (int(tx.max() - tx.min()) + 1) + (tx - tx.min())
+        order = np.argsort(tkey, kind="stable")
+        bounds = np.flatnonzero(np.r_[True, tkey[order][1:] != tkey[order][:-1], True])
+        for s, e in zip(bounds[:-1], bounds[1:]):
+            sel = order[s:e]
+            ctx, cty = int(tx[sel[0]]), int(ty[sel[0]])
+            flat = self._tile(ctx, cty).reshape(-1)
+            local = (gy[sel] - cty * T) * T + (gx[sel] - ctx * T)
+            # Cells are unique within the free set and within the hit set
+            h = is_hit[sel]
+            flat[local[~h]] += delta[sel][~h]
+            flat[local[h]] += delta[sel][h]
+            flat[local] = np.clip(flat[local], self.lo_min, self.lo_max)
+
+    # Persistence
+    def flush(self):
+        """Sync tiles touched since the last flush. Returns the number of tiles written."""
+        n = len(self._dirty)
+        for k in self._dirty:
+            self.tiles[k].flush()
+        self._dirty.clear()
+        return n
+
+    def close(self):
+        self.flush()
+
+    # Queries and Visualization Helpers
+    def logodds(self, gx, gy):
+        t = self.tiles.get((gx // self.tile, gy // self.tile))
+        if t is None:
+            return 0.0
+        return float(t[gy % self.tile, gx % self.tile])
+
+    def is_free(self, gx, gy, thresh=0.0):
+        return self.logodds(gx, gy) < thresh
+
+    def to_dense(self):
+        """Log-odds over the allocated bounding box as (array, (gx0, gy0)); unknown cells are 0."""
+        b = self.bounds()
+        if b is None:
+            return np.zeros((0, 0), dtype=np.float32), (0, 0)
+        gx0, gy0, gx1, gy1 = b
+        out = np.zeros((gy1 - gy0, gx1 - gx0), dtype=np.float32)
+        T = self.tile
+        for (tx, ty), t in self.tiles.items():
+            r, c = ty * T - gy0, tx * T - gx0
+            out[r:r + T, c:c + T] = t
+        return out, (gx0, gy0)
+
+    def prob(self):
+        """Return probabilities (0..1) over the allocated bounding box (see bounds()), for quick viz."""
+        grid, _ = self.to_dense()
+        return 1.0 - 1.0 / (1.0 + np.exp(grid))
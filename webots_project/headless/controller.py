@@ -0,0 +1,267 @@
+"""
+Headless stand-in for the Webots `controller` module: a kinematic NumPy
+simulation of the e-puck in worlds/roboAI_fixed.wbt. It implements the
+part of the device API the roboai_controller modules use, so they run
+unchanged and much faster than real time when this directory comes before
+them on sys.path (see run.py).
+
+Devices (names as in the .wbt):
+    "left wheel motor" / "right wheel motor"    Motor, with getPositionSensor()
+    "left wheel sensor" / "right wheel sensor"  PositionSensor (wheel angle, rad)
+    "ps0" .. "ps7"                              DistanceSensor, raw e-puck IR values
+    "LDS-01"                                    Lidar: 0.785 rad FOV, 512 beams, 1 m range, one layer
+
+The robot is a differential drive with ideal wheels. A move that would bring
+its body into a wall is refused, and the wheels do not turn that step.
+Beam i of the lidar points at -fov/2 + i * fov/(res-1) from the heading,
+which is the convention LidarWrapper.read_scan assumes. Sensors are
+noise-free.
+
+World, start pose, time limit and customData default to configure()'s
+values and can also be passed to Robot().
+"""
+import math
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from world import World, default_world
+
+# e-puck geometry (worlds/roboAI_fixed.wbt)
+WHEEL_RADIUS_M = 0.0205
+AXLE_LENGTH_M = 0.052
+BODY_RADIUS_M = 0.037
+MAX_WHEEL_SPEED = 6.28
+
+# IR sensors: (x, y) on the body in the robot frame (x forward, y left); they point radially out
+IR_POSITIONS = {
+    "ps0": (0.03, -0.01), "ps1": (0.022, -0.025), "ps2": (0.0, -0.031), "ps3": (-0.03, -0.015),
+    "ps4": (-0.03, 0.015), "ps5": (0.0, 0.031), "ps6": (0.022, 0.025), "ps7": (0.03, 0.01),
+}
+# DistanceSensor lookupTable: distance (m) -> raw value
+IR_TABLE_M = np.array([0.0, 0.005, 0.01, 0.015, 0.02, 0.03, 0.04, 0.05, 0.06, 0.07])
+IR_TABLE_VAL = np.array([4095.0, 2133.33, 1465.73, 601.46, 383.84, 234.93, 158.03, 120.0, 104.09, 67.19])
+
+LIDAR_NAME = "LDS-01"
+LIDAR_FOV = 0.785398
+LIDAR_RESOLUTION = 512
+LIDAR_MAX_RANGE = 1.0
+LIDAR_MIN_RANGE = 0.01
+
+BASIC_TIME_STEP_MS = 32
+
+_defaults: Dict = {"world": None, "pose": None, "max_time_s": None, "custom_data": ""}
+
+def configure(world: Optional[World] = None, pose: Optional[Tuple[float, float, float]] = None,
+              max_time_s: Optional[float] = None, custom_data: str = ""):
+    """Defaults for Robot() created without arguments (as roboai_controller.main does)."""
+    _defaults.update(world=world, pose=pose, max_time_s=max_time_s, custom_data=custom_data)
+
+class Device:
+    def __init__(self, robot: "Robot", name: str):
+        self.robot = robot
+        self.name = name
+        self.sampling_period = 0
+
+    def getName(self) -> str:
+        return self.name
+
+    def enable(self, sampling_period: int):
+        self.sampling_period = int(sampling_period)
+
+    def disable(self):
+        self.sampling_period = 0
+
+    def getSamplingPeriod(self) -> int:
+        return self.sampling_period
+
+class PositionSensor(Device):
+    def __init__(self, robot, name, motor: "Motor"):
+        super().__init__(robot, name)
+        self.motor = motor
+        self.value = float("nan")
+
+    def getValue(self) -> float:
+        return self.value
+
+    def _sample(self):
+        self.value = self.motor.position
+
+class Motor(Device):
+    def __init__(self, robot, name):
+        super().__init__(robot, name)
+        self.target = 0.0
+        self.velocity = 0.0
+        self.max_velocity = MAX_WHEEL_SPEED
+        self.position = 0.0
+        self.sensor: Optional[PositionSensor] = None
+
+    def setPosition(self, position: float):
+        self.target = float(position)
+
+    def setVelocity(self, velocity: float):
+        self.velocity = max(-self.max_velocity, min(self.max_velocity, float(velocity)))
+
+    def getVelocity(self) -> float:
+        return self.velocity
+
+    def getMaxVelocity(self) -> float:
+        return self.max_velocity
+
+    def getTargetPosition(self) -> float:
+        return self.target
+
+    def getPositionSensor(self) -> PositionSensor:
+        return self.sensor
+
+    def _speed(self, dt: float) -> float:
+        """Wheel speed this step: velocity control with an infinite target, else move toward it."""
+        if math.isinf(self.target):
+            return self.velocity
+        v = abs(self.velocity)
+        return max(-v, min(v, (self.target - self.position) / dt))
+
+class DistanceSensor(Device):
+    def __init__(self, robot, name):
+        super().__init__(robot, name)
+        self.value = float("nan")
+
+    def getValue(self) -> float:
+        return self.value
+
+    def getMaxValue(self) -> float:
+        return float(IR_TABLE_VAL[0])
+
+    def getMinValue(self) -> float:
+        return float(IR_TABLE_VAL[-1])
+
+class Lidar(Device):
+    def __init__(self, robot, name):
+        super().__init__(robot, name)
+        self.ranges: List[float] = [float("inf")] * LIDAR_RESOLUTION
+        self._offsets = -LIDAR_FOV / 2.0 + np.arange(LIDAR_RESOLUTION) * (LIDAR_FOV / (LIDAR_RESOLUTION - 1))
+
+    def enablePointCloud(self):
+        pass
+
+    def disablePointCloud(self):
+        pass
+
+    def getFov(self) -> float:
+        return LIDAR_FOV
+
+    def getHorizontalResolution(self) -> int:
+        return LIDAR_RESOLUTION
+
+    def getNumberOfLayers(self) -> int:
+        return 1
+
+    def getMaxRange(self) -> float:
+        return LIDAR_MAX_RANGE
+
+    def getMinRange(self) -> float:
+        return LIDAR_MIN_RANGE
+
+    def getRangeImage(self) -> List[float]:
+        return self.ranges
+
+    def _sample(self, world: World, x, y, th):
+        r = world.cast((x, y), th + self._offsets, LIDAR_MAX_RANGE)
+        r[r < LIDAR_MIN_RANGE] = np.inf
+        self.ranges = r.tolist()
+
+class Robot:
+    def __init__(self, world: Optional[World] = None, pose: Optional[Tuple[float, float, float]] = None,
+                 max_time_s: Optional[float] = None, custom_data: Optional[str] = None):
+        self.world = world or _defaults["world"] or default_world()
+        self.pose = tuple(pose or _defaults["pose"] or self.world.start)   # ground truth (x, y, theta)
+        self.max_time_s = max_time_s if max_time_s is not None else _defaults["max_time_s"]
+        self.custom_data = custom_data if custom_data is not None else _defaults["custom_data"]
+        self.time = 0.0
+        self.collisions = 0      # contacts: moves refused after a free step
+        self.blocked_s = 0.0     # simulated time spent pushing against an obstacle
+        self._blocked = False
+        self.distance = 0.0      # ground-truth path length (m)
+
+        self.left = Motor(self, "left wheel motor")
+        self.right = Motor(self, "right wheel motor")
+        self.left.sensor = PositionSensor(self, "left wheel sensor", self.left)
+        self.right.sensor = PositionSensor(self, "right wheel sensor", self.right)
+        self.ir = [DistanceSensor(self, n) for n in IR_POSITIONS]
+        self.lidar = Lidar(self, LIDAR_NAME)
+        self._devices = {d.name: d for d in (self.left, self.right, self.left.sensor, self.right.sensor,
+                                             self.lidar, *self.ir)}
+        ir_xy = np.array(list(IR_POSITIONS.values()))
+        self._ir_xy = ir_xy
+        self._ir_dir = np.arctan2(ir_xy[:, 1], ir_xy[:, 0])
+
+    # Robot API
+
+    def getDevice(self, name: str):
+        return self._devices.get(name)
+
+    def getTime(self) -> float:
+        return self.time
+
+    def getBasicTimeStep(self) -> float:
+        return float(BASIC_TIME_STEP_MS)
+
+    def getName(self) -> str:
+        return "e-puck"
+
+    def getCustomData(self) -> str:
+        return self.custom_data
+
+    def setCustomData(self, data: str):
+        self.custom_data = str(data)
+
+    def step(self, duration_ms: int) -> int:
+        """Advance the simulation by duration_ms; -1 once max_time_s has passed."""
+        if self.max_time_s is not None and self.time >= self.max_time_s:
+            return -1
+        dt = duration_ms / 1000.0
+        self._move(dt)
+        self.time += dt
+        self._sample()
+        return 0
+
+    # Simulation
+
+    def _move(self, dt: float):
+        wl, wr = self.left._speed(dt), self.right._speed(dt)
+        x, y, th = self.pose
+        v = (wl + wr) * WHEEL_RADIUS_M / 2.0
+        w = (wr - wl) * WHEEL_RADIUS_M / AXLE_LENGTH_M
+        if abs(w) > 1e-9:
+            nx = x + v / w * (math.sin(th + w * dt) - math.sin(th))
+            ny = y - v / w * (math.cos(th + w * dt) - math.cos(th))
+        else:
+            nx, ny = x + v * dt * math.cos(th), y + v * dt * math.sin(th)
+        if (nx, ny) != (x, y):
+            gap = self.world.clearance(nx, ny)
+            if gap < BODY_RADIUS_M and gap < self.world.clearance(x, y):
+                if not self._blocked:
+                    self.collisions += 1
+                    self._blocked = True
+                self.blocked_s += dt
+                return  # blocked: the robot and its wheels stay put
+            self._blocked = False
+        self.distance += math.hypot(nx - x, ny - y)
+        self.pose = (nx, ny, math.atan2(math.sin(th + w * dt), math.cos(th + w * dt)))
+        self.left.position += wl * dt
+        self.right.position += wr * dt
+
+    def _sample(self):
+        x, y, th = self.pose
+        for s in (self.left.sensor, self.right.sensor):
+            if s.sampling_period:
+                s._sample()
+        if any(d.sampling_period for d in self.ir):
+            c, s = math.cos(th), math.sin(th)
+            origins = np.stack([x + c * self._ir_xy[:, 0] - s * self._ir_xy[:, 1],
+                                y + s * self._ir_xy[:, 0] + c * self._ir_xy[:, 1]], axis=1)
+            dist = self.world.cast(origins, th + self._ir_dir, float(IR_TABLE_M[-1]))
+            vals = np.interp(np.minimum(dist, IR_TABLE_M[-1]), IR_TABLE_M, IR_TABLE_VAL)
+            for d, v in zip(self.ir, vals):
+                if d.sampling_period:
+                    d.value = float(v)
+        if self.lidar.sampling_period:
+            self.lidar._sample(self.world, x, y, th)
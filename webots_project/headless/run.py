@@ -0,0 +1,33 @@
+"""
+Run roboai_controller without Webots, against the headless simulator.
+
+    python webots_project/headless/run.py [--world worlds/boxes.json] [--command "..."] [--max-time 60]
+
+The controller modules are imported unchanged; this directory's
+controller.py takes the place of Webots' module. --command is handed over
+as the robot's customData, which the controller reads as its command.
+"""
+import argparse, os, sys, time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CONTROLLER_DIR = os.path.join(HERE, "..", "controllers", "roboai_controller")
+sys.path[:0] = [HERE, CONTROLLER_DIR]
+
+import controller
+from world import World, WORLDS_DIR
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--world", default=str(WORLDS_DIR / "arena.json"))
+    ap.add_argument("--command", default="", help="instead of roboai_controller.COMMAND")
+    ap.add_argument("--max-time", type=float, default=None, help="simulated seconds before step() returns -1")
+    args = ap.parse_args()
+
+    controller.configure(world=World.load(args.world), max_time_s=args.max_time, custom_data=args.command)
+    import roboai_controller
+    t0 = time.perf_counter()
+    roboai_controller.main()
+    print(f"headless run finished in {time.perf_counter() - t0:.2f} s wall time")
+
+if __name__ == "__main__":
+    main()
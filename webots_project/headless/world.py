@@ -0,0 +1,77 @@
+"""
+2D world for the headless simulator: a set of wall segments plus a start
+pose, loaded from a small JSON map file:
+
+    {
+      "arena": [1.0, 1.0],                  # optional: square walls centred on the origin (w, h)
+      "boxes": [[cx, cy, w, h], ...],       # optional: axis-aligned obstacles
+      "segments": [[x1, y1, x2, y2], ...],  # optional: free-standing walls
+      "start": [x, y, theta]                # optional: robot start pose (rad)
+    }
+
+The default world matches worlds/roboAI_fixed.wbt: a 1 x 1 m RectangleArena
+with the robot at the origin facing +x.
+"""
+import json
+from pathlib import Path
+from typing import Sequence, Tuple
+import numpy as np
+
+WORLDS_DIR = Path(__file__).resolve().parent / "worlds"
+
+def _box_segments(cx, cy, w, h):
+    x0, x1, y0, y1 = cx - w / 2, cx + w / 2, cy - h / 2, cy + h / 2
+    return [(x0, y0, x1, y0), (x1, y0, x1, y1), (x1, y1, x0, y1), (x0, y1, x0, y0)]
+
+class World:
+    def __init__(self, segments: Sequence[Sequence[float]], start: Tuple[float, float, float] = (0.0, 0.0, 0.0)):
+        seg = np.asarray(segments, dtype=np.float64).reshape(-1, 4)
+        self.p = seg[:, :2]               # segment start points (N, 2)
+        self.s = seg[:, 2:] - seg[:, :2]  # segment vectors (N, 2)
+        self.start = tuple(float(v) for v in start)
+
+    @classmethod
+    def from_dict(cls, d) -> "World":
+        segs = [tuple(s) for s in d.get("segments", [])]
+        if "arena" in d:
+            w, h = d["arena"]
+            segs += _box_segments(0.0, 0.0, w, h)
+        for b in d.get("boxes", []):
+            segs += _box_segments(*b)
+        return cls(segs, tuple(d.get("start", (0.0, 0.0, 0.0))))
+
+    @classmethod
+    def load(cls, path) -> "World":
+        return cls.from_dict(json.loads(Path(path).read_text(encoding="utf-8")))
+
+    def cast(self, origins: np.ndarray, angles: np.ndarray, max_range: float) -> np.ndarray:
+        """
+        Distance along each ray to the nearest wall, inf past max_range.
+        origins: (M, 2) or (2,), angles: (M,) world-frame headings.
+        All rays are intersected with all segments in one broadcast.
+        """
+        o = np.broadcast_to(np.asarray(origins, dtype=np.float64), (len(angles), 2))
+        d = np.stack([np.cos(angles), np.sin(angles)], axis=1)
+        if not len(self.p):
+            return np.full(len(angles), np.inf)
+        w = self.p[None, :, :] - o[:, None, :]                          # (M, N, 2)
+        denom = d[:, None, 0] * self.s[None, :, 1] - d[:, None, 1] * self.s[None, :, 0]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t = (w[..., 0] * self.s[None, :, 1] - w[..., 1] * self.s[None, :, 0]) / denom
+            u = (w[..., 0] * d[:, None, 1] - w[..., 1] * d[:, None, 0]) / denom
+        ok = (denom != 0) & (t >= 0) & (u >= 0) & (u <= 1)
+        r = np.where(ok, t, np.inf).min(axis=1)
+        r[r > max_range] = np.inf
+        return r
+
+    def clearance(self, x: float, y: float) -> float:
+        """Distance from (x, y) to the nearest wall."""
+        if not len(self.p):
+            return np.inf
+        q = np.array([x, y]) - self.p
+        ss = np.einsum("ij,ij->i", self.s, self.s)
+        u = np.clip(np.einsum("ij,ij->i", q, self.s) / np.where(ss > 0, ss, 1.0), 0.0, 1.0)
+        return float(np.min(np.linalg.norm(q - u[:, None] * self.s, axis=1)))
+
+def default_world() -> World:
+    return World.load(WORLDS_DIR / "arena.json")